@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Нагрузочный тест движка чата (ChatEngine.arun_turn)
+
+Запускает несколько виртуальных пользователей одновременно: каждый задает вопросы
+из train.csv своему движку (своя история диалога, общий клиент Finam API) и
+измеряет время хода, запросов к LLM и вызовов инструментов.
+
+По умолчанию модели доступны только читающие инструменты (GET), чтобы тест
+не выставлял и не отменял ордера.
+
+Использование (из корня репозитория, как модуль: скрипт импортирует пакеты scripts и src):
+    python -m scripts.benchmark_chat [OPTIONS]
+
+Примеры:
+    # 10 пользователей по 3 вопроса
+    python -m scripts.benchmark_chat --users 10 --turns 3
+
+    # С кэшем LLM (при temperature > 0 ответы по умолчанию не кэшируются), со своим счетом
+    python -m scripts.benchmark_chat --users 20 --cache --account-id A12345
+"""
+
+import asyncio
+import random
+import time
+from pathlib import Path
+from typing import Any
+
+import click
+
+from scripts.example_index import read_train_rows
+from src.app.adapters import AsyncFinamAPIClient
+from src.app.core import TOOLS, ChatEngine, TurnResult, llm_latency_stats
+from src.app.core.metrics import LatencyRecorder
+from src.app.core.tools import TOOL_SPECS
+
+READ_ONLY_TOOLS = [spec.schema() for spec in TOOL_SPECS if spec.method == "GET" and spec.name != "execute_request"]
+
+
+async def run_user(
+    client: AsyncFinamAPIClient,
+    questions: list[str],
+    recorder: LatencyRecorder,
+    options: dict[str, Any],
+) -> list[TurnResult]:
+    """Один виртуальный пользователь: вопросы задаются последовательно в одном диалоге"""
+    engine = ChatEngine(client, stream=False, **options)
+    results = []
+    for question in questions:
+        try:
+            result = await engine.arun_turn(question)
+        except Exception as e:
+            recorder.increment(f"error:{type(e).__name__}")
+            continue
+        recorder.observe("turn", result.seconds)
+        recorder.observe("llm", result.llm_seconds)
+        if result.tool_results:
+            recorder.observe("tools", result.tool_seconds)
+        recorder.increment("turns")
+        recorder.increment("llm_calls", result.llm_calls)
+        recorder.increment("cached_llm_calls", result.cached_llm_calls)
+        recorder.increment("tool_calls", len(result.tool_results))
+        recorder.increment("tool_errors", sum(tool.is_error for tool in result.tool_results))
+        recorder.increment("prompt_tokens", result.prompt_tokens)
+        recorder.increment("completion_tokens", result.completion_tokens)
+        results.append(result)
+    return results
+
+
+async def run_load(questions: list[str], users: int, turns: int, options: dict[str, Any]) -> LatencyRecorder:
+    recorder = LatencyRecorder()
+    rng = random.Random(0)
+    async with AsyncFinamAPIClient() as client:
+        await asyncio.gather(
+            *(
+                run_user(client, rng.sample(questions, min(turns, len(questions))), recorder, options)
+                for _ in range(users)
+            )
+        )
+    return recorder
+
+
+@click.command()
+@click.option(
+    "--train-file",
+    type=click.Path(exists=True, path_type=Path),
+    default="data/processed/train.csv",
+    show_default=True,
+    help="Файл с вопросами (берутся вопросы типа GET)",
+)
+@click.option("--users", default=5, show_default=True, help="Количество одновременных пользователей")
+@click.option("--turns", default=3, show_default=True, help="Вопросов на пользователя")
+@click.option("--account-id", default=None, help="ID счета для инструментов")
+@click.option("--cache", is_flag=True, help="Кэшировать ответы LLM (движок чата работает при temperature > 0)")
+@click.option("--allow-writes", is_flag=True, help="Разрешить модели выставлять и отменять ордера")
+def main(train_file: Path, users: int, turns: int, account_id: str | None, cache: bool, allow_writes: bool) -> None:
+    """Нагрузочный тест ChatEngine"""
+    questions = [row["question"] for row in read_train_rows(train_file) if row["type"] == "GET"]
+    tools = TOOLS if allow_writes else READ_ONLY_TOOLS
+    options = {"account_id": account_id, "use_cache": cache or None, "tools": tools}
+
+    click.echo(f"👥 {users} пользователей x {turns} вопросов")
+    started = time.perf_counter()
+    recorder = asyncio.run(run_load(questions, users, turns, options))
+    elapsed = time.perf_counter() - started
+
+    stats = recorder.stats()
+    counters = stats["counters"]
+    click.echo("=" * 50)
+    click.echo(f"Ходов: {counters.get('turns', 0)} за {elapsed:.1f} с ({counters.get('turns', 0) / elapsed:.2f} ход/с)")
+    click.echo(
+        f"Запросов к LLM: {counters.get('llm_calls', 0)} (из кэша: {counters.get('cached_llm_calls', 0)}), "
+        f"токенов: {counters.get('prompt_tokens', 0)} + {counters.get('completion_tokens', 0)}"
+    )
+    click.echo(f"Вызовов инструментов: {counters.get('tool_calls', 0)} (ошибок: {counters.get('tool_errors', 0)})")
+    for name, count in counters.items():
+        if name.startswith("error:"):
+            click.echo(f"⚠️  {name[6:]}: {count}")
+    click.echo(f"{'Фаза':<8} {'count':>6} {'mean':>9} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}")
+    for phase in ("turn", "llm", "tools"):
+        summary = stats["phases"].get(phase)
+        if summary:
+            click.echo(
+                f"{phase:<8} {summary['count']:>6} {summary['mean_ms']:>7.0f}ms {summary['p50_ms']:>7.0f}ms "
+                f"{summary['p90_ms']:>7.0f}ms {summary['p99_ms']:>7.0f}ms {summary['max_ms']:>7.0f}ms"
+            )
+
+    handshake_share = llm_latency_stats()["handshake_share"]
+    click.echo(f"Доля времени LLM на установку соединений: {handshake_share:.1%}")
+
+
+if __name__ == "__main__":
+    main()
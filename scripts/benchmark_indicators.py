@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк векторизованных индикаторов (src/app/analytics) на синтетических минутных свечах.
+
+Генерирует случайное блуждание цен M1 для нескольких инструментов за несколько лет
+и замеряет время расчета каждого индикатора по всей матрице (N инструментов x T свечей).
+
+Использование (из корня репозитория, как модуль: скрипт импортирует пакеты scripts и src):
+    python -m scripts.benchmark_indicators [OPTIONS]
+
+Примеры:
+    # 5 инструментов, 3 года минутных свечей
+    python -m scripts.benchmark_indicators
+
+    # 20 инструментов, 1 год, 10 повторов
+    python -m scripts.benchmark_indicators --symbols 20 --years 1 --repeat 10
+"""
+
+import time
+from collections.abc import Callable
+
+import click
+import numpy as np
+
+from src.app.analytics import atr, ema, returns, rolling_correlation, rsi, sma, volatility, vwap
+
+# Минут торгов в день (основная и вечерняя сессии MOEX) и торговых дней в году
+MINUTES_PER_DAY = 840
+TRADING_DAYS = 252
+
+
+def generate_bars(symbols: int, bars: int, seed: int = 0) -> dict[str, np.ndarray]:
+    """Случайное блуждание OHLCV: матрицы (symbols, bars)"""
+    rng = np.random.default_rng(seed)
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0, 0.0005, (symbols, bars)), axis=1))
+    spread = np.abs(rng.normal(0, 0.0003, (symbols, bars))) * close
+    return {
+        "high": close + spread,
+        "low": close - spread,
+        "close": close,
+        "volume": rng.integers(1, 1000, (symbols, bars)).astype(np.float64),
+    }
+
+
+def measure(func: Callable[[], object], repeat: int) -> float:
+    """Медианное время выполнения в миллисекундах"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings) * 1000)
+
+
+@click.command()
+@click.option("--symbols", default=5, show_default=True, help="Количество инструментов")
+@click.option("--years", default=3.0, show_default=True, help="Лет минутных свечей на инструмент")
+@click.option("--repeat", default=5, show_default=True, help="Повторов каждого замера (берется медиана)")
+def main(symbols: int, years: float, repeat: int) -> None:
+    """Замерить время расчета индикаторов по матрице минутных свечей"""
+    bars = int(years * TRADING_DAYS * MINUTES_PER_DAY)
+    data = generate_bars(symbols, bars)
+    high, low, close, volume = data["high"], data["low"], data["close"], data["volume"]
+    r = returns(close)
+    benchmark = r.mean(axis=0)
+
+    cases: list[tuple[str, Callable[[], object]]] = [
+        ("returns", lambda: returns(close)),
+        ("sma(20)", lambda: sma(close, 20)),
+        ("ema(20)", lambda: ema(close, 20)),
+        ("rsi(14)", lambda: rsi(close, 14)),
+        ("atr(14)", lambda: atr(high, low, close, 14)),
+        ("vwap", lambda: vwap(high, low, close, volume)),
+        ("vwap(390)", lambda: vwap(high, low, close, volume, window=390)),
+        ("volatility(390)", lambda: volatility(close, 390)),
+        ("rolling_correlation(390)", lambda: rolling_correlation(r, benchmark, 390)),
+    ]
+
+    click.echo(f"📊 {symbols} инструментов x {bars:,} свечей M1 ({years:g} лет) = {symbols * bars:,} значений")
+    click.echo("=" * 50)
+    total = 0.0
+    for name, func in cases:
+        elapsed = measure(func, repeat)
+        total += elapsed
+        click.echo(f"{name:<28} {elapsed:>10.1f} мс")
+    click.echo("=" * 50)
+    click.echo(f"{'Всего':<28} {total:>10.1f} мс")
+    click.echo(f"{'На инструмент за год':<28} {total / symbols / years:>10.1f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Микро-бенчмарк нормализации API запросов (scripts/request_normalizer.py)
+
+Сравнивает прежнюю реализацию (re.sub со строковыми шаблонами на каждый вызов)
+с общим нормализатором без кэша (холодный прогон) и с кэшем (повторный прогон
+по тем же запросам, как при подсчете метрик нескольких submission).
+
+Запросы берутся из train.csv и размножаются до нужного количества строк; часть
+копий получает другой ID счета, перестановку и URL-кодирование query-параметров.
+
+Использование (из корня репозитория, как модуль: скрипт импортирует пакеты scripts и src):
+    python -m scripts.benchmark_normalizer [OPTIONS]
+
+Примеры:
+    # 100 тысяч запросов, 5 повторов
+    python -m scripts.benchmark_normalizer --rows 100000 --repeat 5
+"""
+
+import csv
+import random
+import re
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+import click
+
+from scripts.request_normalizer import cache_info, clear_cache, normalize_api_request
+
+
+def legacy_normalize(request: str, method: str | None = None) -> str:
+    """Прежняя реализация из calculate_metrics.py / evaluate.py (эталон для сравнения)"""
+    if method and request.upper().startswith(method.upper()):
+        request = request[len(method) :].lstrip()
+    request = re.sub(r"^(GET|POST|PUT|DELETE|PATCH|HEAD|OPTIONS)\s+", "", request, flags=re.IGNORECASE).lstrip()
+    return re.sub(r"/accounts/[^/]+/", "/accounts/<some_id>/", request)
+
+
+def _variant(request: str, rng: random.Random) -> str:
+    """Вариант запроса с тем же смыслом: другой счет, порядок и кодирование параметров"""
+    request = request.replace("{account_id}", f"A{rng.randint(1, 999_999)}")
+    path, question, query = request.partition("?")
+    if question and rng.random() < 0.5:
+        params = query.split("&")
+        rng.shuffle(params)
+        query = "&".join(params).replace(":", "%3A")
+    return f"{path}?{query}" if question else path
+
+
+def load_requests(train_file: Path, rows: int, seed: int = 0) -> list[tuple[str, str]]:
+    """Пары (type, request) из train.csv, размноженные до rows строк"""
+    with open(train_file, encoding="utf-8") as f:
+        base = [(row["type"], row["request"]) for row in csv.DictReader(f, delimiter=";")]
+    rng = random.Random(seed)
+    return [(method, _variant(request, rng)) for method, request in (rng.choice(base) for _ in range(rows))]
+
+
+def _timeit(function: Callable[[str, str], str], requests: list[tuple[str, str]], repeat: int) -> float:
+    """Лучшее время из repeat прогонов, секунды"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for method, request in requests:
+            function(request, method)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+@click.command()
+@click.option(
+    "--train-file",
+    type=click.Path(exists=True, path_type=Path),
+    default="data/processed/train.csv",
+    show_default=True,
+    help="Источник запросов",
+)
+@click.option("--rows", default=100_000, show_default=True, help="Количество запросов")
+@click.option("--repeat", default=3, show_default=True, help="Количество повторов (берется лучшее время)")
+def main(train_file: Path, rows: int, repeat: int) -> None:
+    """Бенчмарк нормализации API запросов"""
+    requests = load_requests(train_file, rows)
+    click.echo(f"🧪 {len(requests)} запросов, {len({r for _, r in requests})} уникальных, лучший из {repeat}")
+
+    legacy = _timeit(legacy_normalize, requests, repeat)
+
+    def cold(request: str, method: str) -> str:
+        clear_cache()
+        return normalize_api_request(request, method)
+
+    uncached = _timeit(cold, requests, repeat)
+    clear_cache()
+    normalize_first = _timeit(normalize_api_request, requests, 1)
+    cached = _timeit(normalize_api_request, requests, repeat)
+
+    click.echo(f"{'Вариант':<28} {'всего':>9} {'на запрос':>11} {'vs legacy':>10}")
+    for name, seconds in (
+        ("legacy (re.sub)", legacy),
+        ("normalizer, без кэша", uncached),
+        ("normalizer, первый прогон", normalize_first),
+        ("normalizer, кэш", cached),
+    ):
+        per_request = seconds / len(requests) * 1e6
+        click.echo(f"{name:<28} {seconds * 1e3:>7.1f}ms {per_request:>9.2f}us {legacy / seconds:>9.1f}x")
+
+    info = cache_info()
+    click.echo(f"Кэш: {info['size']} записей, попаданий {info['hits']}, промахов {info['misses']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -21,43 +21,29 @@
 
     # С отображением ошибок
     poetry run calculate-metrics --show-errors 5
+
+    # Сравнение нескольких submission (эталон читается один раз, файлы оцениваются параллельно)
+    poetry run calculate-metrics --pred runs/a.csv --pred runs/b.csv --pred runs/c.csv
 """
 
 import csv
-import re
+import math
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
 from pathlib import Path
 from typing import Optional
 
 import click
+import numpy as np
 
-
-def normalize_api_request(request: str, method: str | None = None) -> str:
-    """
-    Нормализовать API запрос для гибкого сравнения
-
-    1. Убирает HTTP метод из начала строки (если он там есть)
-    2. Заменяет ID аккаунтов после "/accounts/" на "<some_id>"
-
-    Args:
-        request: API запрос (может начинаться с HTTP метода или сразу с пути)
-        method: HTTP метод (если известен отдельно)
-
-    Returns:
-        Нормализованный запрос
-    """
-    # Если метод указан отдельно, убираем его из начала request если он там есть
-    if method and request.upper().startswith(method.upper()):
-        request = request[len(method):].lstrip()
-
-    # Убираем HTTP метод из начала строки, если он там есть
-    # Паттерн: METHOD /path (где METHOD - слово из заглавных букв)
-    method_pattern = r"^(GET|POST|PUT|DELETE|PATCH|HEAD|OPTIONS)\s+"
-    request = re.sub(method_pattern, "", request, flags=re.IGNORECASE).lstrip()
-
-    # Заменяем ID аккаунтов на плейсхолдер
-    # Паттерн: /accounts/{любой_ид}/ на /accounts/<some_id>/
-    account_pattern = r"/accounts/[^/]+/"
-    return re.sub(account_pattern, "/accounts/<some_id>/", request)
+try:
+    from scripts.error_analysis import cluster_errors, error_signature, issue_counts
+    from scripts.request_normalizer import normalize_api_request
+except ImportError:  # Запуск как python scripts/calculate_metrics.py: scripts/ в sys.path, пакета scripts нет
+    from error_analysis import cluster_errors, error_signature, issue_counts
+    from request_normalizer import normalize_api_request
 
 
 def load_csv(file_path: Path) -> dict[str, dict[str, str]]:
@@ -86,6 +72,8 @@ def calculate_accuracy(
     correct_request = 0
 
     errors = []
+    # Правильность по каждому UID эталона (в порядке ground_truth) - для bootstrap интервалов
+    correctness = []
     type_stats = {
         "GET": {"tp": 0, "fp": 0, "fn": 0},
         "POST": {"tp": 0, "fp": 0, "fn": 0},
@@ -103,6 +91,7 @@ def calculate_accuracy(
                 "pred_request": None,
             })
             type_stats[true_data["type"]]["fn"] += 1
+            correctness.append(False)
             continue
 
         pred_data = predicted[uid]
@@ -117,6 +106,7 @@ def calculate_accuracy(
 
         type_match = true_type == pred_type
         request_match = true_request_norm == pred_request_norm
+        correctness.append(type_match and request_match)
 
         if type_match:
             correct_type += 1
@@ -178,16 +168,373 @@ def calculate_accuracy(
         "request_accuracy": request_accuracy,
         "errors": errors,
         "type_stats": detailed_type_stats,
+        "correctness": correctness,
+    }
+
+
+TYPES = ("GET", "POST", "DELETE")
+# При каком количестве расхождений McNemar считается по хи-квадрат вместо точного биномиального теста
+MCNEMAR_EXACT_LIMIT = 50
+
+# Сколько кластеров ошибок и отдельных отличий показывать при --show-errors
+TOP_CLUSTERS = 10
+
+# Bootstrap: количество ресемплов по умолчанию
+BOOTSTRAP_RESAMPLES = 2000
+
+# Нормализованный эталон в процессах-воркерах (передается один раз через initializer)
+_worker_truth: dict[str, tuple[str, str]] = {}
+
+
+def normalize_ground_truth(ground_truth: dict[str, dict[str, str]]) -> dict[str, tuple[str, str]]:
+    """Нормализовать эталон один раз для оценки нескольких submission: {uid: (type, request_norm)}"""
+    return {
+        uid: (data["type"], normalize_api_request(data["request"], data["type"])) for uid, data in ground_truth.items()
+    }
+
+
+def score_predictions(pred_file: Path, truth: dict[str, tuple[str, str]] | None = None) -> dict:
+    """
+    Оценить submission по нормализованному эталону
+
+    Args:
+        pred_file: Путь к predicted файлу
+        truth: Результат normalize_ground_truth (по умолчанию - эталон процесса-воркера)
+
+    Returns:
+        Счетчики совпадений, accuracy по типам и вектор правильности
+        ("correctness": bool на каждый UID эталона в порядке truth)
+    """
+    truth = _worker_truth if truth is None else truth
+    predicted = load_csv(pred_file)
+    correctness = []
+    correct_type = correct_request = 0
+    by_type_total: Counter[str] = Counter()
+    by_type_correct: Counter[str] = Counter()
+
+    for uid, (true_type, true_request_norm) in truth.items():
+        by_type_total[true_type] += 1
+        pred_data = predicted.get(uid)
+        if pred_data is None:
+            correctness.append(False)
+            continue
+
+        type_match = pred_data["type"] == true_type
+        request_match = normalize_api_request(pred_data["request"], pred_data["type"]) == true_request_norm
+        correct_type += type_match
+        correct_request += request_match
+        correctness.append(type_match and request_match)
+        by_type_correct[true_type] += type_match and request_match
+
+    total = len(truth)
+    return {
+        "file": str(pred_file),
+        "total": total,
+        "correct": sum(correctness),
+        "correct_type": correct_type,
+        "correct_request": correct_request,
+        "accuracy": sum(correctness) / total if total > 0 else 0.0,
+        "type_accuracy": {
+            method: by_type_correct[method] / by_type_total[method] if by_type_total[method] else None
+            for method in TYPES
+        },
+        "correctness": correctness,
     }
 
 
+def _resample_means(values: np.ndarray, n_resamples: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Доли верных ответов в n_resamples выборках с возвращением
+
+    Для булева массива число верных в выборке с возвращением размера n распределено
+    ровно как Binomial(n, доля верных), поэтому ресемплы генерируются одним вызовом
+    rng.binomial за O(n_resamples) без матрицы индексов n_resamples x n.
+    """
+    size = len(values)
+    if size == 0:
+        return np.full(n_resamples, np.nan)
+    return rng.binomial(size, values.mean(), n_resamples) / size
+
+
+def _interval(samples: np.ndarray, point: float, confidence: float) -> dict[str, float]:
+    alpha = (1 - confidence) / 2
+    low, high = np.quantile(samples, [alpha, 1 - alpha])
+    return {"accuracy": point, "low": float(low), "high": float(high)}
+
+
+def bootstrap_accuracy(
+    correctness: list[bool] | np.ndarray,
+    types: list[str] | np.ndarray | None = None,
+    n_resamples: int = BOOTSTRAP_RESAMPLES,
+    confidence: float = 0.95,
+    seed: int = 0,
+) -> dict:
+    """
+    Bootstrap доверительные интервалы accuracy (перцентильный метод)
+
+    Args:
+        correctness: Правильность ответа по каждому запросу
+        types: Тип (HTTP метод) эталона по каждому запросу - для интервалов по типам
+            и стратифицированного ресемплинга (доли типов в каждой выборке как в эталоне)
+        n_resamples: Количество ресемплов
+        confidence: Уровень доверия
+        seed: Seed генератора (интервалы воспроизводимы)
+
+    Returns:
+        {"overall": {accuracy, low, high}, "stratified": {...}, "by_type": {type: {...}}}
+        (stratified и by_type - только если переданы types)
+    """
+    correct = np.asarray(correctness, dtype=np.float64)
+    rng = np.random.default_rng(seed)
+    point = float(correct.mean()) if len(correct) else 0.0
+    result: dict = {"overall": _interval(_resample_means(correct, n_resamples, rng), point, confidence)}
+    if types is None or not len(correct):
+        return result
+
+    types = np.asarray(types)
+    stratified = np.zeros(n_resamples)
+    result["by_type"] = {}
+    for method in np.unique(types):
+        values = correct[types == method]
+        means = _resample_means(values, n_resamples, rng)
+        result["by_type"][str(method)] = _interval(means, float(values.mean()), confidence)
+        stratified += means * len(values)
+    result["stratified"] = _interval(stratified / len(correct), point, confidence)
+    return result
+
+
+def _init_worker(truth: dict[str, tuple[str, str]]) -> None:
+    global _worker_truth
+    _worker_truth = truth
+
+
+def mcnemar_p_value(only_a: int, only_b: int) -> float:
+    """
+    Двусторонний p-value теста McNemar для парных ответов двух submission
+
+    Args:
+        only_a: Запросов, верных только у первого submission
+        only_b: Запросов, верных только у второго submission
+
+    Returns:
+        p-value: точный биномиальный тест при малом числе расхождений,
+        иначе хи-квадрат с поправкой на непрерывность
+    """
+    n = only_a + only_b
+    if n == 0:
+        return 1.0
+    if n <= MCNEMAR_EXACT_LIMIT:
+        tail = sum(math.comb(n, k) for k in range(min(only_a, only_b) + 1)) / 2**n
+        return min(1.0, 2 * tail)
+    chi2 = max(0, abs(only_a - only_b) - 1) ** 2 / n
+    return math.erfc(math.sqrt(chi2 / 2))
+
+
+def compare_predictions(
+    pred_files: list[Path],
+    truth: dict[str, tuple[str, str]],
+    jobs: int | None = None,
+    bootstrap: int = 0,
+    confidence: float = 0.95,
+) -> dict:
+    """
+    Оценить несколько submission параллельно (по процессу на файл) и сравнить попарно
+
+    Args:
+        pred_files: Пути к predicted файлам
+        truth: Результат normalize_ground_truth
+        jobs: Количество процессов (по умолчанию - число CPU)
+        bootstrap: Ресемплов для доверительных интервалов (0 - не считать)
+        confidence: Уровень доверия интервалов
+
+    Returns:
+        {"results": [score_predictions() + "bootstrap"...], "pairs": [{a, b, only_a, only_b, p_value...}...]}
+    """
+    jobs = min(len(pred_files), jobs or os.cpu_count() or 1)
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(truth,)) as pool:
+            results = list(pool.map(score_predictions, pred_files))
+    else:
+        results = [score_predictions(pred_file, truth) for pred_file in pred_files]
+
+    if bootstrap:
+        types = [true_type for true_type, _ in truth.values()]
+        for result in results:
+            result["bootstrap"] = bootstrap_accuracy(result["correctness"], types, bootstrap, confidence)
+
+    pairs = []
+    for a, b in combinations(range(len(results)), 2):
+        only_a = only_b = 0
+        for correct_a, correct_b in zip(results[a]["correctness"], results[b]["correctness"], strict=True):
+            only_a += correct_a and not correct_b
+            only_b += correct_b and not correct_a
+        pairs.append({
+            "a": a,
+            "b": b,
+            "only_a": only_a,
+            "only_b": only_b,
+            "disagreements": only_a + only_b,
+            "p_value": mcnemar_p_value(only_a, only_b),
+        })
+    return {"results": results, "pairs": pairs}
+
+
+def _significance(p_value: float) -> str:
+    if p_value < 0.001:
+        return "***"
+    if p_value < 0.01:
+        return "**"
+    if p_value < 0.05:
+        return "*"
+    return ""
+
+
+def print_error_clusters(errors: list[dict], total: int, top: int = TOP_CLUSTERS) -> None:
+    """Вывести самые частые кластеры ошибок и отличия (сколько accuracy дает исправление каждого)"""
+    clusters = cluster_errors(errors, max_examples=1)
+    click.echo(f"\n🧩 КЛАСТЕРЫ ОШИБОК (топ {min(top, len(clusters))} из {len(clusters)}):")
+    click.echo(f"   {'Ошибок':>6}  {'+Acc':>6}  Сигнатура")
+    for cluster in clusters[:top]:
+        click.echo(f"   {cluster.count:>6}  {cluster.count / total * 100:>5.1f}%  {cluster.signature}")
+        example = cluster.examples[0]
+        if example["error"] != "missing":
+            click.echo(f"   {'':>14}  pred: {example['pred_type']} {example['pred_request_norm']}")
+            click.echo(f"   {'':>14}  true: {example['true_type']} {example['true_request_norm']}")
+
+    click.echo("\n🔎 ЧАСТЫЕ ОТЛИЧИЯ (в скольких ошибках встречаются):")
+    for issue, count in issue_counts(errors).most_common(top):
+        click.echo(f"   {count:>6}  {issue}")
+
+
+def _format_interval(interval: dict[str, float]) -> str:
+    return f"[{interval['low'] * 100:5.1f}–{interval['high'] * 100:5.1f}]"
+
+
+def print_bootstrap(intervals: dict, n_resamples: int, confidence: float) -> None:
+    """Вывести доверительные интервалы bootstrap_accuracy()"""
+    click.echo(f"\n📏 ДОВЕРИТЕЛЬНЫЕ ИНТЕРВАЛЫ ({confidence:.0%}, bootstrap {n_resamples} ресемплов):")
+    rows = [("Accuracy", intervals["overall"])]
+    if "stratified" in intervals:
+        rows.append(("Стратиф.", intervals["stratified"]))
+        rows.extend((method, interval) for method, interval in sorted(intervals["by_type"].items()))
+    for name, interval in rows:
+        click.echo(f"   {name:<10} {interval['accuracy'] * 100:>6.2f}%  {_format_interval(interval)}")
+
+
+def print_comparison(comparison: dict) -> None:
+    """Вывести таблицу accuracy по файлам и матрицы расхождений и значимости"""
+    results, pairs = comparison["results"], comparison["pairs"]
+    best = max(result["accuracy"] for result in results)
+
+    click.echo("\n🎯 ACCURACY ПО SUBMISSION:")
+    with_ci = all("bootstrap" in result for result in results)
+    header = f"   {'#':>3}  {'Accuracy':>8}  " + (f"{'CI':>13}  " if with_ci else "")
+    header += f"{'Type':>7}  {'Request':>7}  " + "  ".join(f"{t:>6}" for t in TYPES)
+    click.echo(header + "  File")
+    click.echo(f"   {'-' * (len(header) + 3)}")
+    for i, result in enumerate(results, 1):
+        total = result["total"] or 1
+        by_type = "  ".join(
+            f"{accuracy * 100:>5.1f}%" if accuracy is not None else f"{'-':>6}"
+            for accuracy in result["type_accuracy"].values()
+        )
+        mark = " 🏆" if result["accuracy"] == best else ""
+        ci = ""
+        if with_ci:
+            # Тот же интервал, что указан в подписи под таблицей: стратифицированный по типам
+            intervals = result["bootstrap"]
+            ci = _format_interval(intervals.get("stratified", intervals["overall"])) + "  "
+        click.echo(
+            f"   {i:>3}  {result['accuracy'] * 100:>7.2f}%  {ci}{result['correct_type'] / total * 100:>6.1f}%  "
+            f"{result['correct_request'] / total * 100:>6.1f}%  {by_type}  {result['file']}{mark}"
+        )
+
+    if not pairs:
+        return
+
+    size = len(results)
+    matrix: list[list[str]] = [["" for _ in range(size)] for _ in range(size)]
+    for pair in pairs:
+        # Над диагональю - сколько запросов верны только у строки / только у столбца, под диагональю - p-value
+        matrix[pair["a"]][pair["b"]] = f"{pair['only_a']}/{pair['only_b']}"
+        matrix[pair["b"]][pair["a"]] = f"{pair['p_value']:.3f}{_significance(pair['p_value'])}"
+
+    width = max(9, *(len(cell) for row in matrix for cell in row))
+    click.echo("\n🔀 ПОПАРНОЕ СРАВНЕНИЕ:")
+    click.echo("   Над диагональю: верно только у строки / только у столбца")
+    click.echo("   Под диагональю: p-value McNemar (* p<0.05, ** p<0.01, *** p<0.001)")
+    click.echo(f"   {'':>3}  " + " ".join(f"{f'#{j}':>{width}}" for j in range(1, size + 1)))
+    for i, row in enumerate(matrix, 1):
+        cells = " ".join(f"{cell if cell else '—':>{width}}" for cell in row)
+        click.echo(f"   {f'#{i}':>3}  {cells}")
+
+
+def write_comparison(comparison: dict, path: Path) -> None:
+    """Сохранить попарное сравнение в CSV (по строке на пару submission)"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    results = comparison["results"]
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f, delimiter=";")
+        writer.writerow([
+            "file_a",
+            "file_b",
+            "accuracy_a",
+            "accuracy_b",
+            "only_a",
+            "only_b",
+            "disagreements",
+            "p_value",
+        ])
+        for pair in comparison["pairs"]:
+            a, b = results[pair["a"]], results[pair["b"]]
+            writer.writerow([
+                a["file"],
+                b["file"],
+                f"{a['accuracy']:.4f}",
+                f"{b['accuracy']:.4f}",
+                pair["only_a"],
+                pair["only_b"],
+                pair["disagreements"],
+                f"{pair['p_value']:.6f}",
+            ])
+
+
+def _compare_main(
+    pred_files: list[Path],
+    true_file: Path,
+    jobs: int | None,
+    save_path: Optional[Path],
+    bootstrap: int,
+    confidence: float,
+) -> None:
+    """Режим сравнения нескольких submission"""
+    click.echo(f"📊 Сравнение {len(pred_files)} submission...")
+    click.echo(f"📖 Ground Truth: {true_file}")
+    click.echo("=" * 70)
+
+    try:
+        truth = normalize_ground_truth(load_csv(true_file))
+        comparison = compare_predictions(pred_files, truth, jobs, bootstrap, confidence)
+    except Exception as e:
+        click.echo(f"❌ Ошибка при чтении файлов: {e}", err=True)
+        return
+
+    print_comparison(comparison)
+    if bootstrap:
+        click.echo(f"\n   CI - {confidence:.0%} интервал accuracy (bootstrap, стратифицированный по типам)")
+    if save_path:
+        write_comparison(comparison, save_path)
+        click.echo(f"\n💾 Сравнение сохранено в: {save_path}")
+
+
 @click.command()
 @click.option(
     "--pred",
-    "pred_file",
+    "pred_files",
     type=click.Path(exists=True, path_type=Path),
-    default="data/processed/submission.csv",
-    help="Путь к predicted файлу (submission.csv)",
+    multiple=True,
+    default=["data/processed/submission.csv"],
+    help="Путь к predicted файлу (submission.csv). Можно указать несколько раз для сравнения",
 )
 @click.option(
     "--true",
@@ -208,8 +555,49 @@ def calculate_accuracy(
     default=None,
     help="Сохранить все ошибки в CSV файл",
 )
-def main(pred_file: Path, true_file: Path, show_errors: int, save_errors: Optional[Path]) -> None:  # noqa: C901
-    """Рассчитать метрику accuracy для submission файла"""
+@click.option(
+    "--jobs",
+    type=int,
+    default=None,
+    help="Процессов для сравнения нескольких submission (по умолчанию - число CPU)",
+)
+@click.option(
+    "--save-comparison",
+    type=click.Path(path_type=Path),
+    default=None,
+    help="Сохранить попарное сравнение нескольких submission в CSV файл",
+)
+@click.option(
+    "--bootstrap",
+    type=click.IntRange(min=0),
+    default=BOOTSTRAP_RESAMPLES,
+    show_default=True,
+    help="Ресемплов для bootstrap доверительных интервалов (0 = не считать)",
+)
+@click.option(
+    "--confidence",
+    type=click.FloatRange(0, 1, min_open=True, max_open=True),
+    default=0.95,
+    show_default=True,
+    help="Уровень доверия интервалов",
+)
+def main(  # noqa: C901
+    pred_files: tuple[Path, ...],
+    true_file: Path,
+    show_errors: int,
+    save_errors: Optional[Path],
+    jobs: Optional[int],
+    save_comparison: Optional[Path],
+    bootstrap: int,
+    confidence: float,
+) -> None:
+    """Рассчитать метрику accuracy для submission файла (или сравнить несколько)"""
+    if len(pred_files) > 1:
+        if show_errors or save_errors:
+            click.echo("⚠️  --show-errors и --save-errors используются только для одного submission")
+        _compare_main(list(pred_files), true_file, jobs, save_comparison, bootstrap, confidence)
+        return
+    pred_file = pred_files[0]
 
     click.echo("📊 Расчет метрики accuracy...")
     click.echo(f"📖 Predicted: {pred_file}")
@@ -250,12 +638,25 @@ def main(pred_file: Path, true_file: Path, show_errors: int, save_errors: Option
             f"{method_stats['f1']:.4f} ({method_stats['f1'] * 100:>5.1f}%)"
         )
 
-    # Показываем примеры ошибок
+    # Доверительные интервалы: на сотне запросов accuracy заметно колеблется от шума
+    if bootstrap > 0 and stats["total"]:
+        types = [data["type"] for data in ground_truth.values()]
+        print_bootstrap(bootstrap_accuracy(stats["correctness"], types, bootstrap, confidence), bootstrap, confidence)
+
+    # Структурный diff каждой ошибки: сигнатура для кластеров, вывода и CSV
+    if (show_errors > 0 or save_errors) and stats["errors"]:
+        for error in stats["errors"]:
+            error["signature"] = error_signature(error)
+
+    # Показываем кластеры и примеры ошибок
     if show_errors > 0 and stats["errors"]:
+        print_error_clusters(stats["errors"], stats["total"])
+
         click.echo(f"\n❌ ПРИМЕРЫ ОШИБОК (первые {show_errors}):")
         click.echo("=" * 70)
         for i, error in enumerate(stats["errors"][:show_errors], 1):
             click.echo(f"\n   Ошибка #{i} (uid: {error['uid']}):")
+            click.echo(f"   Отличия: {error['signature']}")
             if error["error"] == "missing":
                 click.echo("   ⚠️  Отсутствует в predicted файле")
                 click.echo(f"   Expected: {error['true_type']} {error['true_request']}")
@@ -293,6 +694,7 @@ def main(pred_file: Path, true_file: Path, show_errors: int, save_errors: Option
                 "pred_request_norm",
                 "type_match",
                 "request_match",
+                "signature",
             ]
             writer = csv.DictWriter(f, fieldnames=fieldnames, delimiter=";")
             writer.writeheader()
@@ -309,6 +711,7 @@ def main(pred_file: Path, true_file: Path, show_errors: int, save_errors: Option
                     "pred_request_norm": error.get("pred_request_norm", ""),
                     "type_match": error.get("type_match", ""),
                     "request_match": error.get("request_match", ""),
+                    "signature": error["signature"],
                 })
 
         click.echo(f"\n💾 Ошибки сохранены в: {save_errors}")
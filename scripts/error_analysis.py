@@ -0,0 +1,174 @@
+"""
+Анализ ошибок submission: структурный diff запросов и кластеры ошибок
+
+Предсказанный и эталонный запросы разбираются на HTTP метод, сегменты пути и
+query-параметры (после нормализации request_normalizer). Diff описывает отличия
+в обобщенном виде ("нет сегмента /latest", "другой параметр timeframe",
+"другой {symbol}"), без конкретных значений, поэтому одинаковые по сути ошибки
+получают одну сигнатуру. Кластеры ранжируются по частоте: размер кластера -
+сколько запросов станут верными, если исправить эту ошибку.
+
+Пример:
+    accuracy, stats = calculate_accuracy(predicted, ground_truth)
+    for cluster in cluster_errors(stats["errors"])[:10]:
+        print(cluster.count, cluster.signature)
+"""
+
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from difflib import SequenceMatcher
+from functools import lru_cache
+
+try:
+    from scripts.request_normalizer import CACHE_SIZE, normalize_api_request
+except ImportError:  # Запуск из scripts/ (python scripts/calculate_metrics.py): пакета scripts нет
+    from request_normalizer import CACHE_SIZE, normalize_api_request
+
+MISSING_SIGNATURE = "нет предсказания"
+
+# Классы изменяемых сегментов пути: сравниваются по классу, значение - отдельное отличие
+_SYMBOL_RE = re.compile(r"^[\w.-]+@\w+$")
+_NUMBER_RE = re.compile(r"^\d+$")
+_ID_RE = re.compile(r"^(?=.*\d)[A-Za-z0-9_-]{4,}$")
+
+
+@dataclass(frozen=True)
+class RequestTokens:
+    """Запрос, разобранный на метод, сегменты пути и query-параметры"""
+
+    method: str
+    segments: tuple[str, ...]
+    params: tuple[tuple[str, str], ...]
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def tokenize_request(request: str, method: str = "") -> RequestTokens:
+    """Разобрать запрос (метод, если не передан, берется из начала строки)"""
+    if not method:
+        head, _, rest = request.strip().partition(" ")
+        if rest and head.isalpha():
+            method = head
+    path, _, query = normalize_api_request(request, method or None).partition("?")
+    return RequestTokens(
+        method=method.upper(),
+        segments=tuple(segment for segment in path.split("/") if segment),
+        params=tuple((key, value) for key, _, value in (part.partition("=") for part in query.split("&") if part)),
+    )
+
+
+def _segment_class(segment: str) -> str:
+    """Обобщенный вид сегмента пути: {symbol}, {n}, {id} или сам сегмент"""
+    if segment.startswith("<") or segment.startswith("{"):
+        return "{id}"
+    if _SYMBOL_RE.match(segment):
+        return "{symbol}"
+    if _NUMBER_RE.match(segment):
+        return "{n}"
+    if _ID_RE.match(segment):
+        return "{id}"
+    return segment
+
+
+def _diff_segments(true_segments: tuple[str, ...], pred_segments: tuple[str, ...]) -> list[str]:
+    true_classes = [_segment_class(segment) for segment in true_segments]
+    pred_classes = [_segment_class(segment) for segment in pred_segments]
+    items = []
+    matcher = SequenceMatcher(None, true_classes, pred_classes, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            # Совпал класс сегмента, но не значение (другой тикер, номер ордера)
+            items.extend(
+                f"другой {true_classes[i]}"
+                for i, j in zip(range(i1, i2), range(j1, j2), strict=True)
+                if true_segments[i] != pred_segments[j] and true_classes[i] != true_segments[i]
+            )
+        elif tag == "delete":
+            items.append("нет сегмента /" + "/".join(true_classes[i1:i2]))
+        elif tag == "insert":
+            items.append("лишний сегмент /" + "/".join(pred_classes[j1:j2]))
+        else:
+            items.append(f"сегмент /{'/'.join(true_classes[i1:i2])} → /{'/'.join(pred_classes[j1:j2])}")
+    return items
+
+
+def _diff_params(true_params: tuple[tuple[str, str], ...], pred_params: tuple[tuple[str, str], ...]) -> list[str]:
+    true_values: dict[str, list[str]] = {}
+    pred_values: dict[str, list[str]] = {}
+    for key, value in true_params:
+        true_values.setdefault(key, []).append(value)
+    for key, value in pred_params:
+        pred_values.setdefault(key, []).append(value)
+
+    items = [f"нет параметра {key}" for key in true_values if key not in pred_values]
+    items.extend(f"лишний параметр {key}" for key in pred_values if key not in true_values)
+    items.extend(
+        f"другой параметр {key}" for key in true_values if key in pred_values and true_values[key] != pred_values[key]
+    )
+    return items
+
+
+def diff_requests(true_type: str, true_request: str, pred_type: str, pred_request: str) -> tuple[str, ...]:
+    """
+    Структурный diff эталонного и предсказанного запроса
+
+    Returns:
+        Обобщенные отличия в порядке: метод, путь, query-параметры (пусто, если запросы совпадают)
+    """
+    true_tokens = tokenize_request(true_request, true_type)
+    pred_tokens = tokenize_request(pred_request, pred_type)
+    items = []
+    if true_tokens.method != pred_tokens.method:
+        items.append(f"type {true_tokens.method or '-'} → {pred_tokens.method or '-'}")
+    items.extend(_diff_segments(true_tokens.segments, pred_tokens.segments))
+    items.extend(_diff_params(true_tokens.params, pred_tokens.params))
+    return tuple(items)
+
+
+def error_signature(error: dict) -> str:
+    """Сигнатура ошибки из calculate_accuracy(): отличия через " + " """
+    if error["error"] == "missing":
+        return MISSING_SIGNATURE
+    items = diff_requests(error["true_type"], error["true_request"], error["pred_type"], error["pred_request"])
+    # Запросы различаются только тем, что убирает нормализация пути (например, кодированием)
+    return " + ".join(items) or "отличие в записи запроса"
+
+
+@dataclass
+class ErrorCluster:
+    """Ошибки с одинаковой сигнатурой"""
+
+    signature: str
+    count: int = 0
+    # Первые ошибки кластера (для примеров в отчете)
+    examples: list[dict] = field(default_factory=list)
+
+
+def cluster_errors(errors: list[dict], max_examples: int = 3) -> list[ErrorCluster]:
+    """
+    Сгруппировать ошибки по сигнатуре
+
+    Args:
+        errors: stats["errors"] из calculate_accuracy()
+        max_examples: Сколько ошибок сохранить в кластере для примеров
+
+    Returns:
+        Кластеры по убыванию размера (при равенстве - по сигнатуре)
+    """
+    clusters: dict[str, ErrorCluster] = {}
+    for error in errors:
+        signature = error.get("signature") or error_signature(error)
+        cluster = clusters.setdefault(signature, ErrorCluster(signature))
+        cluster.count += 1
+        if len(cluster.examples) < max_examples:
+            cluster.examples.append(error)
+    return sorted(clusters.values(), key=lambda cluster: (-cluster.count, cluster.signature))
+
+
+def issue_counts(errors: list[dict]) -> Counter[str]:
+    """Сколько ошибок содержит каждое отдельное отличие (ошибка может содержать несколько)"""
+    counts: Counter[str] = Counter()
+    for error in errors:
+        signature = error.get("signature") or error_signature(error)
+        counts.update(set(signature.split(" + ")))
+    return counts
@@ -4,40 +4,25 @@
 
 Интерфейс совместим с платформой автоматической проверки.
 Оценка полностью основана на UID, порядок строк не важен.
+
+evaluate_streaming() дает тот же результат, что evaluate(), но не держит файлы
+в памяти целиком: строки раскладываются по корзинам на диске по хэшу UID, и
+корзины оцениваются по очереди. Подходит для файлов на миллионы строк.
 """
 
 import csv
-import re
+import tempfile
+import zlib
+from collections import Counter
 from pathlib import Path
 
+try:
+    from scripts.request_normalizer import normalize_api_request
+except ImportError:  # Запуск как python scripts/evaluate.py: scripts/ в sys.path, пакета scripts нет
+    from request_normalizer import normalize_api_request
 
-def normalize_api_request(request: str, method: str | None = None) -> str:
-    """
-    Нормализовать API запрос для гибкого сравнения
-
-    1. Убирает HTTP метод из начала строки (если он там есть)
-    2. Заменяет ID аккаунтов после "/accounts/" на "<some_id>"
-
-    Args:
-        request: API запрос (может начинаться с HTTP метода или сразу с пути)
-        method: HTTP метод (если известен отдельно)
-
-    Returns:
-        Нормализованный запрос
-    """
-    # Если метод указан отдельно, убираем его из начала request если он там есть
-    if method and request.upper().startswith(method.upper()):
-        request = request[len(method):].lstrip()
-
-    # Убираем HTTP метод из начала строки, если он там есть
-    # Паттерн: METHOD /path (где METHOD - слово из заглавных букв)
-    method_pattern = r"^(GET|POST|PUT|DELETE|PATCH|HEAD|OPTIONS)\s+"
-    request = re.sub(method_pattern, "", request, flags=re.IGNORECASE).lstrip()
-
-    # Заменяем ID аккаунтов на плейсхолдер
-    # Паттерн: /accounts/{любой_ид}/ на /accounts/<some_id>/
-    account_pattern = r"/accounts/[^/]+/"
-    return re.sub(account_pattern, "/accounts/<some_id>/", request)
+# Сколько байт исходных CSV приходится на одну корзину при потоковой оценке
+STREAMING_BUCKET_BYTES = 64 * 1024 * 1024
 
 
 def load_csv_data(file_path: str) -> dict[str, dict[str, str]]:
@@ -59,46 +44,17 @@ def load_csv_data(file_path: str) -> dict[str, dict[str, str]]:
     return data
 
 
-def validate_submission(  # noqa: C901
-    submission: dict[str, dict], required_uids: set[str]
-) -> tuple[bool, list[str]]:
-    """
-    СТРОГАЯ валидация submission перед подсчетом метрик
-
-    Критерии валидности:
-    1. Наличие ВСЕХ required UID (из public + private)
-    2. Все поля заполнены (type и request)
-    3. HTTP методы валидны
-    4. API пути начинаются с /
-
-    Args:
-        submission: Словарь предсказаний {uid: {type, request}}
-        required_uids: Множество обязательных UID
-
-    Returns:
-        (is_valid, errors): True если все проверки прошли, иначе False со списком ошибок
-    """
-    errors: list[str] = []
+def _validation_counts(submission: dict[str, dict], required_uids: set[str]) -> Counter[str]:
+    """Счетчики нарушений для validate_submission (складываются между корзинами потоковой оценки)"""
     valid_http_methods = {"GET", "POST", "DELETE", "PUT", "PATCH", "HEAD", "OPTIONS"}
+    counts: Counter[str] = Counter()
 
     # 1. Проверка наличия ВСЕХ required UID
     submission_uids = set(submission.keys())
-    missing_uids = required_uids - submission_uids
-    extra_uids = submission_uids - required_uids
-
-    if missing_uids:
-        errors.append(f"Missing {len(missing_uids)} required UIDs")
-        # НЕ показываем конкретные UID для избежания утечки данных
-
-    if extra_uids:
-        errors.append(f"Found {len(extra_uids)} extra UIDs not in test set")
+    counts["missing_uids"] = len(required_uids - submission_uids)
+    counts["extra_uids"] = len(submission_uids - required_uids)
 
     # 2-4. Проверка каждой записи
-    empty_type_count = 0
-    empty_request_count = 0
-    invalid_method_count = 0
-    invalid_path_count = 0
-
     for uid in required_uids:
         if uid not in submission:
             continue  # Уже учтено в missing_uids
@@ -109,52 +65,73 @@ def validate_submission(  # noqa: C901
 
         # Проверка пустых полей
         if not method:
-            empty_type_count += 1
+            counts["empty_type"] += 1
         if not request:
-            empty_request_count += 1
+            counts["empty_request"] += 1
 
         # Проверка валидности HTTP метода
         if method and method not in valid_http_methods:
-            invalid_method_count += 1
+            counts["invalid_method"] += 1
 
         # Проверка формата API пути
         if request and not request.startswith("/"):
-            invalid_path_count += 1
+            counts["invalid_path"] += 1
 
-    if empty_type_count > 0:
-        errors.append(f"Empty 'type' field in {empty_type_count} predictions")
+    return counts
 
-    if empty_request_count > 0:
-        errors.append(f"Empty 'request' field in {empty_request_count} predictions")
 
-    if invalid_method_count > 0:
-        errors.append(f"Invalid HTTP method in {invalid_method_count} predictions (must be GET/POST/DELETE/etc)")
+def _validation_errors(counts: Counter[str]) -> list[str]:
+    """Сообщения об ошибках валидации по счетчикам нарушений"""
+    errors: list[str] = []
 
-    if invalid_path_count > 0:
-        errors.append(f"Invalid API path in {invalid_path_count} predictions (must start with /)")
+    if counts["missing_uids"]:
+        errors.append(f"Missing {counts['missing_uids']} required UIDs")
+        # НЕ показываем конкретные UID для избежания утечки данных
 
-    # Submission валиден только если нет ошибок
-    is_valid = len(errors) == 0
+    if counts["extra_uids"]:
+        errors.append(f"Found {counts['extra_uids']} extra UIDs not in test set")
 
-    return is_valid, errors
+    if counts["empty_type"] > 0:
+        errors.append(f"Empty 'type' field in {counts['empty_type']} predictions")
 
+    if counts["empty_request"] > 0:
+        errors.append(f"Empty 'request' field in {counts['empty_request']} predictions")
 
-def calculate_accuracy(submission: dict[str, dict], ground_truth: dict[str, dict]) -> tuple[float, dict]:
+    if counts["invalid_method"] > 0:
+        errors.append(f"Invalid HTTP method in {counts['invalid_method']} predictions (must be GET/POST/DELETE/etc)")
+
+    if counts["invalid_path"] > 0:
+        errors.append(f"Invalid API path in {counts['invalid_path']} predictions (must start with /)")
+
+    return errors
+
+
+def validate_submission(submission: dict[str, dict], required_uids: set[str]) -> tuple[bool, list[str]]:
     """
-    Рассчитать accuracy метрику (только для валидных submission)
+    СТРОГАЯ валидация submission перед подсчетом метрик
 
-    Сравнение строго по UID, порядок строк не важен
+    Критерии валидности:
+    1. Наличие ВСЕХ required UID (из public + private)
+    2. Все поля заполнены (type и request)
+    3. HTTP методы валидны
+    4. API пути начинаются с /
+
+    Args:
+        submission: Словарь предсказаний {uid: {type, request}}
+        required_uids: Множество обязательных UID
 
     Returns:
-        tuple: (accuracy_score, detailed_metrics)
+        (is_valid, errors): True если все проверки прошли, иначе False со списком ошибок
     """
-    if not ground_truth:
-        return 0.0, {"error": "Ground truth is empty"}
+    errors = _validation_errors(_validation_counts(submission, required_uids))
+
+    # Submission валиден только если нет ошибок
+    return len(errors) == 0, errors
 
-    total = len(ground_truth)
-    correct = 0
-    correct_type = 0
-    correct_request = 0
+
+def _accuracy_counts(submission: dict[str, dict], ground_truth: dict[str, dict]) -> Counter[str]:
+    """Счетчики совпадений для calculate_accuracy (складываются между корзинами потоковой оценки)"""
+    counts: Counter[str] = Counter(total=len(ground_truth))
 
     for uid, true_data in ground_truth.items():
         # Проверяем наличие UID в submission
@@ -178,20 +155,27 @@ def calculate_accuracy(submission: dict[str, dict], ground_truth: dict[str, dict
         request_match = true_request_norm == pred_request_norm
 
         if type_match:
-            correct_type += 1
+            counts["correct_type"] += 1
         if request_match:
-            correct_request += 1
+            counts["correct_request"] += 1
         if type_match and request_match:
-            correct += 1
+            counts["correct"] += 1
+
+    return counts
+
+
+def _accuracy_from_counts(counts: Counter[str]) -> tuple[float, dict]:
+    """Accuracy и метрики по счетчикам совпадений"""
+    total = counts["total"]
 
     # Считаем проценты
-    accuracy = (correct / total * 100.0) if total > 0 else 0.0
-    type_accuracy = (correct_type / total * 100.0) if total > 0 else 0.0
-    request_accuracy = (correct_request / total * 100.0) if total > 0 else 0.0
+    accuracy = (counts["correct"] / total * 100.0) if total > 0 else 0.0
+    type_accuracy = (counts["correct_type"] / total * 100.0) if total > 0 else 0.0
+    request_accuracy = (counts["correct_request"] / total * 100.0) if total > 0 else 0.0
 
     metrics = {
         "total_samples": total,
-        "correct_predictions": correct,
+        "correct_predictions": counts["correct"],
         "type_accuracy": round(type_accuracy, 2),
         "request_accuracy": round(request_accuracy, 2),
     }
@@ -199,6 +183,21 @@ def calculate_accuracy(submission: dict[str, dict], ground_truth: dict[str, dict
     return accuracy, metrics
 
 
+def calculate_accuracy(submission: dict[str, dict], ground_truth: dict[str, dict]) -> tuple[float, dict]:
+    """
+    Рассчитать accuracy метрику (только для валидных submission)
+
+    Сравнение строго по UID, порядок строк не важен
+
+    Returns:
+        tuple: (accuracy_score, detailed_metrics)
+    """
+    if not ground_truth:
+        return 0.0, {"error": "Ground truth is empty"}
+
+    return _accuracy_from_counts(_accuracy_counts(submission, ground_truth))
+
+
 def evaluate(submission_path: str, private_test_path: str, public_test_path: str) -> dict:  # noqa: C901
     """
     Standard evaluation interface with public/private leaderboard split.
@@ -350,18 +349,172 @@ def evaluate(submission_path: str, private_test_path: str, public_test_path: str
         }
 
 
+def _partition_csv(file_path: str, directory: Path, name: str, buckets: int) -> int:
+    """
+    Разложить строки CSV по файлам-корзинам по хэшу UID
+
+    Строки с одним UID попадают в одну корзину в исходном порядке, поэтому
+    load_csv_data() корзины дает те же записи (включая "последняя строка побеждает").
+
+    Returns:
+        Количество строк с непустым UID
+    """
+    rows = 0
+    files = [open(directory / f"{name}_{i}.csv", "w", encoding="utf-8", newline="") for i in range(buckets)]  # noqa: SIM115
+    try:
+        writers = [csv.writer(f, delimiter=";") for f in files]
+        for writer in writers:
+            writer.writerow(("uid", "type", "request"))
+        with open(file_path, encoding="utf-8") as f:
+            for row in csv.DictReader(f, delimiter=";"):
+                uid = row.get("uid", "").strip()
+                if uid:
+                    rows += 1
+                    bucket = zlib.crc32(uid.encode("utf-8")) % buckets
+                    writers[bucket].writerow((uid, row.get("type", "").strip(), row.get("request", "").strip()))
+    except Exception as e:
+        raise ValueError(f"Failed to load CSV file: {e}") from e
+    finally:
+        for f in files:
+            f.close()
+    return rows
+
+
+def evaluate_streaming(
+    submission_path: str,
+    private_test_path: str,
+    public_test_path: str,
+    bucket_bytes: int = STREAMING_BUCKET_BYTES,
+) -> dict:
+    """
+    То же, что evaluate(), с ограниченным потреблением памяти
+
+    Файлы за один проход раскладываются по корзинам во временном каталоге
+    (корзина определяется хэшем UID, так что submission, public и private для
+    одного UID всегда в одной корзине). Затем корзины по очереди загружаются и
+    оцениваются, а счетчики валидации и совпадений суммируются. В памяти
+    одновременно находится только одна корзина (~bucket_bytes исходных данных).
+
+    Args:
+        submission_path: Path to team's submission file
+        private_test_path: Path to private test dataset
+        public_test_path: Path to public test dataset
+        bucket_bytes: Сколько байт исходных файлов приходится на одну корзину
+
+    Returns:
+        Результат в формате evaluate() (те же score, metrics и errors)
+    """
+    paths = {
+        "submission": (submission_path, "Submission file not found"),
+        "public": (public_test_path, "Public test file not found (internal error)"),
+        "private": (private_test_path, "Private test file not found (internal error)"),
+    }
+    for path, error in paths.values():
+        if not Path(path).exists():
+            return {"public_score": 0.0, "private_score": 0.0, "metrics": {}, "errors": [error]}
+
+    load_errors = {
+        "submission": "Failed to parse submission file",
+        "public": "Failed to load public test (internal error)",
+        "private": "Failed to load private test (internal error)",
+    }
+    total_bytes = sum(Path(path).stat().st_size for path, _ in paths.values())
+    buckets = max(1, -(-total_bytes // bucket_bytes))
+
+    try:
+        with tempfile.TemporaryDirectory(prefix="evaluate_") as tmp:
+            directory = Path(tmp)
+
+            # ШАГ 1: Раскладка по корзинам (ошибки и пустой submission - как в evaluate)
+            for name, (path, _) in paths.items():
+                try:
+                    rows = _partition_csv(path, directory, name, buckets)
+                except Exception as e:
+                    return {
+                        "public_score": 0.0,
+                        "private_score": 0.0,
+                        "metrics": {},
+                        "errors": [f"{load_errors[name]}: {e!s}"],
+                    }
+                if name == "submission" and not rows:
+                    return {
+                        "public_score": 0.0,
+                        "private_score": 0.0,
+                        "metrics": {},
+                        "errors": ["Submission file is empty"],
+                    }
+
+            # ШАГ 2: Оценка корзин по очереди
+            validation: Counter[str] = Counter()
+            public_counts: Counter[str] = Counter(total=0)
+            private_counts: Counter[str] = Counter(total=0)
+            submission_size = required_size = 0
+            for i in range(buckets):
+                submission = load_csv_data(str(directory / f"submission_{i}.csv"))
+                public_test = load_csv_data(str(directory / f"public_{i}.csv"))
+                private_test = load_csv_data(str(directory / f"private_{i}.csv"))
+                required_uids = set(public_test) | set(private_test)
+
+                submission_size += len(submission)
+                required_size += len(required_uids)
+                validation += _validation_counts(submission, required_uids)
+                # Считается сразу, чтобы не читать корзины второй раз; отбрасывается, если валидация провалена
+                public_counts.update(_accuracy_counts(submission, public_test))
+                private_counts.update(_accuracy_counts(submission, private_test))
+
+        validation_errors = _validation_errors(validation)
+        if validation_errors:
+            return {
+                "public_score": 0.0,
+                "private_score": 0.0,
+                "metrics": {
+                    "validation_failed": True,
+                    "submission_size": submission_size,
+                    "required_size": required_size,
+                },
+                "errors": validation_errors,
+            }
+
+        public_score, public_metrics = _accuracy_from_counts(public_counts) if public_counts["total"] else (0.0, {})
+        private_score, private_metrics = _accuracy_from_counts(private_counts) if private_counts["total"] else (0.0, {})
+
+        return {
+            "public_score": round(public_score, 2),
+            "private_score": round(private_score, 2),
+            "metrics": {
+                "public_metrics": public_metrics,
+                "private_metrics": private_metrics,
+                "submission_size": submission_size,
+                "validation_passed": True,
+            },
+            "errors": [],
+        }
+
+    except Exception as e:
+        return {
+            "public_score": 0.0,
+            "private_score": 0.0,
+            "metrics": {},
+            "errors": [f"Unexpected error during evaluation: {e!s}"],
+        }
+
+
 if __name__ == "__main__":
     # Пример использования
     import sys
 
-    if len(sys.argv) != 4:
-        print("Usage: python evaluate.py <submission.csv> <private.csv> <public.csv>")
+    # --streaming: evaluate_streaming() для файлов, которые не помещаются в память
+    streaming = "--streaming" in sys.argv[1:]
+    args = [arg for arg in sys.argv[1:] if arg != "--streaming"]
+
+    if len(args) != 3:
+        print("Usage: python evaluate.py [--streaming] <submission.csv> <private.csv> <public.csv>")
         print()
         print("Example:")
         print("  python evaluate.py data/processed/submission.csv data/interim/private.csv data/interim/public.csv")
         sys.exit(1)
 
-    result = evaluate(sys.argv[1], sys.argv[2], sys.argv[3])
+    result = (evaluate_streaming if streaming else evaluate)(args[0], args[1], args[2])
 
     print("=" * 70)
     print("EVALUATION RESULTS")
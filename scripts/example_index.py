@@ -0,0 +1,147 @@
+"""
+Индекс похожих примеров для few-shot промпта
+
+Вопросы из train.csv векторизуются символьными n-граммами (TF-IDF),
+для каждого нового вопроса выбираются top-k ближайших примеров по косинусной близости.
+Индекс строится один раз и сохраняется в data/interim/, при изменении train.csv перестраивается.
+"""
+
+import csv
+import hashlib
+import math
+import re
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+NGRAM_RANGE = (2, 4)
+
+_NON_WORD_RE = re.compile(r"[^\w]+")
+# Тикеры и идентификаторы не несут информации о типе запроса, но дают много общих n-грамм
+_SYMBOL_RE = re.compile(r"\b[\w.-]+@\w+\b")
+_ID_RE = re.compile(r"\b(?=\w*\d)[A-Za-z0-9-]{4,}\b")
+
+
+def _ngrams(text: str) -> Counter[str]:
+    """Разбить текст на символьные n-граммы внутри слов"""
+    text = _ID_RE.sub(" id ", _SYMBOL_RE.sub(" sym ", text))
+    grams: Counter[str] = Counter()
+    for word in _NON_WORD_RE.sub(" ", text.lower()).split():
+        padded = f" {word} "
+        for n in range(NGRAM_RANGE[0], NGRAM_RANGE[1] + 1):
+            for i in range(len(padded) - n + 1):
+                grams[padded[i : i + n]] += 1
+    return grams
+
+
+def _file_hash(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+class ExampleIndex:
+    """TF-IDF индекс вопросов из train.csv"""
+
+    def __init__(
+        self, examples: list[dict[str, str]], vocabulary: dict[str, int], idf: np.ndarray, matrix: np.ndarray
+    ) -> None:
+        """
+        Args:
+            examples: Примеры {question, type, request} в порядке строк матрицы
+            vocabulary: Отображение n-грамма -> номер столбца
+            idf: Веса IDF для столбцов
+            matrix: L2-нормированная матрица TF-IDF (n_examples x n_features), float32
+        """
+        self.examples = examples
+        self.vocabulary = vocabulary
+        self.idf = idf
+        self.matrix = matrix
+
+    @classmethod
+    def build(cls, examples: list[dict[str, str]]) -> "ExampleIndex":
+        """Построить индекс по списку примеров"""
+        docs = [_ngrams(ex["question"]) for ex in examples]
+        vocabulary: dict[str, int] = {}
+        for doc in docs:
+            for gram in doc:
+                vocabulary.setdefault(gram, len(vocabulary))
+
+        df = np.zeros(len(vocabulary), dtype=np.float32)
+        matrix = np.zeros((len(docs), len(vocabulary)), dtype=np.float32)
+        for row, doc in enumerate(docs):
+            cols = np.fromiter((vocabulary[g] for g in doc), dtype=np.int64, count=len(doc))
+            matrix[row, cols] = np.fromiter(doc.values(), dtype=np.float32, count=len(doc))
+            df[cols] += 1
+
+        idf = (np.log((1 + len(docs)) / (1 + df)) + 1).astype(np.float32)
+        matrix *= idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.where(norms == 0, 1, norms)
+        return cls(examples, vocabulary, idf, matrix)
+
+    def top_k(self, question: str, k: int) -> list[dict[str, str]]:
+        """Выбрать k примеров, наиболее похожих на вопрос (по убыванию близости)"""
+        grams = [(self.vocabulary[g], c) for g, c in _ngrams(question).items() if g in self.vocabulary]
+        if not grams or k <= 0:
+            return self.examples[:k]
+
+        cols = np.fromiter((col for col, _ in grams), dtype=np.int64, count=len(grams))
+        weights = np.fromiter((c for _, c in grams), dtype=np.float32, count=len(grams)) * self.idf[cols]
+        scores = self.matrix[:, cols] @ (weights / math.sqrt(float(weights @ weights)))
+
+        k = min(k, len(self.examples))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [self.examples[i] for i in best]
+
+    def save(self, path: Path, source_hash: str = "") -> None:
+        """Сохранить индекс в .npz"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez_compressed(
+            path,
+            matrix=self.matrix,
+            idf=self.idf,
+            vocabulary=np.array(list(self.vocabulary), dtype=str),
+            questions=np.array([ex["question"] for ex in self.examples], dtype=str),
+            types=np.array([ex["type"] for ex in self.examples], dtype=str),
+            requests=np.array([ex["request"] for ex in self.examples], dtype=str),
+            source_hash=np.array(source_hash),
+        )
+
+    @classmethod
+    def load(cls, path: Path) -> tuple["ExampleIndex", str]:
+        """Загрузить индекс из .npz
+
+        Returns:
+            tuple: (index, source_hash)
+        """
+        with np.load(path) as data:
+            examples = [
+                {"question": str(q), "type": str(t), "request": str(r)}
+                for q, t, r in zip(data["questions"], data["types"], data["requests"], strict=True)
+            ]
+            vocabulary = {str(gram): i for i, gram in enumerate(data["vocabulary"])}
+            return cls(examples, vocabulary, data["idf"], data["matrix"]), str(data["source_hash"])
+
+
+def read_train_rows(train_file: Path) -> list[dict[str, str]]:
+    """Прочитать примеры {question, type, request} из train.csv"""
+    with open(train_file, encoding="utf-8") as f:
+        reader = csv.DictReader(f, delimiter=";")
+        return [{"question": row["question"], "type": row["type"], "request": row["request"]} for row in reader]
+
+
+def load_or_build_index(train_file: Path, index_file: Path) -> ExampleIndex:
+    """Загрузить индекс с диска или перестроить его, если train.csv изменился"""
+    source_hash = _file_hash(train_file)
+    if index_file.exists():
+        try:
+            index, saved_hash = ExampleIndex.load(index_file)
+            if saved_hash == source_hash:
+                return index
+        except (OSError, ValueError, KeyError):
+            pass
+
+    index = ExampleIndex.build(read_train_rows(train_file))
+    index.save(index_file, source_hash)
+    return index
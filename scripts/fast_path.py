@@ -0,0 +1,197 @@
+"""
+Быстрый путь без LLM для однозначных вопросов
+
+Вопрос сопоставляется с таблицей намерений (ключевые слова + обязательные слоты:
+тикер или номер ордера). Ответ формируется локально только если сработало ровно одно
+намерение и все его слоты извлечены. Во всех остальных случаях возвращается None
+и вопрос уходит в LLM.
+"""
+
+import re
+from collections.abc import Callable
+from dataclasses import dataclass
+
+# Явный тикер вида SBER@MISX, SiZ5@RTSX, BR-10.25@FORTS
+SYMBOL_RE = re.compile(r"\b([A-Za-z][\w.-]*@[A-Z]{3,6})\b")
+# Номер ордера вида ORD123456, ORDERR01
+ORDER_ID_RE = re.compile(r"\b(ORD[A-Z0-9]+)\b")
+
+# Компании, для которых тикер однозначно определяется по названию (основной режим MISX)
+COMPANY_SYMBOLS = {
+    r"сбер": "SBER@MISX",
+    r"газпром(?!\s*нефт)": "GAZP@MISX",
+    r"лукойл": "LKOH@MISX",
+    r"норникел|норильск": "GMKN@MISX",
+    r"яндекс": "YNDX@MISX",
+    r"роснефт": "ROSN@MISX",
+    r"\bвтб\b": "VTBR@MISX",
+    r"сургутнефтегаз": "SNGS@MISX",
+    r"магнит": "MGNT@MISX",
+    r"полюс": "PLZL@MISX",
+    r"аэрофлот": "AFLT@MISX",
+    r"мосбирж": "MOEX@MISX",
+    r"фосагро": "PHOR@MISX",
+    r"русгидро": "HYDR@MISX",
+    r"мечел": "MTLR@MISX",
+    r"ростелеком": "RTKM@MISX",
+    r"новатэк": "NVTK@MISX",
+    r"татнефт": "TATN@MISX",
+    r"алрос": "ALRS@MISX",
+    r"нлмк": "NLMK@MISX",
+}
+_COMPANY_RES = [(re.compile(pattern, re.IGNORECASE), symbol) for pattern, symbol in COMPANY_SYMBOLS.items()]
+
+# Признаки периода или счета: такие вопросы требуют параметров, которые правилами не восстановить
+_PERIOD_RE = re.compile(
+    r"\bза\b|вчера|недел|месяц|квартал|\bгод|январ|феврал|март|апрел|\bма[йя]\b|июн|июл|август|сентябр|октябр|"
+    r"ноябр|декабр|\d{4}|свеч|бар[ыа]?\b|таймфрейм|истори|счет|счёт",
+    re.IGNORECASE,
+)
+# Признаки выставления ордера: "купи ... по текущей цене" - это POST, а не котировка
+_ORDER_ENTRY_RE = re.compile(r"\bкуп|\bпрода|\bвыстав|\bсозда|стоп-|\bлимит", re.IGNORECASE)
+_MARKET_DATA_EXCLUDE = re.compile(f"{_PERIOD_RE.pattern}|{_ORDER_ENTRY_RE.pattern}", re.IGNORECASE)
+
+
+def extract_symbol(question: str) -> str | None:
+    """Извлечь тикер: явный SYMBOL@MIC или однозначное название компании"""
+    symbols = set(SYMBOL_RE.findall(question))
+    if len(symbols) == 1:
+        return symbols.pop()
+    if symbols:
+        return None
+
+    companies = {symbol for company_re, symbol in _COMPANY_RES if company_re.search(question)}
+    return companies.pop() if len(companies) == 1 else None
+
+
+def extract_order_id(question: str) -> str | None:
+    """Извлечь номер ордера (только если он единственный)"""
+    order_ids = set(ORDER_ID_RE.findall(question))
+    return order_ids.pop() if len(order_ids) == 1 else None
+
+
+@dataclass(frozen=True)
+class Intent:
+    """Правило намерения: ключевые слова, исключения и шаблон запроса"""
+
+    name: str
+    method: str
+    pattern: re.Pattern[str]
+    build: Callable[[str], str | None]
+    exclude: re.Pattern[str] | None = None
+
+    def match(self, question: str) -> tuple[str, str] | None:
+        """Вернуть (type, request), если правило однозначно применимо"""
+        if not self.pattern.search(question):
+            return None
+        if self.exclude is not None and self.exclude.search(question):
+            return None
+        request = self.build(question)
+        return (self.method, request) if request else None
+
+
+def _symbol_path(template: str) -> Callable[[str], str | None]:
+    def build(question: str) -> str | None:
+        symbol = extract_symbol(question)
+        return template.format(symbol=symbol) if symbol else None
+
+    return build
+
+
+def _order_path(template: str) -> Callable[[str], str | None]:
+    def build(question: str) -> str | None:
+        order_id = extract_order_id(question)
+        return template.format(order_id=order_id) if order_id else None
+
+    return build
+
+
+def _const_path(path: str) -> Callable[[str], str | None]:
+    return lambda _question: path
+
+
+def _re(pattern: str) -> re.Pattern[str]:
+    return re.compile(pattern, re.IGNORECASE)
+
+
+INTENTS = [
+    Intent(
+        "cancel_order",
+        "DELETE",
+        _re(r"(отмени|отзов|отзыв|удали|сними)\w*\s+(мо[юйи]\s+)?(ордер|заявк|приказ)"),
+        _order_path("/v1/accounts/{{account_id}}/orders/{order_id}"),
+        exclude=_re(r"\?|можно ли|могу ли|ли\s"),
+    ),
+    Intent(
+        "order_details",
+        "GET",
+        _re(r"(детал|подробн|информаци|статус|что не так|что с|состояни)\w*.*(ордер|заявк|приказ)"),
+        _order_path("/v1/accounts/{{account_id}}/orders/{order_id}"),
+        exclude=_re(r"отмени|отзов|отзыв|удали|сними"),
+    ),
+    Intent(
+        "orderbook",
+        "GET",
+        _re(r"стакан|глубин\w* рынка"),
+        _symbol_path("/v1/instruments/{symbol}/orderbook"),
+        exclude=_MARKET_DATA_EXCLUDE,
+    ),
+    Intent(
+        "quote",
+        "GET",
+        _re(r"котировк|актуальн\w* цен|текущ\w* цен|последн\w* цен|цена последней сделки"),
+        _symbol_path("/v1/instruments/{symbol}/quotes/latest"),
+        exclude=_MARKET_DATA_EXCLUDE,
+    ),
+    Intent(
+        "latest_trades",
+        "GET",
+        _re(r"лент[аеуы]|поток\w* сделок|последние сделки"),
+        _symbol_path("/v1/instruments/{symbol}/trades/latest"),
+        exclude=_MARKET_DATA_EXCLUDE,
+    ),
+    Intent(
+        "options",
+        "GET",
+        _re(r"опцион"),
+        _symbol_path("/v1/assets/{symbol}/options"),
+        exclude=_MARKET_DATA_EXCLUDE,
+    ),
+    Intent(
+        "schedule",
+        "GET",
+        _re(r"расписани|во сколько|когда (начинают|открыва|закрыва)"),
+        _symbol_path("/v1/assets/{symbol}/schedule"),
+        exclude=_MARKET_DATA_EXCLUDE,
+    ),
+    Intent(
+        "exchanges",
+        "GET",
+        _re(r"(все|список|перечень|какие)\s+(\w+\s+)?(биржи|бирж\b|торговых площад|торговые площад)"),
+        _const_path("/v1/exchanges"),
+        exclude=SYMBOL_RE,
+    ),
+    Intent(
+        "new_session",
+        "POST",
+        _re(r"\b(нов\w+|создай|получи\w*|запроси\w*)\s+(\w+\s+)?(токен|сесси)"),
+        _const_path("/v1/sessions"),
+    ),
+]
+
+
+def match_intent(question: str) -> tuple[str, str, str] | None:
+    """
+    Сопоставить вопрос с таблицей намерений
+
+    Returns:
+        (intent_name, type, request) если сработало ровно одно правило, иначе None
+    """
+    matches = []
+    for intent in INTENTS:
+        result = intent.match(question)
+        if result is not None:
+            matches.append((intent.name, *result))
+            if len(matches) > 1:
+                return None
+    return matches[0] if matches else None
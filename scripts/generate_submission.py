@@ -14,16 +14,29 @@
     --output-file PATH    Путь к submission.csv (по умолчанию: data/processed/submission.csv)
     --num-examples INT    Количество примеров для few-shot (по умолчанию: 10)
     --batch-size INT      Размер батча для обработки (по умолчанию: 5)
+    --concurrency INT     Количество параллельных запросов к LLM (по умолчанию: 1)
+    --no-cache            Не использовать кэш ответов LLM
+    --journal-file PATH   Журнал готовых ответов (по умолчанию: <output-file>.journal.csv)
+    --resume              Продолжить прерванный запуск, пропуская uid из журнала
+    --example-selection   Выбор few-shot примеров: similar (по похожести) или random (по умолчанию: similar)
+    --index-file PATH     Файл индекса примеров (по умолчанию: data/interim/example_index.npz)
+    --no-fast-path        Отправлять в LLM все вопросы, без правил быстрого пути
 """
 
 import csv
+import io
 import random
+from collections import Counter
+from collections.abc import Callable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, as_completed, wait
 from pathlib import Path
 
 import click
 from tqdm import tqdm  # type: ignore[import-untyped]
 
-from src.app.core.llm import call_llm
+from scripts.example_index import load_or_build_index, read_train_rows
+from scripts.fast_path import match_intent
+from src.app.core.llm import call_llm, llm_latency_stats
 
 
 def calculate_cost(usage: dict, model: str) -> float:
@@ -52,12 +65,8 @@ def calculate_cost(usage: dict, model: str) -> float:
 
 
 def load_train_examples(train_file: Path, num_examples: int = 10) -> list[dict[str, str]]:
-    """Загрузить примеры из train.csv для few-shot learning"""
-    examples = []
-    with open(train_file, encoding="utf-8") as f:
-        reader = csv.DictReader(f, delimiter=";")
-        for row in reader:
-            examples.append({"question": row["question"], "type": row["type"], "request": row["request"]})
+    """Загрузить случайные примеры из train.csv для few-shot learning"""
+    examples = read_train_rows(train_file)
 
     # Берем разнообразные примеры (GET, POST, DELETE)
     get_examples = [e for e in examples if e["type"] == "GET"]
@@ -148,9 +157,13 @@ def parse_llm_response(response: str) -> tuple[str, str]:
     return method, request
 
 
-def generate_api_call(question: str, examples: list[dict[str, str]], model: str) -> tuple[dict[str, str], float]:
+def generate_api_call(
+    question: str, examples: list[dict[str, str]], model: str, use_cache: bool = True
+) -> tuple[dict[str, str], float]:
     """Сгенерировать API запрос для вопроса
 
+    Ответы из кэша LLM ничего не стоят, поэтому для них возвращается стоимость 0.
+
     Returns:
         tuple: (result_dict, cost_in_dollars)
     """
@@ -159,14 +172,14 @@ def generate_api_call(question: str, examples: list[dict[str, str]], model: str)
     messages = [{"role": "user", "content": prompt}]
 
     try:
-        response = call_llm(messages, temperature=0.0, max_tokens=200)
+        response = call_llm(messages, temperature=0.0, max_tokens=200, use_cache=use_cache)
         llm_answer = response["choices"][0]["message"]["content"].strip()
 
         method, request = parse_llm_response(llm_answer)
 
         # Рассчитываем стоимость
         usage = response.get("usage", {})
-        cost = calculate_cost(usage, model)
+        cost = 0.0 if response.get("cached") else calculate_cost(usage, model)
 
         return {"type": method, "request": request}, cost
 
@@ -176,6 +189,63 @@ def generate_api_call(question: str, examples: list[dict[str, str]], model: str)
         return {"type": "GET", "request": "/v1/assets"}, 0.0
 
 
+def iter_api_calls(
+    questions: list[dict[str, str]],
+    select_examples: Callable[[str], list[dict[str, str]]],
+    model: str,
+    concurrency: int = 1,
+    use_cache: bool = True,
+) -> Iterator[tuple[int, dict[str, str], float]]:
+    """Сгенерировать API запросы пулом потоков
+
+    Результаты отдаются по мере готовности в виде (индекс вопроса, результат, стоимость),
+    поэтому порядок нужно восстанавливать по индексу. В работе одновременно держится
+    не больше 2 * concurrency задач, чтобы не создавать futures на весь набор сразу.
+    select_examples подбирает few-shot примеры для конкретного вопроса.
+    """
+    max_pending = max(1, concurrency) * 2
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        pending: dict[Future, int] = {}
+        for idx, item in enumerate(questions):
+            if len(pending) >= max_pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    api_call, cost = future.result()
+                    yield pending.pop(future), api_call, cost
+            question = item["question"]
+            future = executor.submit(generate_api_call, question, select_examples(question), model, use_cache)
+            pending[future] = idx
+
+        for future in as_completed(pending):
+            api_call, cost = future.result()
+            yield pending[future], api_call, cost
+
+
+def load_journal(journal_file: Path) -> dict[str, dict[str, str]]:
+    """Загрузить уже готовые ответы из журнала {uid: {type, request}}
+
+    Последняя строка без перевода строки оборвана при аварийном завершении: она
+    отбрасывается, а файл обрезается до последней полной строки, чтобы новые строки
+    дописывались с начала строки. Строки с неверным числом полей пропускаются.
+    """
+    done: dict[str, dict[str, str]] = {}
+    if not journal_file.exists():
+        return done
+    data = journal_file.read_bytes()
+    complete = data[: data.rfind(b"\n") + 1]
+    if len(complete) != len(data):
+        with open(journal_file, "r+b") as f:
+            f.truncate(len(complete))
+    reader = csv.DictReader(io.StringIO(complete.decode("utf-8"), newline=""), delimiter=";")
+    for row in reader:
+        # Лишние поля попадают под ключ None, недостающие получают значение None
+        if None in row or None in row.values():
+            continue
+        if row["uid"] and row["type"] and row["request"].startswith("/"):
+            done[row["uid"]] = {"type": row["type"], "request": row["request"]}
+    return done
+
+
 @click.command()
 @click.option(
     "--test-file",
@@ -196,8 +266,43 @@ def generate_api_call(question: str, examples: list[dict[str, str]], model: str)
     help="Путь к submission.csv",
 )
 @click.option("--num-examples", type=int, default=10, help="Количество примеров для few-shot")
-def main(test_file: Path, train_file: Path, output_file: Path, num_examples: int) -> None:
+@click.option("--concurrency", type=click.IntRange(min=1), default=1, help="Количество параллельных запросов к LLM")
+@click.option("--no-cache", is_flag=True, default=False, help="Не использовать кэш ответов LLM")
+@click.option(
+    "--journal-file",
+    type=click.Path(path_type=Path),
+    default=None,
+    help="Журнал готовых ответов (по умолчанию: <output-file>.journal.csv)",
+)
+@click.option("--resume", is_flag=True, default=False, help="Продолжить прерванный запуск по журналу")
+@click.option(
+    "--example-selection",
+    type=click.Choice(["similar", "random"]),
+    default="similar",
+    help="Выбор few-shot примеров: ближайшие по TF-IDF или случайные",
+)
+@click.option(
+    "--index-file",
+    type=click.Path(path_type=Path),
+    default="data/interim/example_index.npz",
+    help="Файл индекса примеров для --example-selection similar",
+)
+@click.option("--no-fast-path", is_flag=True, default=False, help="Не использовать правила быстрого пути без LLM")
+def main(  # noqa: C901
+    test_file: Path,
+    train_file: Path,
+    output_file: Path,
+    num_examples: int,
+    concurrency: int,
+    no_cache: bool,
+    journal_file: Path | None,
+    resume: bool,
+    example_selection: str,
+    index_file: Path,
+    no_fast_path: bool,
+) -> None:
     """Генерация submission.csv для хакатона"""
+    from src.app.core.cache import get_llm_cache
     from src.app.core.config import get_settings
 
     click.echo("🚀 Генерация submission файла...")
@@ -208,8 +313,21 @@ def main(test_file: Path, train_file: Path, output_file: Path, num_examples: int
     model = settings.openrouter_model
 
     # Загружаем примеры для few-shot
-    examples = load_train_examples(train_file, num_examples)
-    click.echo(f"✅ Загружено {len(examples)} примеров для few-shot learning")
+    select_examples: Callable[[str], list[dict[str, str]]]
+    if example_selection == "similar":
+        index = load_or_build_index(train_file, index_file)
+        click.echo(f"✅ Индекс из {len(index.examples)} примеров, для каждого вопроса берем {num_examples} ближайших")
+
+        def select_examples(question: str) -> list[dict[str, str]]:
+            return index.top_k(question, num_examples)
+
+    else:
+        examples = load_train_examples(train_file, num_examples)
+        click.echo(f"✅ Загружено {len(examples)} примеров для few-shot learning")
+
+        def select_examples(question: str) -> list[dict[str, str]]:  # noqa: ARG001
+            return examples
+
     click.echo(f"🤖 Используется модель: {model}")
 
     # Читаем тестовый набор
@@ -222,20 +340,62 @@ def main(test_file: Path, train_file: Path, output_file: Path, num_examples: int
 
     click.echo(f"✅ Найдено {len(test_questions)} вопросов для обработки")
 
-    # Генерируем ответы
-    click.echo("\n🤖 Генерация API запросов с помощью LLM...")
-    results = []
-    total_cost = 0.0
-
-    # Используем tqdm с postfix для отображения стоимости
-    progress_bar = tqdm(test_questions, desc="Обработка")
-    for item in progress_bar:
-        api_call, cost = generate_api_call(item["question"], examples, model)
-        total_cost += cost
-        results.append({"uid": item["uid"], "type": api_call["type"], "request": api_call["request"]})
+    # Журнал готовых ответов: каждая строка дописывается сразу, чтобы прерванный запуск можно было продолжить
+    journal_file = journal_file or output_file.with_suffix(".journal.csv")
+    journal_file.parent.mkdir(parents=True, exist_ok=True)
+    done = load_journal(journal_file) if resume else {}
+    answers: list[dict[str, str] | None] = [done.get(item["uid"]) for item in test_questions]
+    todo = [idx for idx, answer in enumerate(answers) if answer is None]
+    if resume:
+        click.echo(f"♻️  Из журнала {journal_file} восстановлено {len(test_questions) - len(todo)} ответов")
 
-        # Обновляем postfix с текущей стоимостью
-        progress_bar.set_postfix({"cost": f"${total_cost:.4f}"})
+    total_cost = 0.0
+    path_counts: Counter[str] = Counter()
+
+    with open(journal_file, "a" if resume else "w", encoding="utf-8", newline="") as journal:
+        journal_writer = csv.DictWriter(journal, fieldnames=["uid", "type", "request"], delimiter=";")
+        if journal.tell() == 0:
+            journal_writer.writeheader()
+
+        # Однозначные вопросы решаем правилами, остальные отправляем в LLM
+        llm_todo = []
+        for idx in todo:
+            match = None if no_fast_path else match_intent(test_questions[idx]["question"])
+            if match is None:
+                llm_todo.append(idx)
+                continue
+            intent, method, request = match
+            answers[idx] = {"type": method, "request": request}
+            journal_writer.writerow({"uid": test_questions[idx]["uid"], **answers[idx]})
+            path_counts[f"rules:{intent}"] += 1
+        journal.flush()
+        if not no_fast_path:
+            click.echo(f"⚡ Быстрым путем без LLM решено {len(todo) - len(llm_todo)} вопросов")
+
+        # Генерируем ответы
+        click.echo(f"\n🤖 Генерация API запросов с помощью LLM (потоков: {concurrency})...")
+
+        # Используем tqdm с postfix для отображения стоимости
+        initial = len(test_questions) - len(llm_todo)
+        with tqdm(total=len(test_questions), initial=initial, desc="Обработка") as progress_bar:
+            questions = [test_questions[idx] for idx in llm_todo]
+            for i, api_call, cost in iter_api_calls(questions, select_examples, model, concurrency, not no_cache):
+                total_cost += cost
+                answers[llm_todo[i]] = api_call
+                journal_writer.writerow({"uid": questions[i]["uid"], **api_call})
+                journal.flush()
+                path_counts["llm"] += 1
+
+                # Обновляем postfix с текущей стоимостью
+                progress_bar.update(1)
+                progress_bar.set_postfix({"cost": f"${total_cost:.4f}"})
+
+    # Сохраняем исходный порядок uid из test.csv
+    results = [
+        {"uid": item["uid"], "type": answer["type"], "request": answer["request"]}
+        for item, answer in zip(test_questions, answers, strict=True)
+        if answer is not None
+    ]
 
     # Записываем в submission.csv
     click.echo(f"\n💾 Сохранение результатов в {output_file}...")
@@ -246,9 +406,12 @@ def main(test_file: Path, train_file: Path, output_file: Path, num_examples: int
         writer.writeheader()
         writer.writerows(results)
 
+    # submission.csv записан целиком - журнал больше не нужен
+    journal_file.unlink(missing_ok=True)
+
     click.echo(f"✅ Готово! Создано {len(results)} записей в {output_file}")
     click.echo(f"\n💰 Общая стоимость генерации: ${total_cost:.4f}")
-    click.echo(f"   Средняя стоимость на запрос: ${total_cost / len(results):.6f}")
+    click.echo(f"   Средняя стоимость на запрос к LLM: ${total_cost / max(path_counts['llm'], 1):.6f}")
     click.echo("\n📊 Статистика по типам запросов:")
     type_counts: dict[str, int] = {}
     for r in results:
@@ -256,6 +419,35 @@ def main(test_file: Path, train_file: Path, output_file: Path, num_examples: int
     for method, count in sorted(type_counts.items()):
         click.echo(f"  {method}: {count}")
 
+    click.echo("\n🛣  Пути обработки:")
+    processed = max(sum(path_counts.values()), 1)
+    for path_name, count in path_counts.most_common():
+        click.echo(f"  {path_name}: {count} ({count / processed * 100:.1f}%)")
+
+    if settings.llm_cache_enabled and not no_cache:
+        cache_stats = get_llm_cache().stats()
+        click.echo("\n🗄  Кэш LLM:")
+        click.echo(
+            f"  Попаданий: {cache_stats['hits']}, промахов: {cache_stats['misses']} "
+            f"(hit rate {cache_stats['hit_rate'] * 100:.1f}%)"
+        )
+        click.echo(f"  Записей: {cache_stats['entries']}, размер: {cache_stats['size_bytes'] / 1024:.1f} KB")
+
+    latency = llm_latency_stats()
+    if "total" in latency["phases"]:
+        total = latency["phases"]["total"]
+        counters = latency["counters"]
+        click.echo("\n⏱  Задержки запросов к LLM:")
+        click.echo(
+            f"  Запросов: {total['count']}, p50 {total['p50_ms']:g} мс, p90 {total['p90_ms']:g} мс, "
+            f"макс {total['max_ms']:.0f} мс"
+        )
+        click.echo(
+            f"  Новых соединений: {counters.get('new_connections', 0)}, "
+            f"переиспользовано: {counters.get('reused_connections', 0)}, "
+            f"доля установки соединений: {latency['handshake_share'] * 100:.1f}%"
+        )
+
 
 if __name__ == "__main__":
     main()
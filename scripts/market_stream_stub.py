@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Локальная замена потокового API Finam для разработки и проверки MarketStream.
+
+Принимает подписки QUOTES и ORDER_BOOK и рассылает случайное блуждание цен
+в том же формате сообщений, что и настоящий сервер.
+
+Использование:
+    python scripts/market_stream_stub.py [OPTIONS]
+
+Примеры:
+    # Запустить на ws://localhost:8765, обновления 5 раз в секунду
+    python scripts/market_stream_stub.py --interval 0.2
+
+    # Подключить клиент к заглушке
+    FINAM_STREAM_URL=ws://localhost:8765 poetry run chat-cli --watch SBER@MISX
+"""
+
+import asyncio
+import contextlib
+import json
+import random
+from datetime import UTC, datetime
+
+import click
+from websockets.asyncio.server import ServerConnection, serve
+from websockets.exceptions import ConnectionClosed
+
+BASE_PRICES = {"SBER@MISX": 300.0, "GAZP@MISX": 130.0, "YNDX@MISX": 4000.0, "LKOH@MISX": 7000.0}
+
+
+def _value(number: float) -> dict[str, str]:
+    return {"value": f"{number:.2f}"}
+
+
+def _now() -> str:
+    return datetime.now(UTC).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+class MarketSimulator:
+    """Случайное блуждание цены и стакан вокруг нее для каждого инструмента"""
+
+    def __init__(self, step: float = 0.1) -> None:
+        self.step = step
+        self.prices: dict[str, float] = {}
+        self.levels: dict[str, set[tuple[str, str]]] = {}
+
+    def tick(self, symbol: str) -> float:
+        price = self.prices.get(symbol, BASE_PRICES.get(symbol, 100.0))
+        price = max(0.01, price * (1 + random.gauss(0, self.step / 100)))
+        self.prices[symbol] = price
+        return price
+
+    def quote(self, symbol: str) -> dict:
+        price = self.tick(symbol)
+        spread = price * 0.0005
+        return {
+            "symbol": symbol,
+            "timestamp": _now(),
+            "ask": _value(price + spread),
+            "ask_size": _value(random.randint(1, 500)),
+            "bid": _value(price - spread),
+            "bid_size": _value(random.randint(1, 500)),
+            "last": _value(price),
+            "last_size": _value(random.randint(1, 50)),
+        }
+
+    def order_book(self, symbol: str, depth: int = 10) -> dict:
+        price = self.prices.get(symbol) or self.tick(symbol)
+        tick = round(price * 0.0005, 2) or 0.01
+        levels = {
+            (side, _value(price + sign * level * tick)["value"])
+            for level in range(1, depth + 1)
+            for side, sign in (("sell_size", 1), ("buy_size", -1))
+        }
+        # Уровни, ушедшие из стакана после сдвига цены, удаляются явно
+        removed = self.levels.get(symbol, set()) - levels
+        self.levels[symbol] = levels
+        rows = [
+            {"price": {"value": level}, side: _value(0), "action": "ACTION_REMOVE", "mpid": "", "timestamp": _now()}
+            for side, level in sorted(removed)
+        ]
+        rows += [
+            {
+                "price": {"value": level},
+                side: _value(random.randint(1, 1000)),
+                "action": "ACTION_UPDATE",
+                "mpid": "",
+                "timestamp": _now(),
+            }
+            for side, level in sorted(levels)
+        ]
+        return {"symbol": symbol, "rows": rows}
+
+
+async def handle(connection: ServerConnection, simulator: MarketSimulator, interval: float) -> None:
+    subscriptions: set[tuple[str, str]] = set()
+
+    async def publish() -> None:
+        while True:
+            for kind, symbol in sorted(subscriptions):
+                if kind == "QUOTES":
+                    payload = {"quote": [simulator.quote(symbol)]}
+                else:
+                    payload = {"order_book": [simulator.order_book(symbol)]}
+                message = {
+                    "type": "DATA",
+                    "subscription_type": kind,
+                    "subscription_key": f"{kind}:{symbol}",
+                    "timestamp": _now(),
+                    "payload": payload,
+                }
+                await connection.send(json.dumps(message))
+            await asyncio.sleep(interval)
+
+    publisher = asyncio.create_task(publish())
+    try:
+        async for raw in connection:
+            request = json.loads(raw)
+            keys = {(request.get("type"), symbol) for symbol in request.get("data", {}).get("symbols", [])}
+            if request.get("action") == "SUBSCRIBE":
+                subscriptions |= keys
+            elif request.get("action") == "UNSUBSCRIBE":
+                subscriptions -= keys
+            await connection.send(json.dumps({"type": "EVENT", "event": request.get("action"), "data": request}))
+    except ConnectionClosed:
+        pass
+    finally:
+        publisher.cancel()
+        with contextlib.suppress(asyncio.CancelledError, ConnectionClosed):
+            await publisher
+
+
+async def run_server(host: str, port: int, interval: float) -> None:
+    simulator = MarketSimulator()
+    async with serve(lambda connection: handle(connection, simulator, interval), host, port):
+        click.echo(f"📡 Заглушка потокового API: ws://{host}:{port}")
+        await asyncio.Future()
+
+
+@click.command()
+@click.option("--host", default="localhost", show_default=True, help="Адрес для прослушивания")
+@click.option("--port", default=8765, show_default=True, help="Порт")
+@click.option("--interval", default=0.5, show_default=True, help="Интервал между обновлениями (секунды)")
+def main(host: str, port: int, interval: float) -> None:
+    """Запустить локальную заглушку потокового API"""
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(run_server(host, port, interval))
+
+
+if __name__ == "__main__":
+    main()
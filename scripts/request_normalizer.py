@@ -0,0 +1,104 @@
+"""
+Нормализация API запросов для сравнения предсказаний с эталоном
+
+Общая для calculate_metrics.py и evaluate.py. Приводит запрос к каноническому виду:
+
+1. Убирает HTTP метод из начала строки
+2. Заменяет ID аккаунтов после "/accounts/" на "<some_id>"
+3. Канонизирует query-параметры: декодирует URL-кодирование, приводит метки
+   времени RFC 3339 / ISO 8601 к UTC (2025-01-01T00:00:00+03:00 -> 2024-12-31T21:00:00Z)
+   и сортирует параметры по имени (порядок значений повторяющихся параметров сохраняется)
+
+Регулярные выражения скомпилированы один раз, результаты кэшируются: одинаковые
+запросы (типичные предсказания, эталон при повторных прогонах) нормализуются один раз.
+"""
+
+import re
+from datetime import UTC, datetime
+from functools import lru_cache
+from urllib.parse import quote, unquote
+
+# Сколько различных запросов хранить в кэше нормализации
+CACHE_SIZE = 65536
+
+_METHOD_RE = re.compile(r"^(GET|POST|PUT|DELETE|PATCH|HEAD|OPTIONS)\s+", re.IGNORECASE)
+_ACCOUNT_RE = re.compile(r"/accounts/[^/]+/")
+# 2025-01-01T10:00:00Z, 2025-01-01 10:00:00.5+03:00, 2025-01-01T10:00
+_TIMESTAMP_RE = re.compile(r"^\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(:\d{2}(\.\d+)?)?(Z|[+-]\d{2}:?\d{2})?$", re.IGNORECASE)
+# Символы, которые не кодируются в каноническом query (читаемый вывод в отчетах об ошибках)
+_QUERY_SAFE = "/:@,.-_~{}<>"
+
+
+def _canonical_timestamp(value: str) -> str:
+    """Метку времени привести к UTC в формате RFC 3339 с Z, прочие значения вернуть как есть"""
+    if not _TIMESTAMP_RE.match(value):
+        return value
+    try:
+        moment = datetime.fromisoformat(value.upper().replace(" ", "T"))
+    except ValueError:
+        return value
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(UTC).replace(tzinfo=None)
+        return moment.isoformat() + "Z"
+    return moment.isoformat()
+
+
+def canonical_query(query: str) -> str:
+    """
+    Канонический вид query-строки (без "?")
+
+    Пустые части ("a=1&&b=2") отбрасываются. "+" не считается пробелом: в запросах
+    к TradeAPI он встречается в смещении часового пояса.
+    """
+    params = []
+    for part in query.split("&"):
+        if not part:
+            continue
+        key, _, value = part.partition("=")
+        params.append((unquote(key), _canonical_timestamp(unquote(value))))
+    # sorted устойчив: значения повторяющихся параметров остаются в исходном порядке
+    params.sort(key=lambda param: param[0])
+    return "&".join(f"{quote(key, safe=_QUERY_SAFE)}={quote(value, safe=_QUERY_SAFE)}" for key, value in params)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _normalize(request: str, method: str | None) -> str:
+    # Если метод указан отдельно, убираем его из начала request если он там есть
+    if method and request.upper().startswith(method.upper()):
+        request = request[len(method) :].lstrip()
+
+    # Убираем HTTP метод из начала строки, если он там есть
+    request = _METHOD_RE.sub("", request).lstrip()
+
+    path, question, query = request.partition("?")
+    # Заменяем ID аккаунтов на плейсхолдер: /accounts/{любой_ид}/ на /accounts/<some_id>/
+    path = _ACCOUNT_RE.sub("/accounts/<some_id>/", unquote(path) if "%" in path else path)
+    if not question:
+        return path
+    query = canonical_query(query)
+    return f"{path}?{query}" if query else path
+
+
+def normalize_api_request(request: str, method: str | None = None) -> str:
+    """
+    Нормализовать API запрос для гибкого сравнения
+
+    Args:
+        request: API запрос (может начинаться с HTTP метода или сразу с пути)
+        method: HTTP метод (если известен отдельно)
+
+    Returns:
+        Нормализованный запрос
+    """
+    return _normalize(request, method or None)
+
+
+def cache_info() -> dict[str, int]:
+    """Статистика кэша нормализации: hits, misses, size"""
+    info = _normalize.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize}
+
+
+def clear_cache() -> None:
+    """Очистить кэш нормализации (для бенчмарков)"""
+    _normalize.cache_clear()
@@ -1,3 +1,5 @@
-from .finam_client import FinamAPIClient
+from .finam_client import AsyncFinamAPIClient, FinamAPIClient
+from .market_stream import MarketStream
+from .order_book import OrderBook
 
-__all__ = ["FinamAPIClient"]
+__all__ = ["AsyncFinamAPIClient", "FinamAPIClient", "MarketStream", "OrderBook"]
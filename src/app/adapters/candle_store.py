@@ -0,0 +1,309 @@
+"""
+Локальное хранилище свечей с инкрементальной синхронизацией
+
+Свечи хранятся на диске по одному файлу .npy на пару инструмент x таймфрейм
+(структурированный массив, отсортированный по времени). Отдельно хранится покрытие -
+интервалы времени, которые уже были загружены целиком (в них могут быть пустые
+периоды: выходные, клиринг). При запросе загружаются только непокрытые промежутки,
+длинные промежутки разбиваются на страницы. Результат читается через memory map без копирования.
+
+Пустая страница считается покрытой, только если у инструмента уже есть более ранние свечи
+(праздники, остановка торгов). Пустой ответ до начала торгов или по неверному тикеру не
+сохраняется в покрытии и будет запрошен снова.
+
+Числа в свечах хранятся как float, поэтому при выдаче они форматируются единообразно
+(кратчайшая запись: "270.50" -> "270.5", "1000" -> "1000"); normalize_bars_response
+приводит к тому же виду ответ API, полученный без хранилища.
+"""
+
+import asyncio
+import json
+import os
+import re
+import time
+from collections.abc import Awaitable, Callable
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+BAR_DTYPE = np.dtype([
+    ("ts", "<i8"),
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("volume", "<f8"),
+])
+
+# Длительность свечи в секундах по таймфрейму (без префикса TIME_FRAME_)
+TIMEFRAME_SECONDS: dict[str, int] = {
+    "M1": 60,
+    "M5": 5 * 60,
+    "M15": 15 * 60,
+    "M30": 30 * 60,
+    "H1": 3600,
+    "H2": 2 * 3600,
+    "H4": 4 * 3600,
+    "H8": 8 * 3600,
+    "D": 86400,
+    "W": 7 * 86400,
+    "MN": 31 * 86400,
+    "QR": 92 * 86400,
+}
+
+# Максимальный интервал одного запроса к API (страница) по таймфрейму
+PAGE_SECONDS: dict[str, int] = {
+    "M1": 7 * 86400,
+    "M5": 30 * 86400,
+    "M15": 30 * 86400,
+    "M30": 30 * 86400,
+    "H1": 30 * 86400,
+    "H2": 30 * 86400,
+    "H4": 30 * 86400,
+    "H8": 90 * 86400,
+    "D": 365 * 86400,
+    "W": 5 * 365 * 86400,
+    "MN": 10 * 365 * 86400,
+    "QR": 10 * 365 * 86400,
+}
+
+_VALUE_FIELDS = ("open", "high", "low", "close", "volume")
+
+FetchBars = Callable[[str, str, str, str], Awaitable[dict[str, Any]]]
+
+_UNSAFE_CHARS_RE = re.compile(r"[^\w@.-]")
+
+
+def normalize_timeframe(timeframe: str) -> str:
+    """TIME_FRAME_D -> D"""
+    return timeframe.upper().removeprefix("TIME_FRAME_")
+
+
+def parse_timestamp(value: str) -> int:
+    """ISO 8601 (с Z или смещением) -> unix время в секундах"""
+    dt = datetime.fromisoformat(value)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=UTC)
+    return int(dt.timestamp())
+
+
+def format_timestamp(ts: int) -> str:
+    """unix время в секундах -> ISO 8601 с Z"""
+    return datetime.fromtimestamp(ts, UTC).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _decimal(value: Any) -> float:  # noqa: ANN401
+    """Finam отдает числа как {"value": "123.45"}"""
+    if isinstance(value, dict):
+        value = value.get("value")
+    return float(value) if value not in (None, "") else float("nan")
+
+
+def bars_to_array(bars: list[dict[str, Any]]) -> np.ndarray:
+    """Преобразовать список свечей из ответа API в структурированный массив"""
+    array = np.empty(len(bars), dtype=BAR_DTYPE)
+    for i, bar in enumerate(bars):
+        array[i] = (
+            parse_timestamp(bar["timestamp"]),
+            _decimal(bar.get("open")),
+            _decimal(bar.get("high")),
+            _decimal(bar.get("low")),
+            _decimal(bar.get("close")),
+            _decimal(bar.get("volume")),
+        )
+    return array
+
+
+def format_decimal(value: float) -> str:
+    """Кратчайшая десятичная запись числа без экспоненты и лишних нулей: 270.5, 1000, 0.0001"""
+    return np.format_float_positional(value, trim="-")
+
+
+def array_to_bars(array: np.ndarray) -> list[dict[str, Any]]:
+    """Обратное преобразование в формат ответа API (числа в виде format_decimal)"""
+    return [
+        {
+            "timestamp": format_timestamp(int(row["ts"])),
+            **{field: {"value": format_decimal(float(row[field]))} for field in _VALUE_FIELDS},
+        }
+        for row in array
+    ]
+
+
+def normalize_bars_response(response: dict[str, Any]) -> dict[str, Any]:
+    """
+    Привести ответ /bars к виду, который выдает хранилище
+
+    Ответы с ошибкой и ответы неожиданного формата возвращаются как есть.
+    """
+    if "error" in response or not isinstance(response.get("bars"), list):
+        return response
+    try:
+        bars = array_to_bars(bars_to_array(response["bars"]))
+    except (KeyError, TypeError, ValueError):
+        return response
+    return {**response, "bars": bars}
+
+
+def _subtract_intervals(start: int, end: int, covered: list[list[int]]) -> list[tuple[int, int]]:
+    """Части [start, end], не покрытые отсортированными интервалами covered"""
+    gaps = []
+    cursor = start
+    for c_start, c_end in covered:
+        if c_end < cursor:
+            continue
+        if c_start > end:
+            break
+        if c_start > cursor:
+            gaps.append((cursor, min(c_start, end)))
+        cursor = max(cursor, c_end)
+        if cursor >= end:
+            break
+    if cursor < end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+def _merge_intervals(intervals: list[list[int]]) -> list[list[int]]:
+    merged: list[list[int]] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+class CandleStore:
+    """Хранилище свечей на диске: {root}/{symbol}/{timeframe}.npy + покрытие в .coverage.json"""
+
+    def __init__(self, root: str | Path) -> None:
+        self.root = Path(root)
+        self._locks: dict[tuple[str, str], asyncio.Lock] = {}
+        self.fetched_pages = 0
+
+    def _paths(self, symbol: str, timeframe: str) -> tuple[Path, Path]:
+        directory = self.root / _UNSAFE_CHARS_RE.sub("_", symbol)
+        return directory / f"{timeframe}.npy", directory / f"{timeframe}.coverage.json"
+
+    def _load_coverage(self, path: Path) -> list[list[int]]:
+        if not path.exists():
+            return []
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def read(self, symbol: str, timeframe: str, start: int | None = None, end: int | None = None) -> np.ndarray:
+        """Прочитать свечи из хранилища (view на memory map, без копирования)"""
+        bars_path, _ = self._paths(symbol, normalize_timeframe(timeframe))
+        if not bars_path.exists():
+            return np.empty(0, dtype=BAR_DTYPE)
+        bars = np.load(bars_path, mmap_mode="r")
+        lo = 0 if start is None else int(np.searchsorted(bars["ts"], start, side="left"))
+        hi = len(bars) if end is None else int(np.searchsorted(bars["ts"], end, side="right"))
+        return bars[lo:hi]
+
+    async def get(
+        self, fetch: FetchBars, symbol: str, timeframe: str, start: int, end: int
+    ) -> tuple[np.ndarray, dict[str, Any] | None]:
+        """
+        Получить свечи за [start, end]: догрузить недостающее и прочитать из хранилища
+
+        Хвост периода после последней закрытой свечи запрашивается напрямую и не сохраняется.
+
+        Returns:
+            tuple: (массив свечей, ответ API с ошибкой или None)
+        """
+        error = await self.sync(fetch, symbol, timeframe, start, end)
+        if error is not None:
+            return np.empty(0, dtype=BAR_DTYPE), error
+
+        tf = normalize_timeframe(timeframe)
+        bars = self.read(symbol, tf, start, end)
+        closed_until = int(time.time()) - TIMEFRAME_SECONDS.get(tf, 60)
+        if end <= closed_until:
+            return bars, None
+
+        tail_start = max(start, closed_until)
+        response = await fetch(symbol, f"TIME_FRAME_{tf}", format_timestamp(tail_start), format_timestamp(end))
+        if "error" in response:
+            return np.empty(0, dtype=BAR_DTYPE), response
+        tail = bars_to_array(response.get("bars", []))
+        combined = np.concatenate([bars[bars["ts"] < tail_start], tail])
+        return combined[np.argsort(combined["ts"], kind="stable")], None
+
+    async def sync(self, fetch: FetchBars, symbol: str, timeframe: str, start: int, end: int) -> dict[str, Any] | None:
+        """
+        Догрузить непокрытые промежутки [start, end]
+
+        Args:
+            fetch: Корутина (symbol, timeframe, start_iso, end_iso) -> ответ /bars
+            symbol: Тикер
+            timeframe: Таймфрейм (D или TIME_FRAME_D)
+            start: Начало периода (unix секунды)
+            end: Конец периода (unix секунды)
+
+        Returns:
+            None при успехе или ответ API с ошибкой (покрытие для него не обновляется)
+        """
+        tf = normalize_timeframe(timeframe)
+        # Текущая незакрытая свеча может измениться - ее период не считаем покрытым
+        end = min(end, int(time.time()) - TIMEFRAME_SECONDS.get(tf, 60))
+        if end <= start:
+            return None
+
+        lock = self._locks.setdefault((symbol, tf), asyncio.Lock())
+        async with lock:
+            bars_path, coverage_path = self._paths(symbol, tf)
+            coverage = self._load_coverage(coverage_path)
+            gaps = _subtract_intervals(start, end, coverage)
+            if not gaps:
+                return None
+
+            page = PAGE_SECONDS.get(tf, 30 * 86400)
+            new_parts = []
+            error = None
+            # Самая ранняя известная свеча: пустые страницы после нее - настоящие пропуски торгов
+            stored = self.read(symbol, tf)
+            first_ts = int(stored["ts"][0]) if len(stored) else None
+            for gap_start, gap_end in gaps:
+                for page_start in range(gap_start, gap_end, page):
+                    page_end = min(page_start + page, gap_end)
+                    response = await fetch(
+                        symbol, f"TIME_FRAME_{tf}", format_timestamp(page_start), format_timestamp(page_end)
+                    )
+                    self.fetched_pages += 1
+                    if "error" in response:
+                        error = response
+                        break
+                    bars = bars_to_array(response.get("bars", []))
+                    if len(bars):
+                        new_parts.append(bars)
+                        page_first = int(bars["ts"].min())
+                        first_ts = page_first if first_ts is None else min(first_ts, page_first)
+                        coverage.append([page_start, page_end])
+                    elif first_ts is not None and first_ts < page_start:
+                        coverage.append([page_start, page_end])
+                    # Иначе пустая страница до первой известной свечи (до начала торгов или неверный
+                    # тикер) не помечается покрытой: данные могут появиться, повторим запрос в следующий раз
+                if error is not None:
+                    break
+
+            self._write(bars_path, coverage_path, new_parts, _merge_intervals(coverage))
+            return error
+
+    def _write(self, bars_path: Path, coverage_path: Path, parts: list[np.ndarray], coverage: list[list[int]]) -> None:
+        """Слить новые свечи с сохраненными и атомарно перезаписать файлы"""
+        bars_path.parent.mkdir(parents=True, exist_ok=True)
+        if parts:
+            existing = np.load(bars_path) if bars_path.exists() else np.empty(0, dtype=BAR_DTYPE)
+            combined = np.concatenate([*parts, existing])
+            # При дублях по времени оставляем свежезагруженную свечу (она идет раньше в combined)
+            _, first = np.unique(combined["ts"], return_index=True)
+            tmp_path = bars_path.with_suffix(".tmp.npy")
+            np.save(tmp_path, combined[first])
+            os.replace(tmp_path, bars_path)
+
+        tmp_coverage = coverage_path.with_suffix(".tmp")
+        tmp_coverage.write_text(json.dumps(coverage), encoding="utf-8")
+        os.replace(tmp_coverage, coverage_path)
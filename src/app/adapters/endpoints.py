@@ -0,0 +1,57 @@
+"""
+Классификация путей Finam TradeAPI по шаблонам эндпоинтов
+
+Позволяет задавать политики (таймауты, кэширование и т.д.) для эндпоинта,
+а не для конкретного URL с тикером или номером счета.
+"""
+
+import re
+
+# (имя эндпоинта, шаблон пути). Порядок важен: более специфичные шаблоны идут раньше
+ENDPOINT_TEMPLATES: list[tuple[str, str]] = [
+    ("exchanges", "/v1/exchanges"),
+    ("assets", "/v1/assets"),
+    ("asset_params", "/v1/assets/{symbol}/params"),
+    ("asset_schedule", "/v1/assets/{symbol}/schedule"),
+    ("asset_options", "/v1/assets/{symbol}/options"),
+    ("asset", "/v1/assets/{symbol}"),
+    ("quotes", "/v1/instruments/{symbol}/quotes/latest"),
+    ("orderbook", "/v1/instruments/{symbol}/orderbook"),
+    ("latest_trades", "/v1/instruments/{symbol}/trades/latest"),
+    ("bars", "/v1/instruments/{symbol}/bars"),
+    ("orders", "/v1/accounts/{account_id}/orders"),
+    ("order", "/v1/accounts/{account_id}/orders/{order_id}"),
+    ("account_trades", "/v1/accounts/{account_id}/trades"),
+    ("transactions", "/v1/accounts/{account_id}/transactions"),
+    ("account", "/v1/accounts/{account_id}"),
+    ("sessions", "/v1/sessions"),
+    ("session_details", "/v1/sessions/details"),
+]
+
+_PLACEHOLDER_RE = re.compile(r"\{\w+\}")
+
+
+def _compile_template(template: str) -> re.Pattern[str]:
+    """Превратить шаблон пути в регулярное выражение: {placeholder} -> один сегмент пути"""
+    parts = _PLACEHOLDER_RE.split(template)
+    return re.compile("^" + "[^/]+".join(re.escape(part) for part in parts) + "/?$")
+
+
+_ENDPOINT_RES = [(name, _compile_template(template)) for name, template in ENDPOINT_TEMPLATES]
+
+
+def match_endpoint(path: str) -> str | None:
+    """
+    Определить эндпоинт по пути запроса
+
+    Args:
+        path: Путь API, возможно с query строкой (например, /v1/instruments/SBER@MISX/bars?timeframe=...)
+
+    Returns:
+        Имя эндпоинта из ENDPOINT_TEMPLATES или None, если путь не распознан
+    """
+    path = path.split("?", 1)[0]
+    for name, pattern in _ENDPOINT_RES:
+        if pattern.match(path):
+            return name
+    return None
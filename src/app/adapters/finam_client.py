@@ -1,58 +1,239 @@
 """
 Клиент для работы с Finam TradeAPI
 https://tradeapi.finam.ru/
+
+AsyncFinamAPIClient - асинхронный клиент на httpx с пулом соединений, keep-alive и HTTP/2.
+FinamAPIClient - синхронный фасад над ним для CLI, Streamlit и скриптов.
 """
 
+import asyncio
+import contextlib
+import importlib.util
 import os
-from typing import Any
+import queue
+import threading
+from collections.abc import Awaitable, Callable, Coroutine, Iterable
+from typing import Any, TypeVar
+from urllib.parse import urlencode
 
-import requests
+import httpx
 
+from .candle_store import (
+    TIMEFRAME_SECONDS,
+    CandleStore,
+    array_to_bars,
+    normalize_bars_response,
+    normalize_timeframe,
+    parse_timestamp,
+)
+from .endpoints import match_endpoint
+from .market_stream import Listener, MarketStream
+from .rate_limit import RetryPolicy, TokenBucket
+from .response_cache import ResponseCache
 
-class FinamAPIClient:
+T = TypeVar("T")
+
+# Таймауты (в секундах) для отдельных эндпоинтов, для остальных - DEFAULT_TIMEOUT
+DEFAULT_TIMEOUT = 30.0
+CONNECT_TIMEOUT = 5.0
+ENDPOINT_TIMEOUTS: dict[str, float] = {
+    "quotes": 5.0,
+    "orderbook": 5.0,
+    "latest_trades": 10.0,
+    "bars": 60.0,
+    "account_trades": 60.0,
+    "transactions": 60.0,
+}
+
+
+def _http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+class AsyncFinamAPIClient:
     """
-    Клиент для взаимодействия с Finam TradeAPI
+    Асинхронный клиент для взаимодействия с Finam TradeAPI
 
     Документация: https://tradeapi.finam.ru/
     """
 
-    def __init__(self, access_token: str | None = None, base_url: str | None = None) -> None:
+    def __init__(
+        self,
+        access_token: str | None = None,
+        base_url: str | None = None,
+        *,
+        max_connections: int | None = None,
+        max_keepalive_connections: int | None = None,
+        keepalive_expiry: float | None = None,
+        timeouts: dict[str, float] | None = None,
+        http2: bool | None = None,
+        bulk_concurrency: int | None = None,
+        cache: bool | None = None,
+        cache_max_entries: int | None = None,
+        cache_ttls: dict[str, float] | None = None,
+        rate_limit_per_minute: float | None = None,
+        rate_limit_burst: int | None = None,
+        max_retries: int | None = None,
+        candle_store: CandleStore | str | None = None,
+        market_stream: MarketStream | None = None,
+    ) -> None:
         """
         Инициализация клиента
 
         Args:
             access_token: Токен доступа к API (из переменной окружения FINAM_ACCESS_TOKEN)
             base_url: Базовый URL API (по умолчанию из документации)
+            max_connections: Максимум одновременных соединений (FINAM_MAX_CONNECTIONS, по умолчанию 20)
+            max_keepalive_connections: Сколько соединений держать открытыми (FINAM_MAX_KEEPALIVE, по умолчанию 10)
+            keepalive_expiry: Время жизни простаивающего соединения в секундах (FINAM_KEEPALIVE_EXPIRY, 30)
+            timeouts: Переопределение таймаутов по эндпоинтам, ключ "default" - для остальных
+            http2: Использовать HTTP/2 (по умолчанию - если установлен пакет h2)
+            bulk_concurrency: Максимум параллельных запросов в пакетных методах (FINAM_BULK_CONCURRENCY, 8)
+            cache: Кэшировать GET ответы в памяти (FINAM_CACHE_ENABLED, по умолчанию включено)
+            cache_max_entries: Максимум ответов в кэше (FINAM_CACHE_MAX_ENTRIES, по умолчанию 1024)
+            cache_ttls: Переопределение TTL кэша по эндпоинтам (см. response_cache.DEFAULT_TTLS)
+            rate_limit_per_minute: Квота запросов в минуту (FINAM_RATE_LIMIT_PER_MINUTE, 200; 0 - без ограничения)
+            rate_limit_burst: Допустимый всплеск запросов (FINAM_RATE_LIMIT_BURST, по умолчанию 10)
+            max_retries: Максимум повторов идемпотентного запроса (FINAM_MAX_RETRIES, по умолчанию 3)
+            candle_store: Локальное хранилище свечей или путь к нему (FINAM_CANDLE_STORE_DIR,
+                по умолчанию data/interim/candles; пустая строка - без хранилища)
+            market_stream: Потоковые котировки и стаканы (по умолчанию создается при первой подписке)
         """
         self.access_token = access_token or os.getenv("FINAM_ACCESS_TOKEN", "")
         self.base_url = base_url or os.getenv("FINAM_API_BASE_URL", "https://api.finam.ru")
-        self.session = requests.Session()
+        self.timeouts = {"default": DEFAULT_TIMEOUT, **ENDPOINT_TIMEOUTS, **(timeouts or {})}
+        self.bulk_concurrency = bulk_concurrency or int(os.getenv("FINAM_BULK_CONCURRENCY", "8"))
+        if cache is None:
+            cache = os.getenv("FINAM_CACHE_ENABLED", "true").lower() in {"1", "true", "yes"}
+        self.cache = (
+            ResponseCache(cache_max_entries or int(os.getenv("FINAM_CACHE_MAX_ENTRIES", "1024")), cache_ttls)
+            if cache
+            else None
+        )
+
+        if rate_limit_per_minute is None:
+            rate_limit_per_minute = float(os.getenv("FINAM_RATE_LIMIT_PER_MINUTE", "200"))
+        burst = rate_limit_burst or int(os.getenv("FINAM_RATE_LIMIT_BURST", "10"))
+        self.rate_limiter = TokenBucket(rate_limit_per_minute / 60, burst) if rate_limit_per_minute > 0 else None
+        if max_retries is None:
+            max_retries = int(os.getenv("FINAM_MAX_RETRIES", "3"))
+        self.retry_policy = RetryPolicy(max_retries=max_retries)
+        self.retry_count = 0
 
+        if candle_store is None:
+            candle_store = os.getenv("FINAM_CANDLE_STORE_DIR", "data/interim/candles")
+        if isinstance(candle_store, str):
+            candle_store = CandleStore(candle_store) if candle_store else None
+        self.candle_store = candle_store
+        self.market_stream = market_stream
+        self.stream_hits = 0
+
+        limits = httpx.Limits(
+            max_connections=max_connections or int(os.getenv("FINAM_MAX_CONNECTIONS", "20")),
+            max_keepalive_connections=max_keepalive_connections or int(os.getenv("FINAM_MAX_KEEPALIVE", "10")),
+            keepalive_expiry=keepalive_expiry or float(os.getenv("FINAM_KEEPALIVE_EXPIRY", "30")),
+        )
+        headers = {}
         if self.access_token:
-            self.session.headers.update({
+            headers = {
                 "Authorization": f"Bearer {self.access_token}",
                 "Content-Type": "application/json",
-            })
+            }
+        self.client = httpx.AsyncClient(
+            headers=headers,
+            limits=limits,
+            http2=_http2_available() if http2 is None else http2,
+            timeout=self.timeouts["default"],
+        )
 
-    def execute_request(self, method: str, path: str, **kwargs: Any) -> dict[str, Any]:  # noqa: ANN401
+    def timeout_for(self, path: str) -> float:
+        """Таймаут для запроса по пути (с учетом эндпоинта)"""
+        endpoint = match_endpoint(path)
+        return self.timeouts.get(endpoint or "default", self.timeouts["default"])
+
+    async def execute_request(self, method: str, path: str, **kwargs: Any) -> dict[str, Any]:  # noqa: ANN401
         """
         Выполнить HTTP запрос к Finam TradeAPI
 
         Args:
             method: HTTP метод (GET, POST, DELETE и т.д.)
             path: Путь API (например, /v1/instruments/SBER@MISX/quotes/latest)
-            **kwargs: Дополнительные параметры для requests
+            **kwargs: Дополнительные параметры для httpx (params, json, timeout и т.д.)
 
         Returns:
-            Ответ API в виде словаря
+            Ответ API в виде словаря. Ошибки не выбрасываются, а возвращаются
+            словарем с ключом "error" (и "status_code"/"details" для HTTP ошибок)
+
+        GET запросы к справочным и рыночным эндпоинтам обслуживаются через кэш (см. ResponseCache).
+        Котировки и стаканы инструментов с активной подпиской отдаются из памяти (см. MarketStream).
+        """
+        if method.upper() != "GET":
+            return await self._send(method, path, **kwargs)
+
+        params = kwargs.get("params") or {}
+        snapshot = self._stream_snapshot(path, params)
+        if snapshot is not None:
+            self.stream_hits += 1
+            return snapshot
+
+        if self.cache is None:
+            return await self._send(method, path, **kwargs)
+
+        key = f"{path}?{urlencode(sorted(params.items()))}" if params else path
+        return await self.cache.get_or_fetch(key, match_endpoint(path), lambda: self._send(method, path, **kwargs))
+
+    def _stream_snapshot(self, path: str, params: dict[str, Any]) -> dict[str, Any] | None:
+        """Снимок котировки или стакана из потока для пути запроса (None, если его нет)"""
+        if self.market_stream is None:
+            return None
+        endpoint = match_endpoint(path)
+        symbol = path.split("?", 1)[0].split("/")[3] if endpoint in {"quotes", "orderbook"} else None
+        if symbol is None:
+            return None
+        if endpoint == "quotes":
+            return self.market_stream.last_quote(symbol)
+        depth = params.get("depth")
+        return self.market_stream.orderbook(symbol, int(depth) if depth else None)
+
+    async def _send(self, method: str, path: str, **kwargs: Any) -> dict[str, Any]:  # noqa: ANN401
+        """
+        Выполнить HTTP запрос без кэша
 
-        Raises:
-            requests.HTTPError: Если запрос завершился с ошибкой
+        Перед каждой попыткой берется токен из rate limiter. Идемпотентные запросы
+        повторяются при сетевых ошибках и ответах 429/5xx (см. RetryPolicy).
         """
         url = f"{self.base_url}{path}"
+        timeout = kwargs.pop("timeout", None) or self.timeout_for(path)
+        attempt = 0
 
+        while True:
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire()
+
+            try:
+                response = await self.client.request(
+                    method, url, timeout=httpx.Timeout(timeout, connect=min(CONNECT_TIMEOUT, timeout)), **kwargs
+                )
+            except httpx.TransportError as e:
+                # Сетевые ошибки и таймауты
+                if not self.retry_policy.can_retry(method, attempt):
+                    return {"error": str(e), "type": type(e).__name__}
+                retry_after = None
+            except Exception as e:
+                return {"error": str(e), "type": type(e).__name__}
+            else:
+                retry_after = response.headers.get("Retry-After")
+                if not self.retry_policy.should_retry_status(method, response.status_code, attempt, retry_after):
+                    return self._parse_response(response)
+
+            await asyncio.sleep(self.retry_policy.delay(attempt, retry_after))
+            attempt += 1
+            self.retry_count += 1
+
+    @staticmethod
+    def _parse_response(response: httpx.Response) -> dict[str, Any]:
+        """Преобразовать ответ в словарь (ошибки возвращаются словарем с ключом "error")"""
         try:
-            response = self.session.request(method, url, timeout=30, **kwargs)
             response.raise_for_status()
 
             # Если ответ пустой (например, для DELETE)
@@ -61,76 +242,378 @@ class FinamAPIClient:
 
             return response.json()
 
-        except requests.exceptions.HTTPError as e:
+        except httpx.HTTPStatusError as e:
             # Пытаемся извлечь детали ошибки из ответа
-            error_detail = {"error": str(e), "status_code": e.response.status_code if e.response else None}
+            error_detail: dict[str, Any] = {"error": str(e), "status_code": e.response.status_code}
 
             try:
-                if e.response and e.response.content:
+                if e.response.content:
                     error_detail["details"] = e.response.json()
             except Exception:
-                error_detail["details"] = e.response.text if e.response else None
+                error_detail["details"] = e.response.text
 
             return error_detail
 
         except Exception as e:
             return {"error": str(e), "type": type(e).__name__}
 
+    def cache_stats(self) -> dict[str, Any]:
+        """Статистика кэша ответов (пустой словарь, если кэш выключен)"""
+        return self.cache.stats() if self.cache is not None else {}
+
+    async def subscribe(self, symbols: Iterable[str], quotes: bool = True, orderbook: bool = False) -> None:
+        """
+        Подписаться на потоковые котировки и/или стаканы
+
+        Пока подписка активна, get_quote/get_orderbook для этих инструментов
+        отвечают из памяти без запроса к API.
+        """
+        if self.market_stream is None:
+            self.market_stream = MarketStream(access_token=self.access_token)
+        await self.market_stream.subscribe(symbols, quotes, orderbook)
+
+    async def unsubscribe(self, symbols: Iterable[str], quotes: bool = True, orderbook: bool = False) -> None:
+        """Отменить потоковую подписку"""
+        if self.market_stream is not None:
+            await self.market_stream.unsubscribe(symbols, quotes, orderbook)
+
+    async def aclose(self) -> None:
+        """Закрыть пул соединений и потоковое соединение"""
+        if self.market_stream is not None:
+            await self.market_stream.aclose()
+        await self.client.aclose()
+
+    async def __aenter__(self) -> "AsyncFinamAPIClient":
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.aclose()
+
     # Удобные методы для частых операций
 
-    def get_quote(self, symbol: str) -> dict[str, Any]:
+    async def get_quote(self, symbol: str) -> dict[str, Any]:
         """Получить текущую котировку инструмента"""
-        return self.execute_request("GET", f"/v1/instruments/{symbol}/quotes/latest")
+        return await self.execute_request("GET", f"/v1/instruments/{symbol}/quotes/latest")
 
-    def get_orderbook(self, symbol: str, depth: int = 10) -> dict[str, Any]:
+    async def get_orderbook(self, symbol: str, depth: int = 10) -> dict[str, Any]:
         """Получить биржевой стакан"""
-        return self.execute_request("GET", f"/v1/instruments/{symbol}/orderbook", params={"depth": depth})
+        return await self.execute_request("GET", f"/v1/instruments/{symbol}/orderbook", params={"depth": depth})
 
-    def get_candles(
+    async def get_candles(
         self, symbol: str, timeframe: str = "D", start: str | None = None, end: str | None = None
     ) -> dict[str, Any]:
-        """Получить исторические свечи"""
+        """
+        Получить исторические свечи
+
+        Если задан период и включено хранилище свечей, загружаются только недостающие
+        промежутки, остальное читается с диска. Структура ответа та же, что у API, числа
+        в свечах записаны единообразно (см. format_decimal) - с хранилищем и без него.
+        Таймфреймы, длительность которых хранилищу неизвестна, запрашиваются напрямую.
+        """
+        if self.candle_store is None or not (start and end) or normalize_timeframe(timeframe) not in TIMEFRAME_SECONDS:
+            return normalize_bars_response(await self._fetch_candles(symbol, timeframe, start, end))
+
+        try:
+            start_ts, end_ts = parse_timestamp(start), parse_timestamp(end)
+        except ValueError:
+            return normalize_bars_response(await self._fetch_candles(symbol, timeframe, start, end))
+
+        bars, error = await self.candle_store.get(self._fetch_candles, symbol, timeframe, start_ts, end_ts)
+        if error is not None:
+            return error
+        return {"symbol": symbol, "bars": array_to_bars(bars)}
+
+    async def _fetch_candles(
+        self, symbol: str, timeframe: str = "D", start: str | None = None, end: str | None = None
+    ) -> dict[str, Any]:
+        """Запросить свечи у API без локального хранилища"""
         params = {"timeframe": timeframe}
         if start:
             params["interval.start_time"] = start
         if end:
             params["interval.end_time"] = end
-        return self.execute_request("GET", f"/v1/instruments/{symbol}/bars", params=params)
+        return await self.execute_request("GET", f"/v1/instruments/{symbol}/bars", params=params)
+
+    async def get_account(self, account_id: str) -> dict[str, Any]:
+        """Получить информацию о счете"""
+        return await self.execute_request("GET", f"/v1/accounts/{account_id}")
+
+    async def get_orders(self, account_id: str) -> dict[str, Any]:
+        """Получить список ордеров"""
+        return await self.execute_request("GET", f"/v1/accounts/{account_id}/orders")
+
+    async def get_order(self, account_id: str, order_id: str) -> dict[str, Any]:
+        """Получить информацию об ордере"""
+        return await self.execute_request("GET", f"/v1/accounts/{account_id}/orders/{order_id}")
+
+    async def create_order(self, account_id: str, order_data: dict[str, Any]) -> dict[str, Any]:
+        """Создать новый ордер"""
+        return await self.execute_request("POST", f"/v1/accounts/{account_id}/orders", json=order_data)
+
+    async def cancel_order(self, account_id: str, order_id: str) -> dict[str, Any]:
+        """Отменить ордер"""
+        return await self.execute_request("DELETE", f"/v1/accounts/{account_id}/orders/{order_id}")
+
+    async def get_trades(self, account_id: str, start: str | None = None, end: str | None = None) -> dict[str, Any]:
+        """Получить историю сделок"""
+        params = {}
+        if start:
+            params["interval.start_time"] = start
+        if end:
+            params["interval.end_time"] = end
+        return await self.execute_request("GET", f"/v1/accounts/{account_id}/trades", params=params)
+
+    async def get_positions(self, account_id: str) -> dict[str, Any]:
+        """Получить открытые позиции"""
+        # Позиции обычно включены в ответ get_account
+        return await self.execute_request("GET", f"/v1/accounts/{account_id}")
+
+    async def get_session_details(self) -> dict[str, Any]:
+        """Получить детали текущей сессии"""
+        return await self.execute_request("POST", "/v1/sessions/details")
+
+    # Пакетные методы для нескольких инструментов
+
+    async def _fan_out(
+        self,
+        symbols: Iterable[str],
+        fetch: Callable[[str], Awaitable[dict[str, Any]]],
+        concurrency: int | None = None,
+    ) -> dict[str, dict[str, Any]]:
+        """
+        Выполнить запрос для каждого инструмента параллельно, не больше concurrency одновременно
+
+        Returns:
+            Словарь {symbol: ответ API}. Ошибка по одному инструменту не прерывает остальные
+            и возвращается для него словарем с ключом "error"
+        """
+        semaphore = asyncio.Semaphore(concurrency or self.bulk_concurrency)
+        unique_symbols = list(dict.fromkeys(symbols))
+
+        async def fetch_one(symbol: str) -> dict[str, Any]:
+            async with semaphore:
+                try:
+                    return await fetch(symbol)
+                except Exception as e:
+                    return {"error": str(e), "type": type(e).__name__}
+
+        responses = await asyncio.gather(*(fetch_one(symbol) for symbol in unique_symbols))
+        return dict(zip(unique_symbols, responses, strict=True))
+
+    async def get_quotes(self, symbols: Iterable[str], concurrency: int | None = None) -> dict[str, dict[str, Any]]:
+        """Получить котировки нескольких инструментов: {symbol: котировка}"""
+        return await self._fan_out(symbols, self.get_quote, concurrency)
+
+    async def get_orderbooks(
+        self, symbols: Iterable[str], depth: int = 10, concurrency: int | None = None
+    ) -> dict[str, dict[str, Any]]:
+        """Получить стаканы нескольких инструментов: {symbol: стакан}"""
+        return await self._fan_out(symbols, lambda symbol: self.get_orderbook(symbol, depth), concurrency)
+
+    async def get_candles_many(
+        self,
+        symbols: Iterable[str],
+        timeframe: str = "D",
+        start: str | None = None,
+        end: str | None = None,
+        concurrency: int | None = None,
+    ) -> dict[str, dict[str, Any]]:
+        """Получить свечи нескольких инструментов за один период: {symbol: свечи}"""
+        return await self._fan_out(symbols, lambda symbol: self.get_candles(symbol, timeframe, start, end), concurrency)
+
+
+_background_loop: asyncio.AbstractEventLoop | None = None
+_background_thread: threading.Thread | None = None
+_background_lock = threading.Lock()
+
+
+def _get_background_loop() -> asyncio.AbstractEventLoop:
+    """Общий для процесса event loop в фоновом потоке, на котором работают синхронные фасады"""
+    global _background_loop, _background_thread
+    with _background_lock:
+        if _background_loop is None:
+            _background_loop = asyncio.new_event_loop()
+            _background_thread = threading.Thread(
+                target=_background_loop.run_forever, name="finam-client-loop", daemon=True
+            )
+            _background_thread.start()
+        return _background_loop
+
+
+class FinamAPIClient:
+    """
+    Синхронный клиент для взаимодействия с Finam TradeAPI
+
+    Фасад над AsyncFinamAPIClient: корутины выполняются в общем фоновом event loop,
+    поэтому клиент можно вызывать из обычного кода и из нескольких потоков.
+
+    Документация: https://tradeapi.finam.ru/
+    """
+
+    def __init__(self, access_token: str | None = None, base_url: str | None = None, **options: Any) -> None:  # noqa: ANN401
+        """
+        Инициализация клиента
+
+        Args:
+            access_token: Токен доступа к API (из переменной окружения FINAM_ACCESS_TOKEN)
+            base_url: Базовый URL API (по умолчанию из документации)
+            **options: Настройки пула соединений и таймаутов (см. AsyncFinamAPIClient)
+        """
+        self.async_client = AsyncFinamAPIClient(access_token, base_url, **options)
+        self.access_token = self.async_client.access_token
+        self.base_url = self.async_client.base_url
+        self._listeners: dict[queue.Queue[dict[str, Any]], Listener] = {}
+
+    def _run(self, coro: Coroutine[Any, Any, T]) -> T:
+        """Выполнить корутину в фоновом event loop и дождаться результата"""
+        if threading.current_thread() is _background_thread:
+            coro.close()
+            raise RuntimeError("FinamAPIClient нельзя вызывать из event loop, используйте AsyncFinamAPIClient")
+        return asyncio.run_coroutine_threadsafe(coro, _get_background_loop()).result()
+
+    def close(self) -> None:
+        """Закрыть пул соединений и потоковое соединение"""
+        self._run(self.async_client.aclose())
+
+    def cache_stats(self) -> dict[str, Any]:
+        """Статистика кэша ответов (пустой словарь, если кэш выключен)"""
+        return self.async_client.cache_stats()
+
+    # Потоковые данные
+
+    def subscribe(self, symbols: Iterable[str], quotes: bool = True, orderbook: bool = False) -> None:
+        """Подписаться на потоковые котировки и/или стаканы (см. AsyncFinamAPIClient.subscribe)"""
+        self._run(self.async_client.subscribe(symbols, quotes, orderbook))
+
+    def unsubscribe(self, symbols: Iterable[str], quotes: bool = True, orderbook: bool = False) -> None:
+        """Отменить потоковую подписку"""
+        self._run(self.async_client.unsubscribe(symbols, quotes, orderbook))
+
+    def last_quote(self, symbol: str) -> dict[str, Any] | None:
+        """Котировка из потока без запроса к API (None, если подписки или данных нет)"""
+        stream = self.async_client.market_stream
+        return stream.last_quote(symbol) if stream is not None else None
+
+    def listen(self, maxsize: int = 100) -> "queue.Queue[dict[str, Any]]":
+        """
+        Потокобезопасная очередь обновлений подписок для отдельного потребителя
+
+        При переполнении самые старые обновления отбрасываются. Отключение - unlisten(queue).
+        """
+        updates: queue.Queue[dict[str, Any]] = queue.Queue(maxsize)
+
+        def put(update: dict[str, Any]) -> None:
+            # Вызывается только из event loop, потребитель может лишь освободить место
+            if updates.full():
+                with contextlib.suppress(queue.Empty):
+                    updates.get_nowait()
+            updates.put_nowait(update)
+
+        self._listeners[updates] = put
+        self._run(self._add_listener(put))
+        return updates
+
+    def unlisten(self, updates: "queue.Queue[dict[str, Any]]") -> None:
+        """Отключить очередь, полученную из listen()"""
+        listener = self._listeners.pop(updates, None)
+        if listener is not None and self.async_client.market_stream is not None:
+            self._run(self._remove_listener(listener))
+
+    async def _add_listener(self, listener: Listener) -> None:
+        if self.async_client.market_stream is None:
+            self.async_client.market_stream = MarketStream(access_token=self.access_token)
+        self.async_client.market_stream.add_listener(listener)
+
+    async def _remove_listener(self, listener: Listener) -> None:
+        self.async_client.market_stream.remove_listener(listener)
+
+    def __enter__(self) -> "FinamAPIClient":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def execute_request(self, method: str, path: str, **kwargs: Any) -> dict[str, Any]:  # noqa: ANN401
+        """
+        Выполнить HTTP запрос к Finam TradeAPI
+
+        Args:
+            method: HTTP метод (GET, POST, DELETE и т.д.)
+            path: Путь API (например, /v1/instruments/SBER@MISX/quotes/latest)
+            **kwargs: Дополнительные параметры для httpx (params, json, timeout и т.д.)
+
+        Returns:
+            Ответ API в виде словаря (ошибки возвращаются словарем с ключом "error")
+        """
+        return self._run(self.async_client.execute_request(method, path, **kwargs))
+
+    # Удобные методы для частых операций
+
+    def get_quote(self, symbol: str) -> dict[str, Any]:
+        """Получить текущую котировку инструмента"""
+        return self._run(self.async_client.get_quote(symbol))
+
+    def get_orderbook(self, symbol: str, depth: int = 10) -> dict[str, Any]:
+        """Получить биржевой стакан"""
+        return self._run(self.async_client.get_orderbook(symbol, depth))
+
+    def get_candles(
+        self, symbol: str, timeframe: str = "D", start: str | None = None, end: str | None = None
+    ) -> dict[str, Any]:
+        """Получить исторические свечи"""
+        return self._run(self.async_client.get_candles(symbol, timeframe, start, end))
 
     def get_account(self, account_id: str) -> dict[str, Any]:
         """Получить информацию о счете"""
-        return self.execute_request("GET", f"/v1/accounts/{account_id}")
+        return self._run(self.async_client.get_account(account_id))
 
     def get_orders(self, account_id: str) -> dict[str, Any]:
         """Получить список ордеров"""
-        return self.execute_request("GET", f"/v1/accounts/{account_id}/orders")
+        return self._run(self.async_client.get_orders(account_id))
 
     def get_order(self, account_id: str, order_id: str) -> dict[str, Any]:
         """Получить информацию об ордере"""
-        return self.execute_request("GET", f"/v1/accounts/{account_id}/orders/{order_id}")
+        return self._run(self.async_client.get_order(account_id, order_id))
 
     def create_order(self, account_id: str, order_data: dict[str, Any]) -> dict[str, Any]:
         """Создать новый ордер"""
-        return self.execute_request("POST", f"/v1/accounts/{account_id}/orders", json=order_data)
+        return self._run(self.async_client.create_order(account_id, order_data))
 
     def cancel_order(self, account_id: str, order_id: str) -> dict[str, Any]:
         """Отменить ордер"""
-        return self.execute_request("DELETE", f"/v1/accounts/{account_id}/orders/{order_id}")
+        return self._run(self.async_client.cancel_order(account_id, order_id))
 
     def get_trades(self, account_id: str, start: str | None = None, end: str | None = None) -> dict[str, Any]:
         """Получить историю сделок"""
-        params = {}
-        if start:
-            params["interval.start_time"] = start
-        if end:
-            params["interval.end_time"] = end
-        return self.execute_request("GET", f"/v1/accounts/{account_id}/trades", params=params)
+        return self._run(self.async_client.get_trades(account_id, start, end))
 
     def get_positions(self, account_id: str) -> dict[str, Any]:
         """Получить открытые позиции"""
-        # Позиции обычно включены в ответ get_account
-        return self.execute_request("GET", f"/v1/accounts/{account_id}")
+        return self._run(self.async_client.get_positions(account_id))
 
     def get_session_details(self) -> dict[str, Any]:
         """Получить детали текущей сессии"""
-        return self.execute_request("POST", "/v1/sessions/details")
+        return self._run(self.async_client.get_session_details())
+
+    # Пакетные методы для нескольких инструментов (запросы выполняются параллельно)
+
+    def get_quotes(self, symbols: Iterable[str], concurrency: int | None = None) -> dict[str, dict[str, Any]]:
+        """Получить котировки нескольких инструментов: {symbol: котировка}"""
+        return self._run(self.async_client.get_quotes(symbols, concurrency))
+
+    def get_orderbooks(
+        self, symbols: Iterable[str], depth: int = 10, concurrency: int | None = None
+    ) -> dict[str, dict[str, Any]]:
+        """Получить стаканы нескольких инструментов: {symbol: стакан}"""
+        return self._run(self.async_client.get_orderbooks(symbols, depth, concurrency))
+
+    def get_candles_many(
+        self,
+        symbols: Iterable[str],
+        timeframe: str = "D",
+        start: str | None = None,
+        end: str | None = None,
+        concurrency: int | None = None,
+    ) -> dict[str, dict[str, Any]]:
+        """Получить свечи нескольких инструментов за один период: {symbol: свечи}"""
+        return self._run(self.async_client.get_candles_many(symbols, timeframe, start, end, concurrency))
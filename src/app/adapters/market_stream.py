@@ -0,0 +1,234 @@
+"""
+Потоковые рыночные данные Finam TradeAPI (WebSocket)
+
+MarketStream держит одно соединение с потоковым API, подписки на котировки и стаканы
+и последний снимок по каждому инструменту в памяти. Обновления раздаются нескольким
+потребителям (чат, виджеты Streamlit). Пока соединение живо, снимок актуален:
+сервер присылает каждое изменение, поэтому котировку можно отдать без запроса к API.
+После обрыва снимки сбрасываются до повторной подписки.
+"""
+
+import asyncio
+import contextlib
+import json
+import logging
+import os
+from collections.abc import Callable, Iterable
+from typing import Any
+
+import websockets
+
+from .order_book import OrderBook
+from .rate_limit import RetryPolicy
+
+QUOTES = "QUOTES"
+ORDER_BOOK = "ORDER_BOOK"
+
+Listener = Callable[[dict[str, Any]], None]
+
+logger = logging.getLogger(__name__)
+
+
+class MarketStream:
+    """
+    Подписки на котировки и стаканы через потоковый API
+
+    Рассчитан на работу внутри одного event loop (как и AsyncFinamAPIClient).
+    """
+
+    def __init__(
+        self,
+        url: str | None = None,
+        access_token: str | None = None,
+        *,
+        reconnect: RetryPolicy | None = None,
+    ) -> None:
+        """
+        Args:
+            url: Адрес WebSocket API (FINAM_STREAM_URL, по умолчанию wss://api.finam.ru:443/ws)
+            access_token: Токен доступа (из переменной окружения FINAM_ACCESS_TOKEN)
+            reconnect: Задержки между переподключениями (число повторов не ограничено)
+        """
+        self.url = url or os.getenv("FINAM_STREAM_URL", "wss://api.finam.ru:443/ws")
+        self.access_token = access_token or os.getenv("FINAM_ACCESS_TOKEN", "")
+        self.reconnect = reconnect or RetryPolicy(base_delay=0.5, max_delay=30.0)
+        self.subscriptions: set[tuple[str, str]] = set()
+        self.updates_received = 0
+        self.reconnects = 0
+        self._quotes: dict[str, dict[str, Any]] = {}
+        self._books: dict[str, OrderBook] = {}
+        self._listeners: list[Listener] = []
+        self._queues: dict[asyncio.Queue[dict[str, Any]], Listener] = {}
+        self._connection: Any = None
+        self._task: asyncio.Task[None] | None = None
+        self.connected = asyncio.Event()
+
+    # Подписки
+
+    async def start(self) -> None:
+        """Запустить фоновое чтение потока (повторный вызов ничего не делает)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="finam-market-stream")
+
+    async def subscribe(self, symbols: Iterable[str], quotes: bool = True, orderbook: bool = False) -> None:
+        """Подписаться на котировки и/или стаканы инструментов"""
+        await self._change(symbols, quotes, orderbook, "SUBSCRIBE")
+        await self.start()
+
+    async def unsubscribe(self, symbols: Iterable[str], quotes: bool = True, orderbook: bool = False) -> None:
+        """Отписаться и забыть снимки инструментов"""
+        symbols = list(symbols)
+        await self._change(symbols, quotes, orderbook, "UNSUBSCRIBE")
+        for symbol in symbols:
+            if quotes:
+                self._quotes.pop(symbol, None)
+            if orderbook:
+                self._books.pop(symbol, None)
+
+    async def _change(self, symbols: Iterable[str], quotes: bool, orderbook: bool, action: str) -> None:
+        kinds = [kind for kind, enabled in ((QUOTES, quotes), (ORDER_BOOK, orderbook)) if enabled]
+        symbols = list(dict.fromkeys(symbols))
+        for kind in kinds:
+            keys = {(kind, symbol) for symbol in symbols}
+            if action == "SUBSCRIBE":
+                self.subscriptions |= keys
+            else:
+                self.subscriptions -= keys
+            if self._connection is not None:
+                await self._send(action, kind, symbols)
+
+    async def _send(self, action: str, kind: str, symbols: list[str]) -> None:
+        message = {"action": action, "type": kind, "data": {"symbols": symbols}, "token": self.access_token}
+        # При обрыве подписка восстановится после переподключения
+        with contextlib.suppress(websockets.ConnectionClosed):
+            await self._connection.send(json.dumps(message))
+
+    # Потребители
+
+    def add_listener(self, listener: Listener) -> None:
+        """
+        Добавить получателя обновлений
+
+        listener вызывается в event loop потока для каждого обновления
+        {"type": "quote" | "orderbook", "symbol": ..., "data": ...} и не должен блокироваться.
+        """
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Listener) -> None:
+        """Убрать получателя обновлений"""
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def listen(self, maxsize: int = 100) -> asyncio.Queue[dict[str, Any]]:
+        """
+        Очередь обновлений для отдельного асинхронного потребителя
+
+        Если потребитель не успевает, самые старые обновления отбрасываются:
+        поток не ждет медленных получателей.
+        """
+        queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue(maxsize)
+
+        def put(update: dict[str, Any]) -> None:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(update)
+
+        self._queues[queue] = put
+        self.add_listener(put)
+        return queue
+
+    def unlisten(self, queue: asyncio.Queue[dict[str, Any]]) -> None:
+        """Отключить очередь, полученную из listen()"""
+        listener = self._queues.pop(queue, None)
+        if listener is not None:
+            self.remove_listener(listener)
+
+    def _notify(self, update: dict[str, Any]) -> None:
+        for listener in list(self._listeners):
+            # Ошибка одного получателя не должна останавливать поток и остальных получателей
+            try:
+                listener(update)
+            except Exception:
+                logger.exception("Ошибка в обработчике обновлений %s", update.get("type"))
+
+    # Снимки
+
+    def last_quote(self, symbol: str) -> dict[str, Any] | None:
+        """Последняя котировка в формате ответа GET /quotes/latest или None, если данных нет"""
+        quote = self._quotes.get(symbol)
+        return {"symbol": symbol, "quote": quote} if quote is not None else None
+
+    def orderbook(self, symbol: str, depth: int | None = None) -> dict[str, Any] | None:
+        """Стакан в формате ответа GET /orderbook или None, если данных нет"""
+        book = self._books.get(symbol)
+        return book.to_response(depth) if book is not None else None
+
+    def order_book(self, symbol: str) -> OrderBook | None:
+        """Живой стакан инструмента для расчета метрик (None, если данных нет)"""
+        return self._books.get(symbol)
+
+    # Чтение потока
+
+    async def _run(self) -> None:
+        attempt = 0
+        while True:
+            try:
+                async with websockets.connect(self.url) as connection:
+                    self._connection = connection
+                    self.connected.set()
+                    attempt = 0
+                    for kind in (QUOTES, ORDER_BOOK):
+                        symbols = sorted(symbol for k, symbol in self.subscriptions if k == kind)
+                        if symbols:
+                            await self._send("SUBSCRIBE", kind, symbols)
+                    async for message in connection:
+                        # Один некорректный кадр пропускается, соединение продолжает читаться
+                        try:
+                            self._handle(json.loads(message))
+                        except Exception:
+                            logger.warning("Не удалось обработать сообщение потока", exc_info=True)
+            except (OSError, websockets.WebSocketException) as e:
+                logger.info("Соединение с потоком прервано: %s", e)
+            except Exception:
+                # Любая другая ошибка не должна завершать задачу: переподключаемся (CancelledError не перехватывается)
+                logger.exception("Ошибка чтения потока, переподключение")
+            finally:
+                # Пропущенные обновления не восстановить - снимки больше не актуальны
+                self._connection = None
+                self.connected.clear()
+                self._quotes.clear()
+                self._books.clear()
+
+            await asyncio.sleep(self.reconnect.delay(min(attempt, 10)))
+            attempt += 1
+            self.reconnects += 1
+
+    def _handle(self, message: dict[str, Any]) -> None:
+        if not isinstance(message, dict) or message.get("type") != "DATA":
+            return
+        payload = message.get("payload") or {}
+        if not isinstance(payload, dict):
+            raise TypeError(f"Unexpected payload: {type(payload).__name__}")
+        kind = message.get("subscription_type")
+        if kind == QUOTES:
+            for quote in payload.get("quote", []):
+                symbol = quote.get("symbol")
+                self._quotes[symbol] = quote
+                self.updates_received += 1
+                self._notify({"type": "quote", "symbol": symbol, "data": quote})
+        elif kind == ORDER_BOOK:
+            for book in payload.get("order_book", []):
+                symbol = book.get("symbol")
+                self._books.setdefault(symbol, OrderBook(symbol)).apply_delta(book.get("rows", []))
+                self.updates_received += 1
+                self._notify({"type": "orderbook", "symbol": symbol, "data": book})
+
+    async def aclose(self) -> None:
+        """Остановить чтение потока и закрыть соединение"""
+        if self._connection is not None:
+            await self._connection.close()
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
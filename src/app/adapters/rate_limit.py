@@ -0,0 +1,107 @@
+"""
+Ограничение частоты запросов и повторы для Finam TradeAPI
+
+TokenBucket сглаживает поток запросов под квоту API,
+RetryPolicy решает, можно ли повторить запрос, и считает задержку
+(экспоненциальный backoff с jitter). Retry-After сервера выдерживается полностью,
+а если он длиннее max_retry_after, запрос не повторяется и ответ 429/503
+возвращается вызывающему.
+
+DELETE повторяется намеренно: отмена ордера (cancel_order) после таймаута чтения
+отправляется еще раз. Повторная отмена не создает новых ордеров; если первая
+попытка все же дошла до биржи, в худшем случае повтор вернет ошибку API вместо успеха.
+"""
+
+import asyncio
+import random
+import time
+from email.utils import parsedate_to_datetime
+
+# Методы, повтор которых не создает дублей (POST - никогда, например создание ордера).
+# DELETE (отмена ордера) включен намеренно, см. описание модуля
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class TokenBucket:
+    """
+    Асинхронный token bucket
+
+    Токены пополняются со скоростью rate в секунду до capacity;
+    каждый запрос забирает один токен или ждет его появления.
+    """
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        """
+        Args:
+            rate: Скорость пополнения (запросов в секунду)
+            capacity: Размер корзины (допустимый всплеск запросов)
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Дождаться и забрать один токен"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Разобрать Retry-After: число секунд или HTTP дата"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """Правила повтора запросов с экспоненциальным backoff и full jitter"""
+
+    def __init__(
+        self, max_retries: int = 3, base_delay: float = 0.5, max_delay: float = 10.0, max_retry_after: float = 60.0
+    ) -> None:
+        """
+        Args:
+            max_retries: Максимум повторов одного запроса
+            base_delay: Базовая задержка (секунды), удваивается с каждой попыткой
+            max_delay: Верхняя граница вычисленной задержки (Retry-After ею не ограничивается)
+            max_retry_after: Наибольший Retry-After (секунды), который стоит ждать; при большем запрос не повторяется
+        """
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+
+    def can_retry(self, method: str, attempt: int) -> bool:
+        """Можно ли повторить запрос после попытки номер attempt (с нуля)"""
+        return method.upper() in IDEMPOTENT_METHODS and attempt < self.max_retries
+
+    def should_retry_status(self, method: str, status_code: int, attempt: int, retry_after: str | None = None) -> bool:
+        """Нужно ли повторить запрос, получивший ответ со статусом status_code и заголовком Retry-After"""
+        if status_code not in RETRYABLE_STATUSES or not self.can_retry(method, attempt):
+            return False
+        server_delay = parse_retry_after(retry_after)
+        return server_delay is None or server_delay <= self.max_retry_after
+
+    def delay(self, attempt: int, retry_after: str | None = None) -> float:
+        """Задержка перед следующей попыткой: Retry-After сервера или backoff"""
+        server_delay = parse_retry_after(retry_after)
+        if server_delay is not None:
+            return server_delay
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
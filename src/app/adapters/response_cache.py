@@ -0,0 +1,133 @@
+"""
+Кэш ответов Finam TradeAPI в памяти
+
+Read-through кэш для GET запросов с TTL по эндпоинтам и LRU вытеснением.
+Одновременные одинаковые запросы объединяются: сеть вызывается один раз,
+остальные ждут тот же результат.
+"""
+
+import asyncio
+import time
+from collections import Counter, OrderedDict
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+# TTL (в секундах) по эндпоинтам. Эндпоинты счета не кэшируются: это состояние пользователя
+DEFAULT_TTLS: dict[str, float] = {
+    "quotes": 2.0,
+    "orderbook": 1.0,
+    "latest_trades": 2.0,
+    "bars": 60.0,
+    "assets": 3600.0,
+    "asset": 6 * 3600.0,
+    "asset_params": 300.0,
+    "asset_schedule": 6 * 3600.0,
+    "asset_options": 300.0,
+    "exchanges": 24 * 3600.0,
+}
+
+
+class ResponseCache:
+    """
+    LRU кэш ответов API с TTL и объединением одновременных запросов
+
+    Рассчитан на работу внутри одного event loop (как и httpx.AsyncClient).
+    Возвращаемые словари общие для всех получателей - их нельзя изменять.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttls: dict[str, float] | None = None) -> None:
+        """
+        Args:
+            max_entries: Максимальное количество ответов в памяти
+            ttls: Переопределение TTL по эндпоинтам (0 - не кэшировать)
+        """
+        self.max_entries = max_entries
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self._entries: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+        self._inflight: dict[str, asyncio.Future[dict[str, Any]]] = {}
+        self.hits: Counter[str] = Counter()
+        self.misses: Counter[str] = Counter()
+        self.coalesced: Counter[str] = Counter()
+        self.evictions = 0
+
+    def ttl_for(self, endpoint: str | None) -> float:
+        """TTL для эндпоинта (0, если эндпоинт не кэшируется)"""
+        return self.ttls.get(endpoint or "", 0.0)
+
+    async def get_or_fetch(
+        self, key: str, endpoint: str | None, fetch: Callable[[], Awaitable[dict[str, Any]]]
+    ) -> dict[str, Any]:
+        """
+        Вернуть ответ из кэша или выполнить fetch
+
+        Ответы с ключом "error" не кэшируются.
+        """
+        ttl = self.ttl_for(endpoint)
+        if ttl <= 0:
+            return await fetch()
+
+        name = endpoint or ""
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits[name] += 1
+                return entry[1]
+            del self._entries[key]
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced[name] += 1
+            return await asyncio.shield(inflight)
+
+        self.misses[name] += 1
+        future: asyncio.Future[dict[str, Any]] = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await fetch()
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                # Исключение получат ожидающие запросы, если они есть
+                future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+        if "error" not in value:
+            self._store(key, value, ttl)
+        future.set_result(value)
+        return value
+
+    def _store(self, key: str, value: dict[str, Any], ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Очистить кэш"""
+        self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        """Статистика кэша для мониторинга (в целом и по эндпоинтам)"""
+        hits = sum(self.hits.values())
+        misses = sum(self.misses.values())
+        coalesced = sum(self.coalesced.values())
+        lookups = hits + misses + coalesced
+        endpoints = sorted(set(self.hits) | set(self.misses) | set(self.coalesced))
+        return {
+            "hits": hits,
+            "misses": misses,
+            "coalesced": coalesced,
+            "hit_rate": (hits + coalesced) / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "endpoints": {
+                name: {"hits": self.hits[name], "misses": self.misses[name], "coalesced": self.coalesced[name]}
+                for name in endpoints
+            },
+        }
@@ -0,0 +1,33 @@
+"""Аналитика рыночных данных"""
+
+from .indicators import (
+    atr,
+    bars_to_columns,
+    ema,
+    returns,
+    rolling_correlation,
+    rsi,
+    sma,
+    stack_bars,
+    summarize_bars,
+    volatility,
+    vwap,
+)
+from .reducers import REDUCERS, reduce_response, reduction_stats
+
+__all__ = [
+    "REDUCERS",
+    "atr",
+    "bars_to_columns",
+    "ema",
+    "reduce_response",
+    "reduction_stats",
+    "returns",
+    "rolling_correlation",
+    "rsi",
+    "sma",
+    "stack_bars",
+    "summarize_bars",
+    "volatility",
+    "vwap",
+]
@@ -0,0 +1,261 @@
+"""
+Технические индикаторы над массивами свечей
+
+Все функции векторизованы и работают по последней оси: на вход подается ряд (T,)
+или матрица инструментов (N, T), выровненная по времени (см. stack_bars).
+Первые значения, для которых окна не хватает, равны NaN.
+
+Экспоненциальное сглаживание (EMA, RSI, ATR) считается блоками через cumsum
+с масштабированием весов, без цикла Python по свечам.
+"""
+
+from typing import Any
+
+import numpy as np
+
+from src.app.adapters.candle_store import bars_to_array, format_timestamp
+
+FIELDS = ("open", "high", "low", "close", "volume")
+
+# Предел масштаба весов внутри блока EMA (exp(300) далеко от переполнения float64)
+_MAX_LOG_SCALE = 300.0
+
+
+def bars_to_columns(response: dict[str, Any]) -> dict[str, np.ndarray]:
+    """
+    Ответ GET /bars -> непрерывные массивы по полям
+
+    Returns:
+        {"ts": unix секунды, "open": ..., "high": ..., "low": ..., "close": ..., "volume": ...}
+    """
+    array = bars_to_array(response.get("bars", []))
+    array = array[np.argsort(array["ts"], kind="stable")]
+    return {name: np.ascontiguousarray(array[name]) for name in ("ts", *FIELDS)}
+
+
+def stack_bars(responses: dict[str, dict[str, Any]]) -> tuple[list[str], np.ndarray, dict[str, np.ndarray]]:
+    """
+    Выровнять свечи нескольких инструментов по общей оси времени
+
+    Пропущенные свечи заполняются последней ценой закрытия с нулевым объемом,
+    до первой свечи инструмента значения - NaN.
+
+    Returns:
+        tuple: (символы, время (T,), {поле: матрица (N, T)})
+    """
+    symbols = [symbol for symbol, response in responses.items() if "error" not in response]
+    columns = [bars_to_columns(responses[symbol]) for symbol in symbols]
+    ts = np.unique(np.concatenate([c["ts"] for c in columns])) if columns else np.empty(0, dtype=np.int64)
+
+    stacked = {name: np.full((len(symbols), len(ts)), np.nan) for name in FIELDS}
+    for row, column in enumerate(columns):
+        positions = np.searchsorted(ts, column["ts"])
+        # Индекс последней известной свечи для каждой точки общей оси (-1 - еще не было)
+        last = np.full(len(ts), -1)
+        last[positions] = np.arange(len(positions))
+        last = np.maximum.accumulate(last)
+        known = last >= 0
+        exact = np.zeros(len(ts), dtype=bool)
+        exact[positions] = True
+
+        close = column["close"][last[known]]
+        for name in ("open", "high", "low", "close"):
+            values = stacked[name][row]
+            values[known] = close
+            values[positions] = column[name]
+        volume = stacked["volume"][row]
+        volume[known & ~exact] = 0.0
+        volume[positions] = column["volume"]
+    return symbols, ts, stacked
+
+
+def _shift(x: np.ndarray, periods: int = 1) -> np.ndarray:
+    result = np.full_like(x, np.nan, dtype=np.float64)
+    result[..., periods:] = x[..., :-periods]
+    return result
+
+
+def _window_diff(cumulative: np.ndarray, window: int) -> np.ndarray:
+    if window > cumulative.shape[-1]:
+        return np.full(cumulative.shape, np.nan)
+    result = np.empty_like(cumulative)
+    result[..., : window - 1] = np.nan
+    result[..., window - 1] = cumulative[..., window - 1]
+    np.subtract(cumulative[..., window:], cumulative[..., :-window], out=result[..., window:])
+    return result
+
+
+def _rolling_sum(x: np.ndarray, window: int) -> np.ndarray:
+    """Сумма в скользящем окне через cumsum; окна с NaN дают NaN, не портя остальные"""
+    cumulative = np.cumsum(x, axis=-1, dtype=np.float64)
+    if cumulative.size == 0 or np.isfinite(cumulative[..., -1]).all():
+        return _window_diff(cumulative, window)
+
+    missing = np.isnan(x)
+    result = _window_diff(np.cumsum(np.where(missing, 0.0, x), axis=-1, dtype=np.float64), window)
+    result[_window_diff(np.cumsum(missing, axis=-1, dtype=np.float64), window) > 0] = np.nan
+    return result
+
+
+def _ewm(x: np.ndarray, alpha: float) -> np.ndarray:
+    """
+    Экспоненциальное сглаживание y[t] = (1 - alpha) * y[t-1] + alpha * x[t], y[0] = x[0]
+
+    Ведущие NaN (инструмент еще не торговался) пропускаются.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    if not x.shape[-1] or alpha >= 1:
+        # alpha = 1 (ema(x, 1), rsi(x, 1)): сглаживания нет, а decay = 0 дал бы деление на ноль в log
+        return x.copy()
+    leading = None
+    filled = x
+    if np.isnan(x[..., 0]).any():
+        leading = np.isnan(x) & (np.cumsum(~np.isnan(x), axis=-1) == 0)
+        first = np.argmax(~leading, axis=-1)
+        filled = np.where(leading, np.take_along_axis(x, first[..., None], axis=-1), x)
+
+    decay = 1.0 - alpha
+    length = x.shape[-1]
+    block = length if decay >= 1 else max(1, int(_MAX_LOG_SCALE / -np.log(decay)))
+    block = min(block, length)
+    k = np.arange(block)
+    growth, fading = decay ** (-k), decay**k
+    result = np.empty_like(filled)
+    carry = filled[..., 0]
+    for start in range(0, length, block):
+        chunk = filled[..., start : start + block]
+        size = chunk.shape[-1]
+        # y[j] = decay^j * (decay * carry + alpha * sum_{i<=j} x[i] * decay^-i)
+        values = np.cumsum(chunk * growth[:size], axis=-1)
+        values *= alpha
+        values += decay * carry[..., None]
+        values *= fading[:size]
+        result[..., start : start + block] = values
+        carry = values[..., -1]
+    if leading is not None:
+        result[leading] = np.nan
+    return result
+
+
+def returns(close: np.ndarray, log: bool = False) -> np.ndarray:
+    """Доходности между соседними свечами (простые или логарифмические)"""
+    close = np.asarray(close, dtype=np.float64)
+    previous = _shift(close)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.log(close / previous) if log else close / previous - 1.0
+
+
+def sma(x: np.ndarray, window: int) -> np.ndarray:
+    """Простая скользящая средняя"""
+    return _rolling_sum(np.asarray(x, dtype=np.float64), window) / window
+
+
+def ema(x: np.ndarray, span: int) -> np.ndarray:
+    """Экспоненциальная скользящая средняя, alpha = 2 / (span + 1)"""
+    return _ewm(x, 2.0 / (span + 1))
+
+
+def rsi(close: np.ndarray, period: int = 14) -> np.ndarray:
+    """RSI со сглаживанием Уайлдера (alpha = 1 / period)"""
+    delta = np.diff(np.asarray(close, dtype=np.float64), axis=-1)
+    gains = _ewm(np.clip(delta, 0, None), 1.0 / period)
+    losses = _ewm(np.clip(-delta, 0, None), 1.0 / period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values = 100.0 - 100.0 / (1.0 + gains / losses)
+    values = np.where((losses == 0) & (gains > 0), 100.0, values)
+    result = np.full(np.shape(close), np.nan)
+    result[..., period:] = values[..., period - 1 :]
+    return result
+
+
+def atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int = 14) -> np.ndarray:
+    """Average True Range со сглаживанием Уайлдера"""
+    high, low, close = (np.asarray(a, dtype=np.float64) for a in (high, low, close))
+    previous = _shift(close)
+    true_range = np.fmax(high - low, np.fmax(np.abs(high - previous), np.abs(low - previous)))
+    result = _ewm(true_range, 1.0 / period)
+    result[..., : period - 1] = np.nan
+    return result
+
+
+def vwap(
+    high: np.ndarray, low: np.ndarray, close: np.ndarray, volume: np.ndarray, window: int | None = None
+) -> np.ndarray:
+    """VWAP по типичной цене (high + low + close) / 3: накопительный или в скользящем окне"""
+    volume = np.asarray(volume, dtype=np.float64)
+    typical = (np.asarray(high) + np.asarray(low) + np.asarray(close)) / 3.0
+    if window is None:
+        turnover = np.cumsum(typical * volume, axis=-1)
+        total = np.cumsum(volume, axis=-1)
+    else:
+        turnover = _rolling_sum(typical * volume, window)
+        total = _rolling_sum(volume, window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return turnover / total
+
+
+def volatility(close: np.ndarray, window: int, periods_per_year: float | None = None) -> np.ndarray:
+    """Скользящее стандартное отклонение логарифмических доходностей (годовое, если задан periods_per_year)"""
+    r = returns(close, log=True)
+    r[..., 0] = 0.0
+    mean = _rolling_sum(r, window) / window
+    variance = _rolling_sum(r * r, window) / window - mean * mean
+    result = np.sqrt(np.clip(variance * window / max(window - 1, 1), 0, None))
+    result[..., :window] = np.nan
+    return result * np.sqrt(periods_per_year) if periods_per_year else result
+
+
+def rolling_correlation(x: np.ndarray, y: np.ndarray, window: int) -> np.ndarray:
+    """
+    Скользящая корреляция Пирсона
+
+    x и y транслируются друг на друга: например, матрица доходностей (N, T)
+    и доходности индекса (T,) дают корреляцию каждого инструмента с индексом.
+    """
+    # Статистики каждого ряда считаются до трансляции, чтобы не повторять их для каждой строки
+    x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    mean_x = _rolling_sum(x, window) / window
+    mean_y = _rolling_sum(y, window) / window
+    covariance = _rolling_sum(x * y, window) / window - mean_x * mean_y
+    variance_x = _rolling_sum(x * x, window) / window - mean_x * mean_x
+    variance_y = _rolling_sum(y * y, window) / window - mean_y * mean_y
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return covariance / np.sqrt(variance_x * variance_y)
+
+
+def _round(value: float) -> float | None:
+    return None if np.isnan(value) else round(float(value), 4)
+
+
+def summarize_bars(response: dict[str, Any], periods_per_year: float | None = None) -> dict[str, Any]:
+    """
+    Компактная сводка по свечам для LLM вместо всех баров
+
+    Args:
+        response: Ответ GET /bars
+        periods_per_year: Число свечей в году для годовой волатильности (например, 252 для D)
+    """
+    columns = bars_to_columns(response)
+    ts, high, low, close, volume = (columns[name] for name in ("ts", "high", "low", "close", "volume"))
+    if not len(close):
+        return {"symbol": response.get("symbol"), "bars": 0}
+
+    return {
+        "symbol": response.get("symbol"),
+        "bars": len(close),
+        "start": format_timestamp(int(ts[0])),
+        "end": format_timestamp(int(ts[-1])),
+        "first_close": _round(close[0]),
+        "last_close": _round(close[-1]),
+        "change_pct": _round((close[-1] / close[0] - 1) * 100),
+        "high": _round(np.nanmax(high)),
+        "low": _round(np.nanmin(low)),
+        "total_volume": _round(np.nansum(volume)),
+        "avg_volume": _round(np.nanmean(volume)),
+        "sma20": _round(sma(close, 20)[-1]),
+        "ema20": _round(ema(close, 20)[-1]),
+        "rsi14": _round(rsi(close, 14)[-1]),
+        "atr14": _round(atr(high, low, close, 14)[-1]),
+        "vwap": _round(vwap(high, low, close, volume)[-1]),
+        "volatility20": _round(volatility(close, 20, periods_per_year)[-1]),
+    }
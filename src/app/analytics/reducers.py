@@ -0,0 +1,290 @@
+"""
+Сжатие ответов Finam TradeAPI перед передачей в LLM
+
+Для каждого эндпоинта (см. ENDPOINT_TEMPLATES) есть reducer, который оставляет
+только значимые поля и агрегаты: признаки стакана вместо всех уровней, сводку
+по свечам вместо всех баров, последние сделки и итоги вместо полной истории.
+Для нераспознанных путей длинные списки обрезаются.
+
+Степень сжатия считается по каждому эндпоинту и пишется в лог (logger src.app.analytics.reducers).
+"""
+
+import json
+import logging
+import threading
+from collections import Counter, defaultdict
+from collections.abc import Callable
+from typing import Any
+
+from src.app.adapters.endpoints import match_endpoint
+from src.app.adapters.order_book import OrderBook
+
+from .indicators import summarize_bars
+
+logger = logging.getLogger(__name__)
+
+# Сколько элементов списков (ордеров, сделок, позиций, уровней) передавать в LLM
+MAX_ITEMS = 10
+BOOK_LEVELS = 5
+
+Reducer = Callable[[dict[str, Any]], dict[str, Any]]
+
+
+def _plain(value: Any) -> Any:  # noqa: ANN401
+    """Развернуть {"value": "1.5"} в число и рекурсивно упростить вложенные структуры"""
+    if isinstance(value, dict):
+        if set(value) == {"value"}:
+            raw = value["value"]
+            try:
+                return float(raw)
+            except (TypeError, ValueError):
+                return raw
+        return {key: _plain(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_plain(item) for item in value]
+    return value
+
+
+def _pick(item: dict[str, Any], fields: tuple[str, ...]) -> dict[str, Any]:
+    """Оставить только заданные поля (отсутствующие пропускаются)"""
+    return {field: _plain(item[field]) for field in fields if field in item and item[field] not in (None, "")}
+
+
+def _truncate(value: Any, limit: int = MAX_ITEMS) -> Any:  # noqa: ANN401
+    """Обрезать длинные списки на любой глубине, оставив пометку о количестве"""
+    if isinstance(value, dict):
+        return {key: _truncate(item, limit) for key, item in value.items()}
+    if isinstance(value, list) and len(value) > limit:
+        return [*(_truncate(item, limit) for item in value[:limit]), f"... еще {len(value) - limit}"]
+    if isinstance(value, list):
+        return [_truncate(item, limit) for item in value]
+    return value
+
+
+# Reducers по эндпоинтам
+
+
+def reduce_quote(response: dict[str, Any]) -> dict[str, Any]:
+    quote = _plain(response.get("quote", {}))
+    result = {"symbol": response.get("symbol")}
+    result.update({
+        field: quote[field]
+        for field in ("timestamp", "last", "bid", "ask", "open", "high", "low", "close", "volume", "change")
+        if field in quote
+    })
+    bid, ask = quote.get("bid"), quote.get("ask")
+    if isinstance(bid, float) and isinstance(ask, float):
+        result["spread"] = round(ask - bid, 8)
+    return result
+
+
+def reduce_orderbook(response: dict[str, Any]) -> dict[str, Any]:
+    book = OrderBook.from_response(response)
+    result = book.features(levels=BOOK_LEVELS)
+    result["top_asks"] = [
+        [float(price), float(size)]
+        for price, size in zip(book.asks.prices[:BOOK_LEVELS], book.asks.sizes[:BOOK_LEVELS], strict=True)
+    ]
+    result["top_bids"] = [
+        [float(price), float(size)]
+        for price, size in zip(book.bids.prices[:BOOK_LEVELS], book.bids.sizes[:BOOK_LEVELS], strict=True)
+    ]
+    return result
+
+
+def reduce_bars(response: dict[str, Any]) -> dict[str, Any]:
+    result = summarize_bars(response)
+    result["last_bars"] = [
+        [bar.get("timestamp"), *(_plain(bar.get(field)) for field in ("open", "high", "low", "close", "volume"))]
+        for bar in response.get("bars", [])[-5:]
+    ]
+    return result
+
+
+def reduce_latest_trades(response: dict[str, Any]) -> dict[str, Any]:
+    trades = [_pick(trade, ("timestamp", "price", "size", "side")) for trade in response.get("trades", [])]
+    volume = sum(trade.get("size", 0.0) for trade in trades)
+    turnover = sum(trade.get("size", 0.0) * trade.get("price", 0.0) for trade in trades)
+    volume_by_side: Counter[str] = Counter()
+    for trade in trades:
+        volume_by_side[str(trade.get("side", "SIDE_UNSPECIFIED"))] += trade.get("size", 0.0)
+    return {
+        "symbol": response.get("symbol"),
+        "count": len(trades),
+        "volume": volume,
+        "vwap": round(turnover / volume, 6) if volume else None,
+        "volume_by_side": dict(volume_by_side),
+        "last_trades": trades[-MAX_ITEMS:],
+    }
+
+
+def reduce_account(response: dict[str, Any]) -> dict[str, Any]:
+    result = _pick(response, ("account_id", "type", "status", "equity", "unrealized_profit", "cash"))
+    positions = [
+        _pick(position, ("symbol", "quantity", "average_price", "current_price", "unrealized_pnl", "daily_pnl"))
+        for position in response.get("positions", [])
+    ]
+    # Самые крупные позиции по модулю стоимости
+    positions.sort(key=lambda p: -abs(p.get("quantity", 0.0) * p.get("current_price", 0.0)))
+    result["positions_count"] = len(positions)
+    result["positions"] = positions[: MAX_ITEMS * 2]
+    return result
+
+
+_ORDER_FIELDS = ("symbol", "quantity", "side", "type", "limit_price", "stop_price", "time_in_force")
+
+
+def _reduce_order(order: dict[str, Any]) -> dict[str, Any]:
+    result = _pick(order, ("order_id", "status", "transact_at"))
+    result.update(_pick(order.get("order", {}), _ORDER_FIELDS))
+    return result
+
+
+def reduce_orders(response: dict[str, Any]) -> dict[str, Any]:
+    orders = [_reduce_order(order) for order in response.get("orders", [])]
+    by_status = Counter(str(order.get("status")) for order in orders)
+    # Активные ордера важнее исполненных и отмененных (sorted устойчив, порядок внутри групп сохраняется)
+    orders.sort(key=lambda order: not str(order.get("status", "")).endswith(("NEW", "PARTIALLY_FILLED")))
+    return {"count": len(orders), "by_status": dict(by_status), "orders": orders[: MAX_ITEMS * 2]}
+
+
+def reduce_order(response: dict[str, Any]) -> dict[str, Any]:
+    return _reduce_order(response)
+
+
+def reduce_account_trades(response: dict[str, Any]) -> dict[str, Any]:
+    trades = [
+        _pick(trade, ("trade_id", "symbol", "price", "size", "side", "timestamp", "order_id"))
+        for trade in response.get("trades", [])
+    ]
+    by_symbol: dict[str, dict[str, float]] = defaultdict(
+        lambda: {"trades": 0, "buy": 0.0, "sell": 0.0, "turnover": 0.0}
+    )
+    for trade in trades:
+        totals = by_symbol[str(trade.get("symbol"))]
+        size, price = trade.get("size", 0.0), trade.get("price", 0.0)
+        totals["trades"] += 1
+        totals["buy" if str(trade.get("side", "")).endswith("BUY") else "sell"] += size
+        totals["turnover"] += size * price
+    return {"count": len(trades), "by_symbol": dict(by_symbol), "last_trades": trades[-MAX_ITEMS:]}
+
+
+def _money(value: Any) -> float | None:  # noqa: ANN401
+    """Сумма google.type.Money ({"units": "-3", "nanos": -500000000}) или число"""
+    if isinstance(value, dict):
+        try:
+            return float(value.get("units") or 0) + float(value.get("nanos") or 0) / 1e9
+        except (TypeError, ValueError):
+            return None
+    return value if isinstance(value, (int, float)) else None
+
+
+def reduce_transactions(response: dict[str, Any]) -> dict[str, Any]:
+    transactions = [
+        _pick(item, ("id", "category", "timestamp", "symbol", "change", "description"))
+        for item in response.get("transactions", [])
+    ]
+    by_category: dict[str, float] = defaultdict(float)
+    for item in transactions:
+        amount = _money(item.get("change"))
+        if amount is not None:
+            by_category[str(item.get("category"))] += amount
+    return {"count": len(transactions), "sum_by_category": dict(by_category), "last": transactions[-MAX_ITEMS:]}
+
+
+def reduce_assets(response: dict[str, Any]) -> dict[str, Any]:
+    assets = [_pick(asset, ("symbol", "name", "type")) for asset in response.get("assets", [])]
+    return {
+        "count": len(assets),
+        "by_type": dict(Counter(str(asset.get("type")) for asset in assets)),
+        "assets": assets[: MAX_ITEMS * 2],
+    }
+
+
+REDUCERS: dict[str, Reducer] = {
+    "quotes": reduce_quote,
+    "orderbook": reduce_orderbook,
+    "bars": reduce_bars,
+    "latest_trades": reduce_latest_trades,
+    "account": reduce_account,
+    "orders": reduce_orders,
+    "order": reduce_order,
+    "account_trades": reduce_account_trades,
+    "transactions": reduce_transactions,
+    "assets": reduce_assets,
+}
+
+
+class _ReductionStats:
+    """Объем ответов до и после сжатия по эндпоинтам"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.calls: Counter[str] = Counter()
+        self.bytes_in: Counter[str] = Counter()
+        self.bytes_out: Counter[str] = Counter()
+
+    def record(self, endpoint: str, bytes_in: int, bytes_out: int) -> None:
+        with self._lock:
+            self.calls[endpoint] += 1
+            self.bytes_in[endpoint] += bytes_in
+            self.bytes_out[endpoint] += bytes_out
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        with self._lock:
+            return {
+                endpoint: {
+                    "calls": self.calls[endpoint],
+                    "bytes_in": self.bytes_in[endpoint],
+                    "bytes_out": self.bytes_out[endpoint],
+                    "ratio": self.bytes_out[endpoint] / self.bytes_in[endpoint] if self.bytes_in[endpoint] else 1.0,
+                }
+                for endpoint in sorted(self.calls)
+            }
+
+
+_stats = _ReductionStats()
+
+
+def _size(value: Any) -> int:  # noqa: ANN401
+    return len(json.dumps(value, ensure_ascii=False, default=str).encode("utf-8"))
+
+
+def reduce_response(path: str, response: dict[str, Any]) -> dict[str, Any]:
+    """
+    Сжать ответ API для передачи в LLM
+
+    Args:
+        path: Путь запроса (по нему определяется эндпоинт)
+        response: Ответ API
+
+    Returns:
+        Сжатый ответ. Ошибки API передаются как есть. Если reducer не справился
+        с неожиданным форматом ответа, используется обрезка длинных списков.
+    """
+    if "error" in response:
+        return response
+
+    endpoint = match_endpoint(path) or "other"
+    reducer = REDUCERS.get(endpoint)
+    try:
+        reduced = reducer(response) if reducer is not None else _truncate(_plain(response))
+    except (AttributeError, KeyError, TypeError, ValueError):
+        logger.warning("Не удалось сжать ответ %s, используется обрезка списков", endpoint, exc_info=True)
+        reduced = _truncate(_plain(response))
+
+    bytes_in, bytes_out = _size(response), _size(reduced)
+    _stats.record(endpoint, bytes_in, bytes_out)
+    logger.info(
+        "Ответ %s сжат для LLM: %d -> %d байт (%.1f%%)",
+        endpoint,
+        bytes_in,
+        bytes_out,
+        bytes_out / bytes_in * 100 if bytes_in else 100.0,
+    )
+    return reduced
+
+
+def reduction_stats() -> dict[str, dict[str, float]]:
+    """Статистика сжатия по эндпоинтам: calls, bytes_in, bytes_out, ratio"""
+    return _stats.summary()
@@ -1,6 +1,30 @@
 """Основная логика приложения"""
 
+from .cache import LLMCache, get_llm_cache
 from .config import Settings, get_settings
-from .llm import call_llm
+from .context import ConversationContext
+from .engine import ChatEngine, ChatHooks, TurnResult, create_system_prompt
+from .llm import LLMStream, acall_llm, astream_llm, call_llm, llm_latency_stats, stream_llm
+from .tools import MAX_TOOL_ROUNDS, TOOLS, ToolResult, ToolRunner
 
-__all__ = ["Settings", "call_llm", "get_settings"]
+__all__ = [
+    "MAX_TOOL_ROUNDS",
+    "TOOLS",
+    "ChatEngine",
+    "ChatHooks",
+    "ConversationContext",
+    "LLMCache",
+    "LLMStream",
+    "Settings",
+    "ToolResult",
+    "ToolRunner",
+    "TurnResult",
+    "acall_llm",
+    "astream_llm",
+    "call_llm",
+    "create_system_prompt",
+    "get_llm_cache",
+    "get_settings",
+    "llm_latency_stats",
+    "stream_llm",
+]
@@ -0,0 +1,179 @@
+"""
+Персистентный кэш ответов LLM
+
+Ответы хранятся в SQLite и адресуются по содержимому запроса:
+ключ - sha256 от модели, сообщений, temperature и max_tokens.
+При превышении лимита размера вытесняются давно не использованные записи (LRU).
+Время доступа при попадании копится в памяти и пишется в SQLite пачкой, а не
+отдельным UPDATE с commit на каждое чтение.
+"""
+
+import atexit
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+from .config import get_settings
+
+# Сколько попаданий копить в памяти перед записью времени доступа в SQLite
+TOUCH_BATCH = 256
+
+
+def make_cache_key(
+    model: str,
+    messages: list[dict[str, Any]],
+    temperature: float,
+    max_tokens: int | None,
+    tools: list[dict[str, Any]] | None = None,
+    tool_choice: str | None = None,
+) -> str:
+    """Построить ключ кэша по параметрам запроса к LLM"""
+    request: dict[str, Any] = {
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+    }
+    # Ключи запросов без tools не меняются, чтобы не терять накопленный кэш
+    if tools:
+        request["tools"] = tools
+        request["tool_choice"] = tool_choice
+    payload = json.dumps(request, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Кэш ответов LLM на диске с LRU вытеснением по размеру
+
+    Потокобезопасен: одно соединение SQLite защищено блокировкой,
+    поэтому кэш можно использовать из пула потоков generate_submission.
+    Отложенные отметки доступа записываются перед вытеснением, при накоплении
+    TOUCH_BATCH штук и в flush(); потеря их при аварийном выходе влияет только
+    на порядок вытеснения.
+    """
+
+    def __init__(self, path: str | Path, max_bytes: int) -> None:
+        """
+        Args:
+            path: Путь к файлу SQLite (директория создается автоматически)
+            max_bytes: Максимальный суммарный размер сохраненных ответов в байтах
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # key -> время последнего попадания, еще не записанное в SQLite
+        self._touched: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._conn.commit()
+        self._total_size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        """Получить ответ из кэша (None при промахе)"""
+        with self._lock:
+            row = self._conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._touched[key] = time.time()
+            if len(self._touched) >= TOUCH_BATCH:
+                self._write_touched()
+                self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, response: dict[str, Any]) -> None:
+        """Сохранить ответ и при необходимости вытеснить старые записи"""
+        data = json.dumps(response, ensure_ascii=False)
+        size = len(data.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, accessed) VALUES (?, ?, ?, ?)",
+                (key, data, size, time.time()),
+            )
+            self._total_size += size - (old[0] if old else 0)
+            self._touched.pop(key, None)
+            self._write_touched()
+            self._evict()
+            self._conn.commit()
+
+    def flush(self) -> None:
+        """Записать отложенные отметки времени доступа"""
+        with self._lock:
+            if self._touched:
+                self._write_touched()
+                self._conn.commit()
+
+    def _write_touched(self) -> None:
+        """Обновить accessed для накопленных попаданий (без commit)"""
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE responses SET accessed = ? WHERE key = ?",
+                [(accessed, key) for key, accessed in self._touched.items()],
+            )
+            self._touched.clear()
+
+    def _evict(self) -> None:
+        """Удалить давно не использованные записи, пока размер не уложится в лимит"""
+        while self._total_size > self.max_bytes:
+            rows = self._conn.execute("SELECT key, size FROM responses ORDER BY accessed LIMIT 64").fetchall()
+            if not rows:
+                self._total_size = 0
+                return
+            for key, size in rows:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._total_size -= size
+                self.evictions += 1
+                if self._total_size <= self.max_bytes:
+                    return
+
+    def clear(self) -> None:
+        """Полностью очистить кэш"""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+            self._touched.clear()
+            self._total_size = 0
+
+    def stats(self) -> dict[str, Any]:
+        """Статистика использования кэша"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "size_bytes": self._total_size,
+        }
+
+
+@lru_cache
+def get_llm_cache() -> LLMCache:
+    """Получить общий для процесса кэш ответов LLM"""
+    s = get_settings()
+    cache = LLMCache(s.llm_cache_path, s.llm_cache_max_mb * 1024 * 1024)
+    atexit.register(cache.flush)
+    return cache
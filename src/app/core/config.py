@@ -12,6 +12,15 @@ class Settings(BaseModel):
     openrouter_base: str = os.getenv("OPENROUTER_BASE", "https://openrouter.ai/api/v1")
     openrouter_model: str = os.getenv("OPENROUTER_MODEL", "openai/gpt-4o-mini")
     debug: bool = os.getenv("APP_DEBUG", "false").lower() in {"1", "true", "yes"}
+    llm_cache_enabled: bool = os.getenv("LLM_CACHE_ENABLED", "true").lower() in {"1", "true", "yes"}
+    llm_cache_path: str = os.getenv("LLM_CACHE_PATH", "data/interim/llm_cache.sqlite")
+    llm_cache_max_mb: int = int(os.getenv("LLM_CACHE_MAX_MB", "256"))
+    llm_pool_size: int = int(os.getenv("LLM_POOL_SIZE", "10"))
+    llm_keepalive_expiry: float = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))
+    llm_connect_timeout: float = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+    llm_read_timeout: float = float(os.getenv("LLM_READ_TIMEOUT", "60"))
+    llm_context_tokens: int = int(os.getenv("LLM_CONTEXT_TOKENS", "6000"))
+    llm_payload_tokens: int = int(os.getenv("LLM_PAYLOAD_TOKENS", "1500"))
 
 
 @lru_cache
@@ -0,0 +1,206 @@
+"""
+Контекст диалога с ограничением по токенам
+
+ConversationContext хранит историю чата и собирает из нее сообщения для LLM так,
+чтобы запрос укладывался в бюджет токенов: большие ответы API обрезаются сразу,
+в старых ходах заменяются пометкой, а ходы, не влезающие в бюджет, отбрасываются
+и остаются только кратким перечнем вопросов пользователя. Размер запроса
+(и задержка) не растет с длиной сессии.
+
+Токены считаются через tiktoken, если он установлен, иначе - оценкой по длине текста.
+"""
+
+import importlib.util
+import json
+import math
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any
+
+from .config import get_settings
+
+# Служебные токены на каждое сообщение в формате chat completions
+MESSAGE_OVERHEAD_TOKENS = 4
+# Средняя длина токена в символах для оценки без токенизатора (смесь кириллицы, латиницы и JSON)
+CHARS_PER_TOKEN = 3.0
+
+PAYLOAD_PLACEHOLDER = "[данные ответа API из предыдущего хода опущены]"
+
+
+@lru_cache
+def _tiktoken_encoding() -> Any:  # noqa: ANN401
+    if importlib.util.find_spec("tiktoken") is None:
+        return None
+    import tiktoken  # type: ignore[import-not-found]
+
+    try:
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        # Словарь токенизатора скачивается при первом использовании и может быть недоступен
+        return None
+
+
+def estimate_tokens(text: str) -> int:
+    """Количество токенов в тексте (точно с tiktoken, иначе приблизительно)"""
+    encoding = _tiktoken_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def truncate_to_tokens(text: str, max_tokens: int, counter: Callable[[str], int] = estimate_tokens) -> str:
+    """Обрезать текст до max_tokens с пометкой о том, сколько символов отброшено"""
+    tokens = counter(text)
+    if tokens <= max_tokens:
+        return text
+    keep = int(len(text) * max_tokens / tokens)
+    return f"{text[:keep]}… [обрезано {len(text) - keep} симв.]"
+
+
+@dataclass
+class _Entry:
+    role: str
+    content: str
+    tokens: int
+    payload: bool = False
+    # Дополнительные поля сообщения (tool_calls, tool_call_id)
+    extra: dict[str, Any] = field(default_factory=dict)
+
+    def message(self) -> dict[str, Any]:
+        return {"role": self.role, "content": self.content, **self.extra}
+
+
+class ConversationContext:
+    """
+    История диалога с бюджетом токенов на запрос
+
+    Пример:
+        context = ConversationContext(create_system_prompt())
+        context.add("user", question)
+        response = call_llm(context.messages())
+    """
+
+    def __init__(
+        self,
+        system_prompt: str,
+        max_tokens: int | None = None,
+        max_payload_tokens: int | None = None,
+        counter: Callable[[str], int] = estimate_tokens,
+    ) -> None:
+        """
+        Args:
+            system_prompt: Системный промпт (всегда входит в запрос)
+            max_tokens: Бюджет токенов на запрос (LLM_CONTEXT_TOKENS, по умолчанию 6000)
+            max_payload_tokens: Предел для одного ответа API (LLM_PAYLOAD_TOKENS, по умолчанию 1500)
+            counter: Функция подсчета токенов
+        """
+        settings = get_settings()
+        self.system_prompt = system_prompt
+        self.max_tokens = max_tokens or settings.llm_context_tokens
+        self.max_payload_tokens = max_payload_tokens or settings.llm_payload_tokens
+        self.counter = counter
+        self._system_tokens = counter(system_prompt) + MESSAGE_OVERHEAD_TOKENS
+        self._entries: list[_Entry] = []
+        self.dropped_turns = 0
+        self.last_prompt_tokens = 0
+
+    @classmethod
+    def from_messages(
+        cls,
+        system_prompt: str,
+        messages: list[dict[str, str]],
+        **options: Any,  # noqa: ANN401
+    ) -> "ConversationContext":
+        """Построить контекст из готовой истории [{"role": ..., "content": ...}]"""
+        context = cls(system_prompt, **options)
+        for message in messages:
+            context.add(message["role"], message["content"])
+        return context
+
+    def add(self, role: str, content: str, payload: bool = False, **extra: Any) -> None:  # noqa: ANN401
+        """
+        Добавить сообщение
+
+        Args:
+            role: user, assistant или tool
+            content: Текст сообщения
+            payload: Сообщение содержит данные ответа API (обрезается до max_payload_tokens
+                и опускается, когда ход становится старым)
+            **extra: Дополнительные поля сообщения (tool_calls у ассистента, tool_call_id у tool)
+        """
+        if payload:
+            content = truncate_to_tokens(content, self.max_payload_tokens, self.counter)
+        tokens = self.counter(content) + MESSAGE_OVERHEAD_TOKENS
+        if extra:
+            tokens += self.counter(json.dumps(extra, ensure_ascii=False))
+        self._entries.append(_Entry(role, content, tokens, payload, extra))
+
+    def clear(self) -> None:
+        """Очистить историю (системный промпт сохраняется)"""
+        self._entries.clear()
+        self.dropped_turns = 0
+
+    def _turns(self) -> list[list[_Entry]]:
+        """Разбить историю на ходы: каждый начинается с вопроса пользователя"""
+        turns: list[list[_Entry]] = []
+        for entry in self._entries:
+            if not turns or (entry.role == "user" and not entry.payload):
+                turns.append([])
+            turns[-1].append(entry)
+        return turns
+
+    def _compact(self, turn: list[_Entry]) -> list[_Entry]:
+        placeholder_tokens = self.counter(PAYLOAD_PLACEHOLDER) + MESSAGE_OVERHEAD_TOKENS
+        return [
+            _Entry(entry.role, PAYLOAD_PLACEHOLDER, placeholder_tokens, True, entry.extra) if entry.payload else entry
+            for entry in turn
+        ]
+
+    def _summary(self, dropped: list[list[_Entry]], budget: int) -> str | None:
+        """Краткое содержание отброшенных ходов: последние вопросы пользователя, сколько влезет"""
+        if not dropped or budget <= 0:
+            return None
+        header = "Ранее в диалоге пользователь спрашивал:"
+        lines: list[str] = []
+        used = self.counter(header) + MESSAGE_OVERHEAD_TOKENS
+        for turn in reversed(dropped):
+            line = "- " + truncate_to_tokens(turn[0].content, 40, self.counter)
+            tokens = self.counter(line) + 1
+            if used + tokens > budget:
+                break
+            lines.append(line)
+            used += tokens
+        return "\n".join([header, *reversed(lines)]) if lines else None
+
+    def messages(self) -> list[dict[str, Any]]:
+        """Сообщения для запроса к LLM в пределах бюджета токенов"""
+        turns = self._turns()
+        # Последний ход передается целиком, в старых ответы API заменяются пометкой
+        candidates = [self._compact(turn) for turn in turns[:-1]] + turns[-1:]
+
+        # Небольшой резерв под краткое содержание отброшенных ходов
+        summary_budget = self.max_tokens // 10
+        budget = self.max_tokens - self._system_tokens - summary_budget
+        kept: list[list[_Entry]] = []
+        for turn in reversed(candidates):
+            tokens = sum(entry.tokens for entry in turn)
+            if kept and tokens > budget:
+                break
+            kept.append(turn)
+            budget -= tokens
+        kept.reverse()
+        dropped = turns[: len(turns) - len(kept)]
+        self.dropped_turns = len(dropped)
+
+        result: list[dict[str, Any]] = [{"role": "system", "content": self.system_prompt}]
+        summary = self._summary(dropped, summary_budget + max(budget, 0))
+        if summary is not None:
+            result.append({"role": "system", "content": summary})
+        result.extend(entry.message() for turn in kept for entry in turn)
+        self.last_prompt_tokens = (
+            self._system_tokens
+            + (self.counter(summary) + MESSAGE_OVERHEAD_TOKENS if summary is not None else 0)
+            + sum(entry.tokens for turn in kept for entry in turn)
+        )
+        return result
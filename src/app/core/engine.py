@@ -0,0 +1,236 @@
+"""
+Движок чата: один ход диалога LLM -> инструменты -> LLM
+
+ChatEngine.run_turn() - общий для CLI, Streamlit и нагрузочных тестов путь
+обработки вопроса: запрос к LLM с tools, параллельное выполнение вызовов
+инструментов, передача сжатых результатов модели и финальный ответ.
+Интерфейсы подключаются через ChatHooks (вывод текста по мере генерации,
+отображение вызовов и результатов), кэш и потоковый режим включаются параметрами.
+
+Пример:
+    engine = ChatEngine(FinamAPIClient(), account_id="A1")
+    result = engine.run_turn("Какие котировки у SBER и GAZP?")
+    print(result.answer, result.seconds)
+"""
+
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+from src.app.adapters import AsyncFinamAPIClient, FinamAPIClient
+
+from .context import ConversationContext
+from .llm import acall_llm, call_llm, stream_llm
+from .tools import MAX_TOOL_ROUNDS, TOOLS, ToolResult, ToolRunner
+
+
+def create_system_prompt() -> str:
+    """Создать системный промпт для AI ассистента"""
+    return """Ты - AI ассистент трейдера, работающий с Finam TradeAPI.
+
+Твоя задача - помогать пользователю анализировать рынки и управлять портфелем.
+
+Для получения данных и действий со счетом используй инструменты (tools) Finam TradeAPI:
+котировки, стакан, свечи, счет и позиции, ордера, сделки. Если для ответа нужны данные
+по нескольким инструментам или счетам, вызывай все нужные инструменты сразу в одном ответе -
+они выполняются параллельно. Получив результаты, проанализируй их и дай понятный ответ.
+
+Тикеры указывай в формате TICKER@MIC, например SBER@MISX.
+
+Отвечай на русском языке, кратко и по делу."""
+
+
+class ChatHooks:
+    """
+    Обработчики событий хода диалога (по умолчанию ничего не делают)
+
+    Интерфейсы переопределяют нужные методы: вывод текста, отображение запросов к API,
+    сбор метрик.
+    """
+
+    def on_text(self, chunk: str) -> None:
+        """Фрагмент текста ответа (в потоковом режиме - по мере генерации)"""
+
+    def on_llm_response(self, response: dict[str, Any], seconds: float) -> None:
+        """Завершен запрос к LLM (полный ответ в формате chat completions)"""
+
+    def on_tool_calls(self, tool_calls: list[dict[str, Any]]) -> None:
+        """Модель запросила вызовы инструментов (выполняются параллельно сразу после этого)"""
+
+    def on_tool_result(self, result: ToolResult) -> None:
+        """Получен результат вызова инструмента"""
+
+    def on_turn_end(self, result: "TurnResult") -> None:
+        """Ход завершен"""
+
+
+@dataclass
+class TurnResult:
+    """Итог хода диалога и его тайминги"""
+
+    question: str
+    answer: str = ""
+    tool_results: list[ToolResult] = field(default_factory=list)
+    # Запросов к LLM за ход (1 без инструментов, +1 на каждый раунд вызовов)
+    llm_calls: int = 0
+    llm_seconds: float = 0.0
+    tool_seconds: float = 0.0
+    seconds: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_llm_calls: int = 0
+
+    def record_llm(self, response: dict[str, Any], seconds: float) -> None:
+        usage = response.get("usage") or {}
+        self.llm_calls += 1
+        self.llm_seconds += seconds
+        self.prompt_tokens += usage.get("prompt_tokens", 0)
+        self.completion_tokens += usage.get("completion_tokens", 0)
+        self.cached_llm_calls += bool(response.get("cached"))
+
+
+class ChatEngine:
+    """
+    Диалог с AI ассистентом: история с бюджетом токенов, LLM и инструменты Finam TradeAPI
+
+    Один экземпляр - одна сессия (не потокобезопасен). Для нагрузочных тестов создается
+    по движку на виртуального пользователя, клиент Finam API можно разделять.
+    """
+
+    def __init__(
+        self,
+        client: FinamAPIClient | AsyncFinamAPIClient,
+        account_id: str | None = None,
+        *,
+        context: ConversationContext | None = None,
+        hooks: ChatHooks | None = None,
+        stream: bool = True,
+        use_cache: bool | None = None,
+        temperature: float = 0.3,
+        tools: list[dict[str, Any]] | None = None,
+        max_tool_rounds: int = MAX_TOOL_ROUNDS,
+    ) -> None:
+        """
+        Args:
+            client: Клиент Finam API (синхронный для run_turn, любой для arun_turn)
+            account_id: Счет по умолчанию для инструментов
+            context: История диалога (по умолчанию новая с create_system_prompt())
+            hooks: Обработчики событий хода
+            stream: Получать ответ LLM потоком (текст приходит в hooks.on_text по мере генерации)
+            use_cache: Кэш ответов LLM (см. call_llm): None - только при temperature=0, True - всегда
+            temperature: Температура генерации
+            tools: Описания инструментов (по умолчанию TOOLS)
+            max_tool_rounds: Максимум раундов вызовов инструментов за ход
+        """
+        self.client = client
+        self.context = context or ConversationContext(create_system_prompt())
+        self.hooks = hooks or ChatHooks()
+        self.stream = stream
+        self.use_cache = use_cache
+        self.temperature = temperature
+        self.tools = TOOLS if tools is None else tools
+        self.max_tool_rounds = max_tool_rounds
+        self.runner = ToolRunner(client, account_id=account_id)
+
+    @property
+    def account_id(self) -> str | None:
+        return self.runner.account_id
+
+    @account_id.setter
+    def account_id(self, value: str | None) -> None:
+        self.runner.account_id = value
+
+    def clear(self) -> None:
+        """Очистить историю диалога"""
+        self.context.clear()
+
+    def _llm_options(self, last_round: bool) -> dict[str, Any]:
+        # После max_tool_rounds раундов инструментов модель должна ответить текстом
+        return {
+            "temperature": self.temperature,
+            "use_cache": self.use_cache,
+            "tools": self.tools or None,
+            "tool_choice": "none" if last_round and self.tools else None,
+        }
+
+    def _complete(self, result: TurnResult, last_round: bool) -> dict[str, Any]:
+        """Запрос к LLM, возвращает сообщение ассистента"""
+        started = time.perf_counter()
+        if self.stream:
+            stream = stream_llm(self.context.messages(), **self._llm_options(last_round))
+            for chunk in stream:
+                self.hooks.on_text(chunk)
+            response = stream.response or {}
+        else:
+            response = call_llm(self.context.messages(), **self._llm_options(last_round))
+            content = response["choices"][0]["message"].get("content")
+            if content:
+                self.hooks.on_text(content)
+        return self._after_llm(result, response, started)
+
+    async def _acomplete(self, result: TurnResult, last_round: bool) -> dict[str, Any]:
+        started = time.perf_counter()
+        response = await acall_llm(self.context.messages(), **self._llm_options(last_round))
+        content = response["choices"][0]["message"].get("content")
+        if content:
+            self.hooks.on_text(content)
+        return self._after_llm(result, response, started)
+
+    def _after_llm(self, result: TurnResult, response: dict[str, Any], started: float) -> dict[str, Any]:
+        seconds = time.perf_counter() - started
+        result.record_llm(response, seconds)
+        self.hooks.on_llm_response(response, seconds)
+        message = response["choices"][0]["message"]
+        if message.get("tool_calls"):
+            self.context.add("assistant", message.get("content") or "", tool_calls=message["tool_calls"])
+            self.hooks.on_tool_calls(message["tool_calls"])
+        return message
+
+    def _add_tool_results(self, result: TurnResult, tool_results: list[ToolResult], started: float) -> None:
+        result.tool_seconds += time.perf_counter() - started
+        for tool_result in tool_results:
+            result.tool_results.append(tool_result)
+            # В LLM передаются только значимые поля и агрегаты, а не сырой ответ
+            self.context.add("tool", tool_result.content, payload=True, tool_call_id=tool_result.call_id)
+            self.hooks.on_tool_result(tool_result)
+
+    def _finish(self, result: TurnResult, message: dict[str, Any], started: float) -> TurnResult:
+        result.answer = message.get("content") or ""
+        self.context.add("assistant", result.answer)
+        result.seconds = time.perf_counter() - started
+        self.hooks.on_turn_end(result)
+        return result
+
+    def run_turn(self, question: str) -> TurnResult:
+        """
+        Обработать вопрос пользователя
+
+        Args:
+            question: Текст вопроса
+
+        Returns:
+            Ответ ассистента, результаты вызовов инструментов и тайминги хода
+        """
+        started = time.perf_counter()
+        result = TurnResult(question)
+        self.context.add("user", question)
+        for round_number in range(self.max_tool_rounds + 1):
+            message = self._complete(result, round_number == self.max_tool_rounds)
+            if not message.get("tool_calls"):
+                break
+            tools_started = time.perf_counter()
+            self._add_tool_results(result, self.runner.execute(message["tool_calls"]), tools_started)
+        return self._finish(result, message, started)
+
+    async def arun_turn(self, question: str) -> TurnResult:
+        """Асинхронный вариант run_turn (без потоковой выдачи: текст приходит в on_text целиком)"""
+        started = time.perf_counter()
+        result = TurnResult(question)
+        self.context.add("user", question)
+        for round_number in range(self.max_tool_rounds + 1):
+            message = await self._acomplete(result, round_number == self.max_tool_rounds)
+            if not message.get("tool_calls"):
+                break
+            tools_started = time.perf_counter()
+            self._add_tool_results(result, await self.runner.aexecute(message["tool_calls"]), tools_started)
+        return self._finish(result, message, started)
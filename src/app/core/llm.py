@@ -1,12 +1,124 @@
+"""
+Вызовы LLM через OpenRouter (OpenAI-совместимый chat completions API)
+
+call_llm / acall_llm возвращают ответ целиком, stream_llm / astream_llm отдают
+текст по мере генерации (SSE, "stream": true), чтобы интерфейсы могли показывать
+ответ сразу. Все варианты используют общий кэш ответов (см. LLMCache), по умолчанию
+только для запросов с temperature=0.
+call_llm, acall_llm и stream_llm принимают описания tools (function calling).
+
+Соединения берутся из общего для процесса пула с keep-alive (синхронный клиент
+один на процесс, асинхронный - один на event loop), поэтому TLS рукопожатие
+выполняется один раз на соединение, а не на каждый запрос. Длительности фаз
+запросов собираются в гистограммы (см. llm_latency_stats).
+"""
+
+import asyncio
+import json
+import threading
+import time
+import weakref
+from collections.abc import AsyncIterator, Iterator
 from typing import Any
 
-import requests
+import httpx
+
+from .cache import LLMCache, get_llm_cache, make_cache_key
+from .config import Settings, get_settings
+from .metrics import LatencyRecorder
+
+_clients_lock = threading.Lock()
+_sync_client: httpx.Client | None = None
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+llm_latency = LatencyRecorder()
+
+
+def _client_options(s: Settings) -> dict[str, Any]:
+    return {
+        "limits": httpx.Limits(
+            max_connections=s.llm_pool_size,
+            max_keepalive_connections=s.llm_pool_size,
+            keepalive_expiry=s.llm_keepalive_expiry,
+        ),
+        "timeout": httpx.Timeout(s.llm_read_timeout, connect=s.llm_connect_timeout),
+    }
+
+
+def get_http_client() -> httpx.Client:
+    """Общий синхронный HTTP клиент с пулом соединений (потокобезопасен)"""
+    global _sync_client
+    with _clients_lock:
+        if _sync_client is None:
+            _sync_client = httpx.Client(**_client_options(get_settings()))
+        return _sync_client
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """Общий асинхронный HTTP клиент для текущего event loop"""
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        client = _async_clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(**_client_options(get_settings()))
+            _async_clients[loop] = client
+        return client
+
+
+def llm_latency_stats() -> dict[str, Any]:
+    """
+    Гистограммы задержек запросов к LLM
 
-from .config import get_settings
+    Фазы: connect и tls (только для новых соединений), ttfb (от отправки запроса
+    до заголовков ответа), first_token (для потоковых вызовов) и total.
+    handshake_share - доля суммарного времени, ушедшая на установку соединений.
+    """
+    return llm_latency.stats()
 
 
-def call_llm(messages: list[dict[str, str]], temperature: float = 0.2, max_tokens: int | None = None) -> dict[str, Any]:
-    """Простой вызов LLM без tools"""
+class _RequestTrace:
+    """Отметки времени событий httpcore (extensions={"trace": ...}) для одного запроса"""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.first_token: float | None = None
+        self.events: dict[str, float] = {}
+
+    def __call__(self, name: str, info: dict[str, Any]) -> None:  # noqa: ARG002
+        self.events[name] = time.perf_counter()
+
+    async def atrace(self, name: str, info: dict[str, Any]) -> None:
+        self(name, info)
+
+    def _span(self, start_suffix: str, end_suffix: str) -> float | None:
+        start = next((t for name, t in self.events.items() if name.endswith(start_suffix)), None)
+        end = next((t for name, t in self.events.items() if name.endswith(end_suffix)), None)
+        return end - start if start is not None and end is not None else None
+
+    def record(self, recorder: LatencyRecorder) -> None:
+        connect = self._span("connect_tcp.started", "connect_tcp.complete")
+        recorder.increment("new_connections" if connect is not None else "reused_connections")
+        for phase, span in (
+            ("connect", connect),
+            ("tls", self._span("start_tls.started", "start_tls.complete")),
+            ("ttfb", self._span("send_request_headers.started", "receive_response_headers.complete")),
+        ):
+            if span is not None:
+                recorder.observe(phase, span)
+        if self.first_token is not None:
+            recorder.observe("first_token", self.first_token - self.started)
+        recorder.observe("total", time.perf_counter() - self.started)
+
+
+def _prepare(
+    messages: list[dict[str, Any]],
+    temperature: float,
+    max_tokens: int | None,
+    use_cache: bool | None,
+    tools: list[dict[str, Any]] | None = None,
+    tool_choice: str | None = None,
+) -> tuple[Settings, dict[str, Any], LLMCache | None, str]:
+    """Собрать тело запроса, кэш и ключ кэша"""
     s = get_settings()
     payload: dict[str, Any] = {
         "model": s.openrouter_model,
@@ -15,15 +127,279 @@ def call_llm(messages: list[dict[str, str]], temperature: float = 0.2, max_token
     }
     if max_tokens:
         payload["max_tokens"] = max_tokens
+    if tools:
+        payload["tools"] = tools
+        if tool_choice:
+            payload["tool_choice"] = tool_choice
+
+    if use_cache is None:
+        # При temperature > 0 повторный запрос должен давать новый ответ, а не копию из кэша
+        use_cache = temperature == 0
+    cache = get_llm_cache() if use_cache and s.llm_cache_enabled else None
+    cache_key = make_cache_key(s.openrouter_model, messages, temperature, max_tokens, tools, tool_choice)
+    return s, payload, cache, cache_key
+
+
+def _headers(s: Settings) -> dict[str, str]:
+    return {
+        "Authorization": f"Bearer {s.openrouter_api_key}",
+        "Content-Type": "application/json",
+    }
+
+
+def _cached(cache: LLMCache | None, cache_key: str) -> dict[str, Any] | None:
+    if cache is None:
+        return None
+    cached = cache.get(cache_key)
+    return {**cached, "cached": True} if cached is not None else None
+
+
+def call_llm(
+    messages: list[dict[str, Any]],
+    temperature: float = 0.2,
+    max_tokens: int | None = None,
+    use_cache: bool | None = None,
+    tools: list[dict[str, Any]] | None = None,
+    tool_choice: str | None = None,
+) -> dict[str, Any]:
+    """Вызов LLM
 
-    r = requests.post(
-        f"{s.openrouter_base}/chat/completions",
-        headers={
-            "Authorization": f"Bearer {s.openrouter_api_key}",
-            "Content-Type": "application/json",
-        },
-        json=payload,
-        timeout=60,
-    )
+    Ответы кэшируются на диске (см. LLMCache). Ответ, взятый из кэша,
+    помечается ключом "cached": True. По умолчанию (use_cache=None) кэшируются
+    только запросы с temperature=0, use_cache=True включает кэш при любой
+    температуре, use_cache=False обходит его.
+    tools и tool_choice передаются как есть (формат OpenAI function calling),
+    вызовы инструментов возвращаются в choices[0].message.tool_calls.
+    """
+    s, payload, cache, cache_key = _prepare(messages, temperature, max_tokens, use_cache, tools, tool_choice)
+    cached = _cached(cache, cache_key)
+    if cached is not None:
+        return cached
+
+    trace = _RequestTrace()
+    try:
+        r = get_http_client().post(
+            f"{s.openrouter_base}/chat/completions", headers=_headers(s), json=payload, extensions={"trace": trace}
+        )
+    finally:
+        trace.record(llm_latency)
+    r.raise_for_status()
+    response = r.json()
+
+    if cache is not None:
+        cache.set(cache_key, response)
+    return response
+
+
+async def acall_llm(
+    messages: list[dict[str, Any]],
+    temperature: float = 0.2,
+    max_tokens: int | None = None,
+    use_cache: bool | None = None,
+    tools: list[dict[str, Any]] | None = None,
+    tool_choice: str | None = None,
+) -> dict[str, Any]:
+    """Асинхронный вариант call_llm"""
+    s, payload, cache, cache_key = _prepare(messages, temperature, max_tokens, use_cache, tools, tool_choice)
+    cached = _cached(cache, cache_key)
+    if cached is not None:
+        return cached
+
+    trace = _RequestTrace()
+    try:
+        r = await get_async_http_client().post(
+            f"{s.openrouter_base}/chat/completions",
+            headers=_headers(s),
+            json=payload,
+            extensions={"trace": trace.atrace},
+        )
+    finally:
+        trace.record(llm_latency)
     r.raise_for_status()
-    return r.json()
+    response = r.json()
+
+    if cache is not None:
+        cache.set(cache_key, response)
+    return response
+
+
+class _StreamAccumulator:
+    """Разбор SSE событий chat completions и сборка полного ответа для кэша"""
+
+    def __init__(self, model: str) -> None:
+        self.model = model
+        self.parts: list[str] = []
+        self.usage: dict[str, Any] | None = None
+        self.finish_reason: str | None = None
+        self.done = False
+        # Вызовы инструментов приходят частями: индекс вызова -> накопленные id, имя и аргументы
+        self.tool_calls: dict[int, dict[str, Any]] = {}
+
+    def feed(self, line: str) -> str | None:
+        """Обработать строку потока и вернуть новый фрагмент текста (или None)"""
+        # Пустые строки разделяют события, строки с ":" - комментарии (keep-alive)
+        if not line.startswith("data:"):
+            return None
+        data = line[5:].strip()
+        if data == "[DONE]":
+            self.done = True
+            return None
+        chunk = json.loads(data)
+        if "error" in chunk:
+            raise RuntimeError(f"LLM stream error: {chunk['error']}")
+        self.usage = chunk.get("usage") or self.usage
+        self.model = chunk.get("model", self.model)
+        for choice in chunk.get("choices", []):
+            self.finish_reason = choice.get("finish_reason") or self.finish_reason
+            delta = choice.get("delta") or {}
+            for part in delta.get("tool_calls") or []:
+                call = self.tool_calls.setdefault(
+                    part.get("index", len(self.tool_calls)),
+                    {"id": "", "type": "function", "function": {"name": "", "arguments": ""}},
+                )
+                call["id"] = part.get("id") or call["id"]
+                function = part.get("function") or {}
+                call["function"]["name"] += function.get("name") or ""
+                call["function"]["arguments"] += function.get("arguments") or ""
+            text = delta.get("content")
+            if text:
+                self.parts.append(text)
+                return text
+        return None
+
+    @property
+    def complete(self) -> bool:
+        """Поток завершился штатно (а не оборвался)"""
+        return self.done or self.finish_reason is not None
+
+    def response(self) -> dict[str, Any]:
+        """Ответ в формате обычного (не потокового) chat completions"""
+        message: dict[str, Any] = {"role": "assistant", "content": "".join(self.parts)}
+        if self.tool_calls:
+            message["tool_calls"] = [self.tool_calls[index] for index in sorted(self.tool_calls)]
+        response: dict[str, Any] = {
+            "model": self.model,
+            "choices": [{"index": 0, "message": message, "finish_reason": self.finish_reason}],
+        }
+        if self.usage is not None:
+            response["usage"] = self.usage
+        return response
+
+
+def _stream_payload(payload: dict[str, Any]) -> dict[str, Any]:
+    # include_usage: последний фрагмент потока содержит usage (нужно для подсчета стоимости)
+    return {**payload, "stream": True, "stream_options": {"include_usage": True}}
+
+
+class LLMStream:
+    """
+    Потоковый ответ LLM: при итерации отдает фрагменты текста по мере генерации
+
+    После завершения итерации в response лежит полный ответ в формате call_llm
+    (включая tool_calls), он же сохраняется в кэш. При попадании в кэш весь текст
+    отдается одним фрагментом.
+    """
+
+    def __init__(
+        self,
+        messages: list[dict[str, Any]],
+        temperature: float = 0.2,
+        max_tokens: int | None = None,
+        use_cache: bool | None = None,
+        tools: list[dict[str, Any]] | None = None,
+        tool_choice: str | None = None,
+    ) -> None:
+        self._request = _prepare(messages, temperature, max_tokens, use_cache, tools, tool_choice)
+        self.response: dict[str, Any] | None = None
+
+    @property
+    def message(self) -> dict[str, Any]:
+        """Сообщение ассистента из завершенного ответа (content и tool_calls)"""
+        if self.response is None:
+            raise RuntimeError("LLM stream is not consumed yet")
+        return self.response["choices"][0]["message"]
+
+    def __iter__(self) -> Iterator[str]:
+        s, payload, cache, cache_key = self._request
+        cached = _cached(cache, cache_key)
+        if cached is not None:
+            self.response = cached
+            content = cached["choices"][0]["message"].get("content")
+            if content:
+                yield content
+            return
+
+        accumulator = _StreamAccumulator(s.openrouter_model)
+        trace = _RequestTrace()
+        try:
+            with get_http_client().stream(
+                "POST",
+                f"{s.openrouter_base}/chat/completions",
+                headers=_headers(s),
+                json=_stream_payload(payload),
+                extensions={"trace": trace},
+            ) as r:
+                r.raise_for_status()
+                for line in r.iter_lines():
+                    text = accumulator.feed(line)
+                    if text:
+                        trace.first_token = trace.first_token or time.perf_counter()
+                        yield text
+        finally:
+            trace.record(llm_latency)
+
+        self.response = accumulator.response()
+        if cache is not None and accumulator.complete:
+            cache.set(cache_key, self.response)
+
+
+def stream_llm(
+    messages: list[dict[str, Any]],
+    temperature: float = 0.2,
+    max_tokens: int | None = None,
+    use_cache: bool | None = None,
+    tools: list[dict[str, Any]] | None = None,
+    tool_choice: str | None = None,
+) -> LLMStream:
+    """
+    Потоковый вызов LLM: фрагменты текста ответа по мере генерации
+
+    Возвращает LLMStream - после итерации в нем доступен полный ответ (response, message).
+    """
+    return LLMStream(messages, temperature, max_tokens, use_cache, tools, tool_choice)
+
+
+async def astream_llm(
+    messages: list[dict[str, Any]],
+    temperature: float = 0.2,
+    max_tokens: int | None = None,
+    use_cache: bool | None = None,
+) -> AsyncIterator[str]:
+    """Асинхронный вариант stream_llm"""
+    s, payload, cache, cache_key = _prepare(messages, temperature, max_tokens, use_cache)
+    cached = _cached(cache, cache_key)
+    if cached is not None:
+        yield cached["choices"][0]["message"]["content"]
+        return
+
+    accumulator = _StreamAccumulator(s.openrouter_model)
+    trace = _RequestTrace()
+    try:
+        async with get_async_http_client().stream(
+            "POST",
+            f"{s.openrouter_base}/chat/completions",
+            headers=_headers(s),
+            json=_stream_payload(payload),
+            extensions={"trace": trace.atrace},
+        ) as r:
+            r.raise_for_status()
+            async for line in r.aiter_lines():
+                text = accumulator.feed(line)
+                if text:
+                    trace.first_token = trace.first_token or time.perf_counter()
+                    yield text
+    finally:
+        trace.record(llm_latency)
+
+    if cache is not None and accumulator.complete:
+        cache.set(cache_key, accumulator.response())
@@ -0,0 +1,95 @@
+"""
+Гистограммы задержек
+
+LatencyRecorder собирает длительности фаз запросов (установка соединения, TLS,
+ожидание первого байта, полный ответ) в гистограммы с фиксированными корзинами.
+Потокобезопасен, рассчитан на запись из пула потоков и event loop одновременно.
+"""
+
+import bisect
+import threading
+from collections import Counter
+from typing import Any
+
+# Верхние границы корзин в миллисекундах (последняя корзина - все, что больше)
+BUCKETS_MS: tuple[float, ...] = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000, 60000)
+
+
+class LatencyHistogram:
+    """Гистограмма задержек с фиксированными корзинами"""
+
+    def __init__(self, buckets_ms: tuple[float, ...] = BUCKETS_MS) -> None:
+        self.buckets_ms = buckets_ms
+        self.counts = [0] * (len(buckets_ms) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, seconds: float) -> None:
+        ms = seconds * 1000
+        self.counts[bisect.bisect_left(self.buckets_ms, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, q: float) -> float:
+        """Оценка перцентиля (верхняя граница корзины, в которую он попадает), мс"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return self.buckets_ms[i] if i < len(self.buckets_ms) else self.max_ms
+        return self.max_ms
+
+    def summary(self) -> dict[str, Any]:
+        labels = [f"<={bound:g}ms" for bound in self.buckets_ms] + [f">{self.buckets_ms[-1]:g}ms"]
+        return {
+            "count": self.count,
+            "mean_ms": self.total_ms / self.count if self.count else 0.0,
+            "p50_ms": self.percentile(0.5),
+            "p90_ms": self.percentile(0.9),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": self.max_ms,
+            "histogram": {label: count for label, count in zip(labels, self.counts, strict=True) if count},
+        }
+
+
+class LatencyRecorder:
+    """Гистограммы по фазам запроса и счетчики событий"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.histograms: dict[str, LatencyHistogram] = {}
+        self.counters: Counter[str] = Counter()
+
+    def observe(self, phase: str, seconds: float) -> None:
+        with self._lock:
+            self.histograms.setdefault(phase, LatencyHistogram()).observe(seconds)
+
+    def increment(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self.counters[name] += value
+
+    def reset(self) -> None:
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+    def stats(self) -> dict[str, Any]:
+        """Сводка по фазам, счетчики и доля времени на установку соединений"""
+        with self._lock:
+            phases = {phase: histogram.summary() for phase, histogram in self.histograms.items()}
+            counters = dict(self.counters)
+        total = phases.get("total", {})
+        total_ms = total.get("mean_ms", 0.0) * total.get("count", 0)
+        handshake_ms = sum(
+            phases[phase]["mean_ms"] * phases[phase]["count"] for phase in ("connect", "tls") if phase in phases
+        )
+        return {
+            "phases": phases,
+            "counters": counters,
+            "handshake_share": handshake_ms / total_ms if total_ms else 0.0,
+        }
@@ -0,0 +1,314 @@
+"""
+Инструменты Finam TradeAPI для function calling
+
+Методы FinamAPIClient описаны как tools в формате OpenAI. Модель может запросить
+несколько вызовов в одном ответе (например, котировки нескольких инструментов) -
+ToolRunner выполняет их параллельно и возвращает результаты, сжатые для LLM
+(см. reduce_response), чтобы передать их модели одним следующим запросом.
+
+Пример:
+    runner = ToolRunner(finam_client, account_id="A1")
+    stream = stream_llm(context.messages(), tools=TOOLS)
+    text = "".join(stream)
+    if stream.message.get("tool_calls"):
+        results = runner.execute(stream.message["tool_calls"])
+"""
+
+import asyncio
+import inspect
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any
+
+from src.app.adapters import AsyncFinamAPIClient, FinamAPIClient
+from src.app.analytics import reduce_response
+
+# Не больше стольких вызовов инструментов выполняется одновременно
+MAX_PARALLEL_TOOLS = 8
+# Сколько раундов вызовов инструментов допускается на один вопрос пользователя
+MAX_TOOL_ROUNDS = 4
+
+
+def _string(description: str) -> dict[str, str]:
+    return {"type": "string", "description": description}
+
+
+_SYMBOL = _string("Тикер в формате TICKER@MIC, например SBER@MISX")
+_ACCOUNT_ID = _string("ID счета")
+_ORDER_ID = _string("ID ордера")
+_START = _string("Начало периода, RFC 3339 (например 2024-01-01T00:00:00Z)")
+_END = _string("Конец периода, RFC 3339")
+
+
+@dataclass(frozen=True)
+class ToolSpec:
+    """Описание инструмента: метод клиента, HTTP метод и шаблон пути API (по нему выбирается reducer)"""
+
+    name: str
+    description: str
+    properties: dict[str, Any]
+    required: tuple[str, ...] = ()
+    path: str = ""
+    method: str = "GET"
+
+    def schema(self) -> dict[str, Any]:
+        """Описание в формате tools chat completions"""
+        return {
+            "type": "function",
+            "function": {
+                "name": self.name,
+                "description": self.description,
+                "parameters": {"type": "object", "properties": self.properties, "required": list(self.required)},
+            },
+        }
+
+
+TOOL_SPECS: tuple[ToolSpec, ...] = (
+    ToolSpec(
+        "get_quote",
+        "Текущая котировка инструмента",
+        {"symbol": _SYMBOL},
+        ("symbol",),
+        "/v1/instruments/{symbol}/quotes/latest",
+    ),
+    ToolSpec(
+        "get_orderbook",
+        "Биржевой стакан инструмента",
+        {"symbol": _SYMBOL, "depth": {"type": "integer", "description": "Глубина стакана"}},
+        ("symbol",),
+        "/v1/instruments/{symbol}/orderbook",
+    ),
+    ToolSpec(
+        "get_candles",
+        "Исторические свечи инструмента",
+        {
+            "symbol": _SYMBOL,
+            "timeframe": {
+                "type": "string",
+                "description": "Таймфрейм",
+                "enum": [
+                    f"TIME_FRAME_{tf}"
+                    for tf in ("M1", "M5", "M15", "M30", "H1", "H2", "H4", "H8", "D", "W", "MN", "QR")
+                ],
+            },
+            "start": _START,
+            "end": _END,
+        },
+        ("symbol",),
+        "/v1/instruments/{symbol}/bars",
+    ),
+    ToolSpec(
+        "get_account",
+        "Информация о счете: оценка, свободные средства и позиции",
+        {"account_id": _ACCOUNT_ID},
+        ("account_id",),
+        "/v1/accounts/{account_id}",
+    ),
+    ToolSpec(
+        "get_orders",
+        "Список ордеров по счету",
+        {"account_id": _ACCOUNT_ID},
+        ("account_id",),
+        "/v1/accounts/{account_id}/orders",
+    ),
+    ToolSpec(
+        "get_order",
+        "Информация об ордере",
+        {"account_id": _ACCOUNT_ID, "order_id": _ORDER_ID},
+        ("account_id", "order_id"),
+        "/v1/accounts/{account_id}/orders/{order_id}",
+    ),
+    ToolSpec(
+        "get_trades",
+        "История сделок по счету",
+        {"account_id": _ACCOUNT_ID, "start": _START, "end": _END},
+        ("account_id",),
+        "/v1/accounts/{account_id}/trades",
+    ),
+    ToolSpec(
+        "create_order",
+        "Выставить ордер",
+        {
+            "account_id": _ACCOUNT_ID,
+            "order_data": {
+                "type": "object",
+                "description": "Параметры ордера: symbol, quantity {value}, side (SIDE_BUY/SIDE_SELL), "
+                "type (ORDER_TYPE_MARKET/ORDER_TYPE_LIMIT), limit_price {value}, time_in_force",
+            },
+        },
+        ("account_id", "order_data"),
+        "/v1/accounts/{account_id}/orders",
+        "POST",
+    ),
+    ToolSpec(
+        "cancel_order",
+        "Отменить ордер",
+        {"account_id": _ACCOUNT_ID, "order_id": _ORDER_ID},
+        ("account_id", "order_id"),
+        "/v1/accounts/{account_id}/orders/{order_id}",
+        "DELETE",
+    ),
+    ToolSpec(
+        "get_session_details",
+        "Детали текущей сессии (токен, доступные счета)",
+        {},
+        (),
+        "/v1/sessions/details",
+        "POST",
+    ),
+    ToolSpec(
+        "execute_request",
+        "Произвольный запрос к Finam TradeAPI, если для него нет отдельного инструмента "
+        "(например GET /v1/assets, GET /v1/exchanges, GET /v1/instruments/{symbol}/trades/latest)",
+        {
+            "method": {"type": "string", "enum": ["GET", "POST", "DELETE"]},
+            "path": _string("Путь API, например /v1/assets/SBER@MISX"),
+        },
+        ("method", "path"),
+    ),
+)
+
+TOOLS: list[dict[str, Any]] = [spec.schema() for spec in TOOL_SPECS]
+
+_SPECS_BY_NAME = {spec.name: spec for spec in TOOL_SPECS}
+
+
+@dataclass
+class ToolResult:
+    """Результат вызова инструмента"""
+
+    call_id: str
+    name: str
+    arguments: dict[str, Any]
+    response: dict[str, Any]
+    # Сжатый ответ для LLM
+    payload: dict[str, Any]
+    method: str
+    path: str
+    seconds: float
+
+    @property
+    def is_error(self) -> bool:
+        return "error" in self.response
+
+    @property
+    def content(self) -> str:
+        """Сжатый ответ в виде текста для LLM"""
+        return json.dumps(self.payload, ensure_ascii=False, default=str)
+
+    def message(self) -> dict[str, Any]:
+        """Сообщение role=tool для следующего запроса к LLM"""
+        return {"role": "tool", "tool_call_id": self.call_id, "content": self.content}
+
+
+class ToolRunner:
+    """
+    Выполнение вызовов инструментов из ответа LLM
+
+    Все вызовы из одного ответа модели выполняются параллельно. Ошибка одного
+    вызова не прерывает остальные и возвращается модели словарем с ключом "error".
+    """
+
+    def __init__(
+        self,
+        client: FinamAPIClient | AsyncFinamAPIClient,
+        account_id: str | None = None,
+        max_parallel: int = MAX_PARALLEL_TOOLS,
+    ) -> None:
+        """
+        Args:
+            client: FinamAPIClient или AsyncFinamAPIClient
+            account_id: Счет по умолчанию (подставляется, если модель не указала счет)
+            max_parallel: Максимум одновременных вызовов
+        """
+        self.client = client
+        self.account_id = account_id
+        self.max_parallel = max_parallel
+
+    def _parse(self, call: dict[str, Any]) -> tuple[dict[str, Any], str, str]:
+        """Аргументы, HTTP метод и путь API, по которому выбирается reducer"""
+        function = call.get("function") or {}
+        name = function.get("name", "")
+        spec = _SPECS_BY_NAME.get(name)
+        if spec is None:
+            raise ValueError(f"Unknown tool: {name}")
+        arguments = json.loads(function.get("arguments") or "{}")
+        if not isinstance(arguments, dict):
+            raise ValueError("Tool arguments must be a JSON object")
+        arguments = {key: value for key, value in arguments.items() if key in spec.properties}
+        placeholder = arguments.get("account_id") in (None, "", "{account_id}")
+        if self.account_id and "account_id" in spec.properties and placeholder:
+            arguments["account_id"] = self.account_id
+        method = spec.method
+        if name == "execute_request":
+            method = str(arguments.get("method", "GET")).upper()
+            path = str(arguments.get("path", ""))
+            if self.account_id:
+                path = path.replace("{account_id}", self.account_id)
+            arguments["path"] = path
+        else:
+            path = spec.path.format_map({key: arguments.get(key, "") for key in ("symbol", "account_id", "order_id")})
+        missing = [key for key in spec.required if key not in arguments]
+        if missing:
+            raise ValueError(f"Missing tool arguments: {', '.join(missing)}")
+        return arguments, method, path
+
+    def _result(
+        self,
+        call: dict[str, Any],
+        parsed: tuple[dict[str, Any], str, str],
+        response: Any,  # noqa: ANN401
+        started: float,
+    ) -> ToolResult:
+        arguments, method, path = parsed
+        if not isinstance(response, dict):
+            response = {"result": response}
+        return ToolResult(
+            call_id=call.get("id", ""),
+            name=(call.get("function") or {}).get("name", ""),
+            arguments=arguments,
+            response=response,
+            payload=reduce_response(path, response) if path else response,
+            method=method,
+            path=path,
+            seconds=time.perf_counter() - started,
+        )
+
+    def _run_one(self, call: dict[str, Any]) -> ToolResult:
+        started = time.perf_counter()
+        parsed: tuple[dict[str, Any], str, str] = ({}, "", "")
+        try:
+            parsed = self._parse(call)
+            response = getattr(self.client, call["function"]["name"])(**parsed[0])
+        except Exception as e:
+            response = {"error": str(e), "type": type(e).__name__}
+        return self._result(call, parsed, response, started)
+
+    async def _arun_one(self, call: dict[str, Any], semaphore: asyncio.Semaphore) -> ToolResult:
+        started = time.perf_counter()
+        parsed: tuple[dict[str, Any], str, str] = ({}, "", "")
+        async with semaphore:
+            try:
+                parsed = self._parse(call)
+                function = getattr(self.client, call["function"]["name"])
+                if inspect.iscoroutinefunction(function):
+                    response = await function(**parsed[0])
+                else:
+                    response = await asyncio.to_thread(function, **parsed[0])
+            except Exception as e:
+                response = {"error": str(e), "type": type(e).__name__}
+        return self._result(call, parsed, response, started)
+
+    def execute(self, tool_calls: list[dict[str, Any]]) -> list[ToolResult]:
+        """Выполнить вызовы параллельно (синхронный клиент), результаты в порядке вызовов"""
+        if len(tool_calls) <= 1:
+            return [self._run_one(call) for call in tool_calls]
+        with ThreadPoolExecutor(max_workers=min(len(tool_calls), self.max_parallel)) as pool:
+            return list(pool.map(self._run_one, tool_calls))
+
+    async def aexecute(self, tool_calls: list[dict[str, Any]]) -> list[ToolResult]:
+        """Асинхронный вариант execute (для AsyncFinamAPIClient)"""
+        semaphore = asyncio.Semaphore(self.max_parallel)
+        return list(await asyncio.gather(*(self._arun_one(call, semaphore) for call in tool_calls)))
@@ -7,51 +7,119 @@ Streamlit веб-интерфейс для AI ассистента трейде
     streamlit run src/app/chat_app.py
 """
 
-import json
+from typing import Any
 
 import streamlit as st
 
 from src.app.adapters import FinamAPIClient
-from src.app.core import call_llm, get_settings
-
-
-def create_system_prompt() -> str:
-    """Создать системный промпт для AI ассистента"""
-    return """Ты - AI ассистент трейдера, работающий с Finam TradeAPI.
-
-Когда пользователь задает вопрос о рынке, портфеле или хочет совершить действие:
-1. Определи нужный API endpoint
-2. Укажи запрос в формате: API_REQUEST: METHOD /path
-3. После получения данных - проанализируй их и дай понятный ответ
-
-Доступные endpoints:
-- GET /v1/instruments/{symbol}/quotes/latest - котировка
-- GET /v1/instruments/{symbol}/orderbook - стакан
-- GET /v1/instruments/{symbol}/bars - свечи
-- GET /v1/accounts/{account_id} - счет и позиции
-- GET /v1/accounts/{account_id}/orders - ордера
-- POST /v1/accounts/{account_id}/orders - создать ордер
-- DELETE /v1/accounts/{account_id}/orders/{order_id} - отменить ордер
+from src.app.analytics.reducers import reduce_quote
+from src.app.core import ChatEngine, ChatHooks, ConversationContext, ToolResult, create_system_prompt, get_settings
+
+
+class StreamlitHooks(ChatHooks):
+    """Вывод хода диалога в текущий контейнер Streamlit: ответ появляется по мере генерации"""
+
+    def __init__(self) -> None:
+        self.placeholder: Any = None
+        self.text = ""
+
+    def on_text(self, chunk: str) -> None:
+        if self.placeholder is None:
+            self.placeholder = st.empty()
+            self.text = ""
+        self.text += chunk
+        self.placeholder.markdown(self.text + "▌")
+
+    def on_llm_response(self, response: dict[str, Any], seconds: float) -> None:  # noqa: ARG002
+        if self.placeholder is not None:
+            self.placeholder.markdown(self.text)
+            self.placeholder = None
+
+    def on_tool_calls(self, tool_calls: list[dict[str, Any]]) -> None:
+        # Все вызовы из ответа модели выполняются параллельно
+        st.caption(f"🔍 Выполняю запросов: {len(tool_calls)}")
+
+    def on_tool_result(self, result: ToolResult) -> None:
+        st.info(f"🔍 Запрос: `{result.method} {result.path}` ({result.seconds:.2f} с)")
+        if result.is_error:
+            st.error(f"⚠️ Ошибка API: {result.response.get('error')}")
+            if "details" in result.response:
+                st.error(f"Детали: {result.response['details']}")
+        with st.expander("📡 Ответ API", expanded=False):
+            st.json(result.response)
+
+
+# Сколько последних сообщений показывать (ранние подгружаются кнопкой)
+HISTORY_PAGE = 20
+# Период обновления виджета котировок
+QUOTES_REFRESH = "2s"
+
+
+@st.cache_resource(show_spinner=False)
+def get_finam_client(access_token: str, base_url: str) -> FinamAPIClient:
+    """Клиент Finam API, общий для перезапусков скрипта и сессий с теми же токеном и URL"""
+    return FinamAPIClient(access_token=access_token or None, base_url=base_url or None)
+
+
+def get_engine(finam_client: FinamAPIClient, account_id: str) -> ChatEngine:
+    """Движок чата сессии: история диалога для LLM живет между перезапусками скрипта"""
+    engine = st.session_state.get("engine")
+    if engine is None or engine.client is not finam_client:
+        context = ConversationContext.from_messages(create_system_prompt(), st.session_state.messages)
+        engine = ChatEngine(finam_client, context=context, hooks=StreamlitHooks())
+        st.session_state.engine = engine
+    engine.account_id = account_id or None
+    return engine
+
+
+@st.fragment
+def render_api_requests(index: int) -> None:
+    """Запросы к API сообщения: ответы отрисовываются только по запросу и без перезапуска всей страницы"""
+    api_requests = st.session_state.messages[index]["api_requests"]
+    if st.toggle(f"🔍 API запросы ({len(api_requests)})", key=f"api_requests_{index}"):
+        for api_request in api_requests:
+            st.code(f"{api_request['method']} {api_request['path']}", language="http")
+            st.json(api_request["response"], expanded=False)
+
+
+def render_history() -> None:
+    """Последние HISTORY_PAGE сообщений: время перезапуска не растет с длиной диалога"""
+    messages = st.session_state.messages
+    start = max(0, len(messages) - st.session_state.history_shown)
+    if start and st.button(f"⬆️ Показать ранние сообщения ({start})"):
+        st.session_state.history_shown += HISTORY_PAGE
+        st.rerun()
+
+    for index in range(start, len(messages)):
+        message = messages[index]
+        with st.chat_message(message["role"]):
+            st.markdown(message["content"])
+            if "api_requests" in message:
+                render_api_requests(index)
 
-Отвечай на русском, кратко и по делу."""
 
+@st.fragment(run_every=QUOTES_REFRESH)
+def render_live_quotes(finam_client: FinamAPIClient, symbols: list[str]) -> None:
+    """Котировки из потока (без запросов к API), обновляются без перезапуска страницы"""
+    for symbol in symbols:
+        quote = finam_client.last_quote(symbol)
+        if quote is None:
+            st.caption(f"{symbol}: ожидание данных...")
+            continue
+        quote = reduce_quote(quote)
+        st.metric(symbol, quote.get("last"), quote.get("change"))
 
-def extract_api_request(text: str) -> tuple[str | None, str | None]:
-    """Извлечь API запрос из ответа LLM"""
-    if "API_REQUEST:" not in text:
-        return None, None
 
-    lines = text.split("\n")
-    for line in lines:
-        if line.strip().startswith("API_REQUEST:"):
-            request = line.replace("API_REQUEST:", "").strip()
-            parts = request.split(maxsplit=1)
-            if len(parts) == 2:
-                return parts[0], parts[1]
-    return None, None
+def watch_quotes(finam_client: FinamAPIClient, symbols: list[str]) -> None:
+    """Подписаться на котировки инструментов, на которые клиент еще не подписан"""
+    stream = finam_client.async_client.market_stream
+    subscribed = {symbol for _, symbol in stream.subscriptions} if stream is not None else set()
+    new_symbols = [symbol for symbol in symbols if symbol not in subscribed]
+    if new_symbols:
+        finam_client.subscribe(new_symbols)
 
 
-def main() -> None:  # noqa: C901
+def main() -> None:
     """Главная функция Streamlit приложения"""
     st.set_page_config(page_title="AI Трейдер (Finam)", page_icon="🤖", layout="wide")
 
@@ -59,6 +127,11 @@ def main() -> None:  # noqa: C901
     st.title("🤖 AI Ассистент Трейдера")
     st.caption("Интеллектуальный помощник для работы с Finam TradeAPI")
 
+    # Инициализация состояния
+    if "messages" not in st.session_state:
+        st.session_state.messages = []
+    st.session_state.setdefault("history_shown", HISTORY_PAGE)
+
     # Sidebar с настройками
     with st.sidebar:
         st.header("⚙️ Настройки")
@@ -76,10 +149,34 @@ def main() -> None:  # noqa: C901
 
         account_id = st.text_input("ID счета", value="", help="Оставьте пустым если не требуется")
 
+        # Клиент создается один раз на токен и URL, а не на каждый перезапуск скрипта
+        finam_client = get_finam_client(api_token, api_base_url)
+        engine = get_engine(finam_client, account_id)
+
         if st.button("🔄 Очистить историю"):
             st.session_state.messages = []
+            st.session_state.history_shown = HISTORY_PAGE
+            engine.clear()
             st.rerun()
 
+        # Проверка токена
+        if not finam_client.access_token:
+            st.warning(
+                "⚠️ Finam API токен не установлен. "
+                "Установите в переменной окружения FINAM_ACCESS_TOKEN или введите выше."
+            )
+        else:
+            st.success("✅ Finam API токен установлен")
+
+        st.markdown("---")
+        watched = st.text_input(
+            "📈 Котировки онлайн", value="", help="Тикеры через запятую, например SBER@MISX, GAZP@MISX"
+        )
+        symbols = [symbol.strip().upper() for symbol in watched.split(",") if symbol.strip()]
+        if symbols:
+            watch_quotes(finam_client, symbols)
+            render_live_quotes(finam_client, symbols)
+
         st.markdown("---")
         st.markdown("### 💡 Примеры вопросов:")
         st.markdown("""
@@ -91,31 +188,7 @@ def main() -> None:  # noqa: C901
         - Детали моей сессии
         """)
 
-    # Инициализация состояния
-    if "messages" not in st.session_state:
-        st.session_state.messages = []
-
-    # Инициализация Finam API клиента
-    finam_client = FinamAPIClient(access_token=api_token or None, base_url=api_base_url if api_base_url else None)
-
-    # Проверка токена
-    if not finam_client.access_token:
-        st.sidebar.warning(
-            "⚠️ Finam API токен не установлен. Установите в переменной окружения FINAM_ACCESS_TOKEN или введите выше."
-        )
-    else:
-        st.sidebar.success("✅ Finam API токен установлен")
-
-    # Отображение истории сообщений
-    for message in st.session_state.messages:
-        with st.chat_message(message["role"]):
-            st.markdown(message["content"])
-
-            # Показываем API запросы
-            if "api_request" in message:
-                with st.expander("🔍 API запрос"):
-                    st.code(f"{message['api_request']['method']} {message['api_request']['path']}", language="http")
-                    st.json(message["api_request"]["response"])
+    render_history()
 
     # Поле ввода
     if prompt := st.chat_input("Напишите ваш вопрос..."):
@@ -124,61 +197,19 @@ def main() -> None:  # noqa: C901
         with st.chat_message("user"):
             st.markdown(prompt)
 
-        # Формируем историю для LLM
-        conversation_history = [{"role": "system", "content": create_system_prompt()}]
-        for msg in st.session_state.messages:
-            conversation_history.append({"role": msg["role"], "content": msg["content"]})
-
         # Получаем ответ от ассистента
-        with st.chat_message("assistant"), st.spinner("Думаю..."):
+        # Ответ выводится по мере генерации
+        with st.chat_message("assistant"):
             try:
-                response = call_llm(conversation_history, temperature=0.3)
-                assistant_message = response["choices"][0]["message"]["content"]
-
-                # Проверяем API запрос
-                method, path = extract_api_request(assistant_message)
-
-                api_data = None
-                if method and path:
-                    # Подставляем account_id если есть
-                    if account_id and "{account_id}" in path:  # noqa: RUF027
-                        path = path.replace("{account_id}", account_id)
-
-                    # Показываем что делаем запрос
-                    st.info(f"🔍 Выполняю запрос: `{method} {path}`")
-
-                    # Выполняем API запрос
-                    api_response = finam_client.execute_request(method, path)
-
-                    # Проверяем на ошибки
-                    if "error" in api_response:
-                        st.error(f"⚠️ Ошибка API: {api_response.get('error')}")
-                        if "details" in api_response:
-                            st.error(f"Детали: {api_response['details']}")
-
-                    # Показываем результат
-                    with st.expander("📡 Ответ API", expanded=False):
-                        st.json(api_response)
-
-                    api_data = {"method": method, "path": path, "response": api_response}
-
-                    # Добавляем результат в контекст
-                    conversation_history.append({"role": "assistant", "content": assistant_message})
-                    conversation_history.append({
-                        "role": "user",
-                        "content": f"Результат API: {json.dumps(api_response, ensure_ascii=False)}\n\nПроанализируй.",
-                    })
-
-                    # Получаем финальный ответ
-                    response = call_llm(conversation_history, temperature=0.3)
-                    assistant_message = response["choices"][0]["message"]["content"]
-
-                st.markdown(assistant_message)
+                result = engine.run_turn(prompt)
 
                 # Сохраняем сообщение ассистента
-                message_data = {"role": "assistant", "content": assistant_message}
-                if api_data:
-                    message_data["api_request"] = api_data
+                message_data = {"role": "assistant", "content": result.answer}
+                if result.tool_results:
+                    message_data["api_requests"] = [
+                        {"method": tool.method, "path": tool.path, "response": tool.response}
+                        for tool in result.tool_results
+                    ]
                 st.session_state.messages.append(message_data)
 
             except Exception as e:
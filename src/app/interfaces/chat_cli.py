@@ -8,68 +8,63 @@
 """
 
 import sys
+from typing import Any
 
 import click
 
 from src.app.adapters import FinamAPIClient
-from src.app.core import call_llm, get_settings
+from src.app.core import ChatEngine, ChatHooks, ToolResult, get_settings
 
 
-def create_system_prompt() -> str:
-    """Создать системный промпт для AI ассистента"""
-    return """Ты - AI ассистент трейдера, работающий с Finam TradeAPI.
+class CliHooks(ChatHooks):
+    """Вывод хода диалога в терминал: ответ печатается по мере генерации"""
 
-Твоя задача - помогать пользователю анализировать рынки и управлять портфелем.
+    def __init__(self) -> None:
+        self.printing = False
 
-Когда пользователь задает вопрос, ты должен:
-1. Определить, какой API запрос нужен
-2. Сформулировать запрос в формате: HTTP_METHOD /api/path
-3. Я выполню этот запрос и верну результат
-4. Ты должен проанализировать результат и дать понятный ответ пользователю
-
-Доступные API endpoints:
-- GET /v1/instruments/{symbol}/quotes/latest - текущая котировка
-- GET /v1/instruments/{symbol}/orderbook - биржевой стакан
-- GET /v1/instruments/{symbol}/bars - исторические свечи
-- GET /v1/accounts/{account_id} - информация о счете и позициях
-- GET /v1/accounts/{account_id}/orders - список ордеров
-- POST /v1/accounts/{account_id}/orders - создание ордера
-- DELETE /v1/accounts/{account_id}/orders/{order_id} - отмена ордера
-
-Формат твоего ответа должен быть таким:
-```
-API_REQUEST: GET /v1/instruments/SBER@MISX/quotes/latest
-
-<После получения ответа от API, проанализируй его и дай понятное объяснение>
-```
-
-Отвечай на русском языке, будь полезным и дружелюбным."""
+    def on_text(self, chunk: str) -> None:
+        if not self.printing:
+            click.echo("🤖 Ассистент: ", nl=False)
+            self.printing = True
+        click.echo(chunk, nl=False)
 
+    def on_llm_response(self, response: dict[str, Any], seconds: float) -> None:  # noqa: ARG002
+        if self.printing:
+            click.echo()
+            self.printing = False
 
-def extract_api_request(text: str) -> tuple[str | None, str | None]:
-    """Извлечь API запрос из ответа LLM"""
-    if "API_REQUEST:" not in text:
-        return None, None
+    def on_tool_calls(self, tool_calls: list[dict[str, Any]]) -> None:
+        # Все вызовы из ответа модели выполняются параллельно
+        for call in tool_calls:
+            function = call.get("function", {})
+            click.echo(f"   🔍 Вызываю {function.get('name')}({function.get('arguments', '')})")
 
-    lines = text.split("\n")
-    for line in lines:
-        if line.strip().startswith("API_REQUEST:"):
-            request = line.replace("API_REQUEST:", "").strip()
-            parts = request.split(maxsplit=1)
-            if len(parts) == 2:
-                return parts[0], parts[1]
-    return None, None
+    def on_tool_result(self, result: ToolResult) -> None:
+        if result.is_error:
+            click.echo(f"   ⚠️  Ошибка API ({result.name}): {result.response.get('error')}", err=True)
+            if "details" in result.response:
+                click.echo(f"   Детали: {result.response['details']}", err=True)
+        else:
+            click.echo(f"   📡 {result.method} {result.path} ({result.seconds:.2f} с): {result.response}")
 
 
 @click.command()
 @click.option("--account-id", default=None, help="ID счета для работы (опционально)")
 @click.option("--api-token", default=None, help="Finam API токен (или используйте FINAM_ACCESS_TOKEN)")
-def main(account_id: str | None, api_token: str | None) -> None:  # noqa: C901
+@click.option(
+    "--watch",
+    multiple=True,
+    help="Подписаться на поток котировок и стакана инструмента (можно указать несколько раз)",
+)
+def main(account_id: str | None, api_token: str | None, watch: tuple[str, ...]) -> None:
     """Запустить интерактивный CLI чат с AI ассистентом"""
     settings = get_settings()
 
     # Инициализируем клиент Finam API
     finam_client = FinamAPIClient(access_token=api_token)
+    if watch:
+        # Котировки и стаканы этих инструментов будут браться из потока без запросов к API
+        finam_client.subscribe(watch, orderbook=True)
 
     # Проверяем подключение
     if finam_client.access_token:
@@ -86,13 +81,16 @@ def main(account_id: str | None, api_token: str | None) -> None:  # noqa: C901
     click.echo(f"API URL: {finam_client.base_url}")
     if account_id:
         click.echo(f"Счет: {account_id}")
+    if watch:
+        click.echo(f"Поток котировок: {', '.join(watch)}")
     click.echo("\nКоманды:")
     click.echo("  - Просто пишите свои вопросы на русском")
     click.echo("  - 'exit' или 'quit' - выход")
     click.echo("  - 'clear' - очистить историю")
     click.echo("=" * 70)
 
-    conversation_history = [{"role": "system", "content": create_system_prompt()}]
+    # История с ограничением по токенам: старые ходы сжимаются, размер запроса не растет
+    engine = ChatEngine(finam_client, account_id=account_id, hooks=CliHooks())
 
     while True:
         try:
@@ -104,51 +102,12 @@ def main(account_id: str | None, api_token: str | None) -> None:  # noqa: C901
                 break
 
             if user_input.lower() in ["clear", "очистить"]:
-                conversation_history = [{"role": "system", "content": create_system_prompt()}]
+                engine.clear()
                 click.echo("🔄 История очищена")
                 continue
 
-            # Добавляем вопрос в историю
-            conversation_history.append({"role": "user", "content": user_input})
-
-            # Получаем ответ от LLM
-            click.echo("🤖 Ассистент: ", nl=False)
-            response = call_llm(conversation_history, temperature=0.3)
-            assistant_message = response["choices"][0]["message"]["content"]
-
-            # Проверяем, есть ли API запрос
-            method, path = extract_api_request(assistant_message)
-
-            if method and path:
-                # Подставляем account_id если есть
-                if account_id and "{account_id}" in path:  # noqa: RUF027
-                    path = path.replace("{account_id}", account_id)
-
-                # Выполняем API запрос
-                click.echo(f"\n   🔍 Выполняю запрос: {method} {path}")
-                api_response = finam_client.execute_request(method, path)
-
-                # Проверяем на ошибки
-                if "error" in api_response:
-                    click.echo(f"   ⚠️  Ошибка API: {api_response.get('error')}", err=True)
-                    if "details" in api_response:
-                        click.echo(f"   Детали: {api_response['details']}", err=True)
-                else:
-                    click.echo(f"   📡 Ответ API: {api_response}\n")
-
-                # Добавляем результат API в контекст
-                conversation_history.append({"role": "assistant", "content": assistant_message})
-                conversation_history.append({
-                    "role": "user",
-                    "content": f"Результат API запроса: {api_response}\n\nПроанализируй это.",
-                })
-
-                # Получаем финальный ответ
-                response = call_llm(conversation_history, temperature=0.3)
-                assistant_message = response["choices"][0]["message"]["content"]
-
-            click.echo(f"{assistant_message}\n")
-            conversation_history.append({"role": "assistant", "content": assistant_message})
+            engine.run_turn(user_input)
+            click.echo()
 
         except KeyboardInterrupt:
             click.echo("\n\n👋 До свидания!")